@@ -0,0 +1,36 @@
+-- Migration 002: Mensajes de sesión en filas (una fila por mensaje)
+-- Backend: Supabase (PostgreSQL)
+-- Ejecutar en: Supabase Dashboard > SQL Editor
+-- Requiere: 001_sesiones_chat.sql
+--
+-- Antes, cada turno reescribía el array JSONB completo en sesiones_chat.messages.
+-- Ahora sesiones_chat solo guarda metadata y cada mensaje es una fila nueva:
+-- el guardado inserta solo los mensajes nuevos y la carga lee los últimos N
+-- con un único escaneo del índice primario.
+
+CREATE TABLE IF NOT EXISTS sesiones_chat_mensajes (
+    session_key TEXT NOT NULL REFERENCES sesiones_chat (key) ON DELETE CASCADE,
+    seq         INTEGER NOT NULL,                     -- Posición del mensaje en la sesión (0, 1, 2...)
+    mensaje     JSONB NOT NULL,                       -- {role, content, timestamp, ...}
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (session_key, seq)                    -- Sirve también para "últimos N" (scan inverso)
+);
+
+-- Backfill: copiar el historial existente de sesiones_chat.messages
+INSERT INTO sesiones_chat_mensajes (session_key, seq, mensaje)
+SELECT s.key, (m.ord - 1)::INTEGER, m.value
+FROM sesiones_chat s,
+     jsonb_array_elements(s.messages) WITH ORDINALITY AS m (value, ord)
+ON CONFLICT (session_key, seq) DO NOTHING;
+
+-- Opcional, una vez verificado el backfill: liberar el array legado (reduce TOAST)
+-- UPDATE sesiones_chat SET messages = '[]'::jsonb WHERE messages <> '[]'::jsonb;
+
+-- RLS: habilitar Row Level Security (requerido por Supabase)
+ALTER TABLE sesiones_chat_mensajes ENABLE ROW LEVEL SECURITY;
+
+-- Policy: service_role tiene acceso total (nanobot usa service_key)
+CREATE POLICY "service_role_full_access" ON sesiones_chat_mensajes
+    FOR ALL
+    USING (auth.role() = 'service_role')
+    WITH CHECK (auth.role() = 'service_role');
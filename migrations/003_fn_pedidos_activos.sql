@@ -0,0 +1,64 @@
+-- Migration 003: Pedidos activos y entregas del cliente en una sola llamada
+-- Backend: Supabase (PostgreSQL)
+-- Ejecutar en: Supabase Dashboard > SQL Editor
+--
+-- La herramienta "consulta" (acciones mi_pedido y tracking) resolvía el
+-- cliente, luego sus pedidos activos y luego las entregas: tres viajes a
+-- PostgREST por pregunta. Esta función devuelve todo en uno:
+--
+--   {"cliente": {...} | null, "pedidos": [...], "entregas": [...]}
+--
+-- Si la función no existe, nanobot vuelve a las consultas separadas.
+
+-- Índices de apoyo (no-op si ya existen)
+CREATE INDEX IF NOT EXISTS idx_clientes_telefono_whatsapp ON clientes (telefono_whatsapp);
+CREATE INDEX IF NOT EXISTS idx_clientes_telefono ON clientes (telefono);
+CREATE INDEX IF NOT EXISTS idx_pedidos_cliente_estado ON pedidos (cliente_id, estado);
+CREATE INDEX IF NOT EXISTS idx_entregas_pedido_codigo ON entregas (pedido_codigo);
+
+CREATE OR REPLACE FUNCTION fn_pedidos_activos_v1(p_telefono TEXT)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    WITH cliente AS (
+        -- telefono_whatsapp se guarda como +E.164, telefono como dígitos
+        SELECT cliente_id, nombre, sucursal_id, telefono, telefono_whatsapp
+        FROM clientes
+        WHERE telefono_whatsapp = '+' || p_telefono OR telefono = p_telefono
+        ORDER BY (telefono_whatsapp = '+' || p_telefono) DESC NULLS LAST
+        LIMIT 1
+    ),
+    pedidos_activos AS (
+        SELECT p.codigo, p.estado, p.importe, p.cargo_delivery, p.created_at, p.observaciones
+        FROM pedidos p
+        JOIN cliente c ON c.cliente_id = p.cliente_id
+        WHERE p.estado IN ('registrado', 'en_proceso', 'terminado', 'mensaje_enviado')
+    )
+    SELECT jsonb_build_object(
+        'cliente', (SELECT to_jsonb(c) FROM cliente c),
+        'pedidos', COALESCE(
+            (SELECT jsonb_agg(to_jsonb(p) ORDER BY p.created_at DESC) FROM pedidos_activos p),
+            '[]'::jsonb
+        ),
+        'entregas', COALESCE(
+            (SELECT jsonb_agg(
+                        jsonb_build_object(
+                            'pedido_codigo', e.pedido_codigo,
+                            'tipo', e.tipo,
+                            'estado', e.estado,
+                            'fecha_programada', e.fecha_programada,
+                            'franja_horaria', e.franja_horaria,
+                            'estimado_llegada', e.estimado_llegada
+                        ) ORDER BY e.fecha_programada)
+             FROM entregas e
+             JOIN pedidos_activos p ON p.codigo = e.pedido_codigo
+             WHERE e.estado IN ('pendiente', 'asignado', 'en_camino')),
+            '[]'::jsonb
+        )
+    );
+$$;
+
+-- Solo el backend (service_role) la invoca
+REVOKE EXECUTE ON FUNCTION fn_pedidos_activos_v1(TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION fn_pedidos_activos_v1(TEXT) TO service_role;
@@ -0,0 +1,41 @@
+-- Migration 004: Actualización en lote del estado de crm_mensajes
+-- Backend: Supabase (PostgreSQL)
+-- Ejecutar en: Supabase Dashboard > SQL Editor
+--
+-- Tras enviar una tanda de avisos ("prendas listas"), nanobot hacía un PATCH
+-- a /rest/v1/crm_mensajes por mensaje. SupabaseCRMClient ahora acumula los
+-- cambios y los envía en una sola llamada:
+--
+--   [{"id": "<uuid>", "campos": {"estado_envio": "...", "metadata": {...}, ...}}, ...]
+--
+-- Solo se modifican las columnas presentes en "campos" (igual que un PATCH).
+-- Devuelve el número de filas actualizadas. Si la función no existe, nanobot
+-- vuelve al PATCH por mensaje.
+
+CREATE OR REPLACE FUNCTION fn_crm_mensajes_actualizar_v1(p_cambios JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH cambios AS (
+        SELECT (c->>'id')::uuid AS id,
+               c->'campos' AS campos,
+               -- jsonb_populate_record convierte cada campo al tipo de su columna
+               jsonb_populate_record(NULL::crm_mensajes, c->'campos') AS r
+        FROM jsonb_array_elements(p_cambios) AS c
+    ),
+    actualizados AS (
+        UPDATE crm_mensajes m SET
+            estado_envio = CASE WHEN x.campos ? 'estado_envio' THEN (x.r).estado_envio ELSE m.estado_envio END,
+            mensaje_renderizado = CASE WHEN x.campos ? 'mensaje_renderizado' THEN (x.r).mensaje_renderizado ELSE m.mensaje_renderizado END,
+            detalle_error = CASE WHEN x.campos ? 'detalle_error' THEN (x.r).detalle_error ELSE m.detalle_error END,
+            metadata = CASE WHEN x.campos ? 'metadata' THEN (x.r).metadata ELSE m.metadata END
+        FROM cambios x
+        WHERE m.id = x.id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM actualizados;
+$$;
+
+-- Solo el backend (service_role) la invoca
+REVOKE EXECUTE ON FUNCTION fn_crm_mensajes_actualizar_v1(JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION fn_crm_mensajes_actualizar_v1(JSONB) TO service_role;
@@ -3,6 +3,8 @@
 import base64
 import mimetypes
 import platform
+import time
+from datetime import datetime
 from pathlib import Path
 from typing import Any
 
@@ -16,17 +18,25 @@ class ContextBuilder:
     
     Assembles bootstrap files, memory, skills, and conversation history
     into a coherent prompt for the LLM.
+
+    With ``static_prefix`` the system prompt is byte-identical for every chat
+    and request (until a file changes), so provider prefix caches hit; the
+    time, channel, chat ID and customer context travel in a Runtime Context
+    block at the top of the latest user message instead.
     """
     
     BOOTSTRAP_FILES = ["IDENTITY.md", "SOUL.md", "AGENTS.md", "USER.md", "TOOLS.md"]
+    RUNTIME_REF = "(see Runtime Context)"  # stands in for {now}/{tz} in a static prefix
     
     def __init__(self, workspace: Path, entity: str | None = None,
-                 allowed_skills: list[str] | None = None):
+                 allowed_skills: list[str] | None = None, static_prefix: bool = False):
         self.workspace = workspace
         self.entity = entity or "general"
         self.entity_dir = workspace / "agents" / self.entity
         self.customer_context: str = ""
-        self._entity_prompt_cache: str | None = None
+        self.static_prefix = static_prefix
+        self._static_prompt: tuple[tuple[int, ...], str, list[str]] | None = None
+        self._prefix: tuple[tuple[int, ...], str] | None = None
         self.memory = MemoryStore(self.entity_dir)
         self.skills = SkillsLoader(
             workspace, agent_skills_dir=self.entity_dir / "skills",
@@ -43,11 +53,53 @@ class ContextBuilder:
         1. Load identity files from workspace/agents/{entity}/
         2. Load memory from workspace/agents/{entity}/memory/
         3. Load skills (agent-specific first, then shared)
+
+        The file-derived parts are memoized and only rebuilt when one of the
+        bootstrap, memory or skill files changes (see ``_prompt_fingerprint``).
         """
-        parts = []
+        fingerprint = self._prompt_fingerprint()
+        if self.static_prefix and customer_context is None:
+            return self._build_prefix(fingerprint)
+        if self._static_prompt is None or self._static_prompt[0] != fingerprint:
+            self._static_prompt = (
+                fingerprint, self._load_identity_template(), self._build_static_sections(),
+            )
+        _, identity, sections = self._static_prompt
 
-        # Identity (from agents/{entity}/ — IDENTITY.md, SOUL.md, + bootstrap files)
-        parts.append(self._build_identity_prompt(customer_context=customer_context))
+        parts = [self._build_identity_prompt(identity, customer_context=customer_context), *sections]
+        return "\n\n---\n\n".join(parts)
+
+    def _build_prefix(self, fingerprint: tuple[int, ...]) -> str:
+        """The whole system prompt in static-prefix mode, rebuilt only when a file changes."""
+        if self._prefix is None or self._prefix[0] != fingerprint:
+            agent_dir = str(self.entity_dir.expanduser().resolve())
+            identity = (
+                self._load_identity_template()
+                .replace("{now}", self.RUNTIME_REF)
+                .replace("{tz}", self.RUNTIME_REF)
+                .replace("{agent_dir}", agent_dir)
+            )
+            parts = [p for p in (identity, *self._build_static_sections()) if p]
+            self._prefix = (fingerprint, "\n\n---\n\n".join(parts))
+        return self._prefix[1]
+
+    def build_runtime_context(
+        self, channel: str | None = None, chat_id: str | None = None, customer_context: str = "",
+    ) -> str:
+        """The per-request facts kept out of a static system prompt."""
+        lines = [
+            "## Runtime Context",
+            f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M (%A)')} {time.strftime('%Z') or 'UTC'}",
+        ]
+        if channel and chat_id:
+            lines += [f"Channel: {channel}", f"Chat ID: {chat_id}"]
+        if customer_context:
+            lines += ["", customer_context]
+        return "\n".join(lines)
+
+    def _build_static_sections(self) -> list[str]:
+        """Build the memory and skills sections of the system prompt."""
+        parts = []
 
         # Memory context
         memory = self.memory.get_memory_context()
@@ -70,30 +122,37 @@ Skills with available="false" need dependencies installed first - you can try in
 
 {skills_summary}""")
 
-        return "\n\n---\n\n".join(parts)
-    
-    def _build_identity_prompt(self, customer_context: str | None = None) -> str:
-        """Build prompt from agent directory files.
+        return parts
+
+    def _prompt_fingerprint(self) -> tuple[int, ...]:
+        """Modification times of the bootstrap and memory files plus the skill catalog version.
 
-        Loads all .md files from workspace/agents/{entity}/ (IDENTITY.md, SOUL.md,
-        AGENTS.md, USER.md, TOOLS.md, etc.) and injects runtime context.
+        Stats only; skill changes are tracked by ``SkillsLoader`` itself.
         """
-        from datetime import datetime
-        import time as _time
+        paths = [self.entity_dir / f for f in self.BOOTSTRAP_FILES]
+        paths.append(self.memory.memory_file)
+        return (*(_mtime_ns(p) for p in paths), self.skills.version)
 
-        if self._entity_prompt_cache is None:
-            parts = []
-            for filename in self.BOOTSTRAP_FILES:
-                fp = self.entity_dir / filename
-                if fp.exists():
-                    parts.append(fp.read_text(encoding="utf-8"))
-            self._entity_prompt_cache = "\n\n---\n\n".join(parts)
+    def _load_identity_template(self) -> str:
+        """Read the bootstrap files of this entity (placeholders left unresolved)."""
+        parts = []
+        for filename in self.BOOTSTRAP_FILES:
+            fp = self.entity_dir / filename
+            if fp.exists():
+                parts.append(fp.read_text(encoding="utf-8"))
+        return "\n\n---\n\n".join(parts)
 
+    def _build_identity_prompt(self, template: str, customer_context: str | None = None) -> str:
+        """Build prompt from agent directory files.
+
+        Takes the joined .md files from workspace/agents/{entity}/ (IDENTITY.md,
+        SOUL.md, AGENTS.md, USER.md, TOOLS.md, etc.) and injects runtime context.
+        """
         # Inject runtime variables
         now = datetime.now().strftime("%Y-%m-%d %H:%M (%A)")
-        tz = _time.strftime("%Z") or "UTC"
+        tz = time.strftime("%Z") or "UTC"
         agent_dir = str(self.entity_dir.expanduser().resolve())
-        base_prompt = self._entity_prompt_cache.replace("{now}", now)
+        base_prompt = template.replace("{now}", now)
         base_prompt = base_prompt.replace("{tz}", tz)
         base_prompt = base_prompt.replace("{agent_dir}", agent_dir)
 
@@ -133,6 +192,18 @@ Skills with available="false" need dependencies installed first - you can try in
 
         # System prompt (use request-scoped customer_context if provided)
         effective_customer = customer_context if customer_context is not None else self.customer_context
+        if self.static_prefix:
+            messages.append({"role": "system", "content": self.build_system_prompt(skill_names)})
+            messages.extend(history)
+            runtime = self.build_runtime_context(channel, chat_id, effective_customer)
+            user_content = self._build_user_content(current_message, media)
+            if isinstance(user_content, str):
+                user_content = f"{runtime}\n\n---\n\n{user_content}"
+            else:
+                user_content = [{"type": "text", "text": runtime}, *user_content]
+            messages.append({"role": "user", "content": user_content})
+            return messages
+
         system_prompt = self.build_system_prompt(skill_names, customer_context=effective_customer)
         if channel and chat_id:
             system_prompt += f"\n\n## Current Session\nChannel: {channel}\nChat ID: {chat_id}"
@@ -222,3 +293,11 @@ Skills with available="false" need dependencies installed first - you can try in
         
         messages.append(msg)
         return messages
+
+
+def _mtime_ns(path: Path) -> int:
+    """Return a file's modification time, or 0 if it does not exist."""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
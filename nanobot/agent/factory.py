@@ -61,6 +61,9 @@ def create_agent_from_profile(
         workspace=workspace,
         model=profile.model or defaults.model,
         max_iterations=defaults.max_tool_iterations,
+        max_parallel_tools=defaults.max_parallel_tools,
+        max_concurrent_messages=defaults.max_concurrent_messages,
+        provider_max_inflight=defaults.provider_max_inflight,
         brave_api_key=config.tools.web.search.api_key or None,
         exec_config=config.tools.exec,
         cron_service=cron_service,
@@ -68,7 +71,19 @@ def create_agent_from_profile(
         temperature=defaults.temperature,
         max_tokens=defaults.max_tokens,
         thinking=defaults.thinking,
+        streaming=defaults.streaming,
+        static_prompt_prefix=defaults.static_prompt_prefix,
+        history_max_tokens=(
+            profile.history_max_tokens
+            if profile.history_max_tokens is not None
+            else defaults.history_max_tokens
+        ),
+        consolidate_after_messages=defaults.consolidate_after_messages,
+        consolidate_after_tokens=defaults.consolidate_after_tokens,
+        consolidate_keep_messages=defaults.consolidate_keep_messages,
+        max_concurrent_consolidations=defaults.max_concurrent_consolidations,
         session_backend=profile.session_backend,
+        session_config=config.sessions,
         channels=profile.channels or None,
         allowed_tools=profile.tools or None,
         allowed_skills=profile.skills or None,
@@ -0,0 +1,206 @@
+"""SQLite FTS5 index over HISTORY.md for keyword and date-range lookups."""
+
+import re
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from loguru import logger
+
+# Entries start with "[YYYY-MM-DD HH:MM]" (see the save_memory tool schema)
+_TIMESTAMP = re.compile(rb"^\[(\d{4}-\d{2}-\d{2}(?: \d{2}:\d{2})?)")
+_TERM = re.compile(r"\w+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    ts TEXT,
+    start INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_ts ON entries(ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    text, content='', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+class HistoryIndex:
+    """
+    Incremental full-text index of the entries in HISTORY.md.
+
+    The index stores only byte ranges and search terms (a contentless FTS5
+    table); entry text is read back from HISTORY.md, so the index stays a
+    fraction of the log's size. ``sync()`` indexes whatever was appended
+    since the last call and rebuilds from scratch if the indexed part of the
+    file was edited or truncated.
+    """
+
+    def __init__(self, history_file: Path, db_file: Path):
+        self.history_file = history_file
+        self.db_file = db_file
+        self._lock = threading.Lock()  # searches run in worker threads
+        self._db: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.db_file, check_same_thread=False)
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def _meta(self, key: str) -> int:
+        row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def sync(self) -> None:
+        """Index entries appended to HISTORY.md since the last sync."""
+        with self._lock:
+            db = self._connect()
+            size = self.history_file.stat().st_size if self.history_file.exists() else 0
+            indexed = self._meta("indexed_bytes")
+            if indexed > size or (indexed and not self._tail_intact(db)):
+                logger.info("HISTORY.md changed outside append_history; rebuilding its index")
+                self._reset(db)
+                indexed = 0
+            if size > indexed:
+                with db:
+                    self._index_from(db, indexed)
+
+    def _tail_intact(self, db: sqlite3.Connection) -> bool:
+        """Whether the last indexed entry still has the bytes it was indexed with."""
+        row = db.execute("SELECT start, length FROM entries ORDER BY id DESC LIMIT 1").fetchone()
+        if row is None:
+            return True
+        with open(self.history_file, "rb") as f:
+            f.seek(row[0])
+            return zlib.crc32(f.read(row[1])) == self._meta("tail_crc")
+
+    @staticmethod
+    def _reset(db: sqlite3.Connection) -> None:
+        with db:
+            db.execute("DELETE FROM entries")
+            db.execute("INSERT INTO entries_fts(entries_fts) VALUES ('delete-all')")
+            db.execute("DELETE FROM meta")
+
+    def _index_from(self, db: sqlite3.Connection, offset: int) -> None:
+        """Split the file from ``offset`` into entries and index them."""
+        last = None
+        with open(self.history_file, "rb") as f:
+            f.seek(offset)
+            for start, ts, raw in _split_entries(f, offset):
+                cur = db.execute(
+                    "INSERT INTO entries (ts, start, length) VALUES (?, ?, ?)", (ts, start, len(raw)),
+                )
+                db.execute(
+                    "INSERT INTO entries_fts (rowid, text) VALUES (?, ?)",
+                    (cur.lastrowid, raw.decode("utf-8", errors="replace")),
+                )
+                last = raw
+            meta = {"indexed_bytes": f.tell()}
+        if last is not None:
+            meta["tail_crc"] = zlib.crc32(last)
+        db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta.items())
+
+    def search(
+        self,
+        query: str = "",
+        since: str | None = None,
+        until: str | None = None,
+        limit: int = 10,
+    ) -> list[str]:
+        """
+        Find history entries.
+
+        Args:
+            query: Keywords that must all appear (accents and case ignored).
+            since: Earliest timestamp, "YYYY-MM-DD" or "YYYY-MM-DD HH:MM".
+            until: Latest timestamp, inclusive ("2026-01-31" covers that whole day).
+            limit: Maximum number of entries returned.
+
+        Returns:
+            Entry texts, newest first.
+        """
+        self.sync()
+        terms = _TERM.findall(query)
+        where, params = [], []
+        if since:
+            where.append("e.ts >= ?")
+            params.append(since)
+        if until:
+            where.append("e.ts < ?")
+            params.append(until + "~")  # sorts after any "YYYY-MM-DD HH:MM" with this prefix
+
+        if terms:
+            # Newest first rather than by relevance: FTS5 then walks the matches
+            # in rowid order and stops at ``limit``, so common words stay cheap
+            match = ["entries_fts MATCH ?"]
+            match_params: list = [" ".join(f'"{t}"' for t in terms)]
+            if where:
+                # Narrow the match walk to the ids in the date range (ts index)
+                with self._lock:
+                    lo, hi = self._connect().execute(
+                        "SELECT MIN(id), MAX(id) FROM entries e WHERE " + " AND ".join(where), params,
+                    ).fetchone()
+                if lo is None:
+                    return []
+                match.append("entries_fts.rowid BETWEEN ? AND ?")
+                match_params += [lo, hi]
+            sql = (
+                "SELECT e.start, e.length FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid"
+                " WHERE " + " AND ".join(match + where) + " ORDER BY entries_fts.rowid DESC"
+            )
+            params = match_params + params
+        else:
+            sql = "SELECT e.start, e.length FROM entries e"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += " ORDER BY e.id DESC"
+        sql += " LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        if not rows:
+            return []
+        with open(self.history_file, "rb") as f:
+            results = []
+            for start, length in rows:
+                f.seek(start)
+                results.append(f.read(length).decode("utf-8", errors="replace"))
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def _split_entries(f: BinaryIO, pos: int) -> Iterator[tuple[int, str | None, bytes]]:
+    """Yield ``(offset, timestamp, text)`` for each entry read from ``f`` (at ``pos``)."""
+    start, ts, lines = None, None, []
+    after_blank = True
+    for line in f:
+        if line.strip():
+            # A paragraph opens a new entry if it is timestamped, or if the
+            # current one is not (undated logs: one entry per paragraph)
+            if start is not None and after_blank and (ts is None or _TIMESTAMP.match(line)):
+                yield start, ts, b"".join(lines).rstrip()
+                start = None
+            if start is None:
+                start, lines = pos, []
+                m = _TIMESTAMP.match(line)
+                ts = m.group(1).decode() if m else None
+            lines.append(line)
+            after_blank = False
+        else:
+            if start is not None:
+                lines.append(line)
+            after_blank = True
+        pos += len(line)
+    if start is not None:
+        yield start, ts, b"".join(lines).rstrip()
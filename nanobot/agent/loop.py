@@ -6,14 +6,16 @@ import json
 import shutil
 import tempfile
 import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable
 
 from loguru import logger
 
 from nanobot.bus.events import InboundMessage, OutboundMessage
 from nanobot.bus.queue import MessageBus
-from nanobot.providers.base import LLMProvider
+from nanobot.providers.base import LLMProvider, LLMResponse
 from nanobot.agent.context import ContextBuilder
 from nanobot.agent.tools.registry import ToolRegistry
 from nanobot.agent.tools.filesystem import ReadFileTool, WriteFileTool, EditFileTool, ListDirTool
@@ -23,8 +25,23 @@ from nanobot.agent.tools.message import MessageTool
 from nanobot.agent.tools.spawn import SpawnTool
 from nanobot.agent.tools.cron import CronTool
 from nanobot.agent.tools.handoff import HandoffTool
+from nanobot.agent.tools.memory import SearchHistoryTool
 from nanobot.agent.subagent import SubagentManager
-from nanobot.session.manager import SessionManager
+from nanobot.session.manager import Session, SessionManager
+from nanobot.utils.tokens import count_message_tokens, get_token_counter
+
+if TYPE_CHECKING:
+    from nanobot.config.schema import SessionConfig
+
+# How long shutdown waits for in-flight turns before cancelling them
+SHUTDOWN_DRAIN_S = 30.0
+
+
+@dataclass
+class _SessionLock:
+    """Per-session lock plus the number of turns holding or waiting for it."""
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    users: int = 0
 
 
 class AgentLoop:
@@ -46,6 +63,7 @@ class AgentLoop:
         "web":    ["web_search", "web_fetch"],
         "comms":  ["message", "handoff"],
         "system": ["exec", "spawn", "cron"],
+        "memory": ["search_history"],
     }
 
     def __init__(
@@ -55,6 +73,9 @@ class AgentLoop:
         workspace: Path,
         model: str | None = None,
         max_iterations: int = 20,
+        max_parallel_tools: int = 4,
+        max_concurrent_messages: int = 16,
+        provider_max_inflight: int = 0,
         brave_api_key: str | None = None,
         exec_config: "ExecToolConfig | None" = None,
         cron_service: "CronService | None" = None,
@@ -62,7 +83,15 @@ class AgentLoop:
         temperature: float = 0.7,
         max_tokens: int = 4096,
         thinking: bool = True,
+        streaming: bool = False,
+        static_prompt_prefix: bool = False,
+        history_max_tokens: int = 0,
+        consolidate_after_messages: int = 0,
+        consolidate_after_tokens: int = 0,
+        consolidate_keep_messages: int = 20,
+        max_concurrent_consolidations: int = 1,
         session_backend: str = "file",
+        session_config: "SessionConfig | None" = None,
         channels: list[str] | None = None,
         allowed_tools: list[str] | None = None,
         allowed_skills: list[str] | None = None,
@@ -74,6 +103,11 @@ class AgentLoop:
         self.workspace = workspace
         self.model = model or provider.get_default_model()
         self.max_iterations = max_iterations
+        self.max_parallel_tools = max_parallel_tools
+        self.max_concurrent_messages = max(1, max_concurrent_messages)
+        if provider_max_inflight:
+            # Shared provider instance: the cap applies across all agents using it
+            provider.limit_inflight(provider_max_inflight)
         self.brave_api_key = brave_api_key
         self.exec_config = exec_config or ExecToolConfig()
         self.cron_service = cron_service
@@ -81,13 +115,22 @@ class AgentLoop:
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.thinking = thinking
+        self.streaming = streaming
+        self.history_max_tokens = history_max_tokens
+        self._count_tokens = get_token_counter(self.model)
+        self.consolidate_after_messages = consolidate_after_messages
+        self.consolidate_after_tokens = consolidate_after_tokens
+        self.consolidate_keep_messages = max(1, consolidate_keep_messages)
 
         self.channels = set(channels) if channels else None  # None = accept all
         self.allowed_tools = self._resolve_tools(allowed_tools) if allowed_tools else None
         self.context = ContextBuilder(
             workspace, entity=entity, allowed_skills=allowed_skills,
+            static_prefix=static_prompt_prefix,
+        )
+        self.sessions = SessionManager(
+            workspace, backend=session_backend, config=session_config,
         )
-        self.sessions = SessionManager(workspace, backend=session_backend)
         self.tools = ToolRegistry()
         self._supabase_tool = None
         self.subagents = SubagentManager(
@@ -97,10 +140,20 @@ class AgentLoop:
             model=self.model,
             brave_api_key=brave_api_key,
             exec_config=self.exec_config,
+            max_parallel_tools=max_parallel_tools,
         )
 
         self._running = False
-        self._session_locks: dict[str, asyncio.Lock] = {}
+        self._stop_requested: asyncio.Event | None = None  # set by stop() while run() is active
+        self._prompt_tokens = 0  # all LLM calls of this agent, for the cache hit ratio
+        self._cache_read_tokens = 0
+        # Own inbound queue: the bus routes this agent's channels and handoffs here
+        self._consumer = bus.register_consumer(entity or "default", self.channels)
+        self._session_locks: dict[str, _SessionLock] = {}
+        self._workers: list[asyncio.Task] = []
+        # Background memory consolidation: at most one per session, capped overall
+        self._consolidations: dict[str, asyncio.Task] = {}
+        self._consolidation_slots = asyncio.Semaphore(max(1, max_concurrent_consolidations))
         self._instance_id = uuid.uuid4().hex[:8]
         self._scratch_dir = Path(tempfile.gettempdir()) / "nanobot" / self._instance_id
         self._scratch_dir.mkdir(parents=True, exist_ok=True)
@@ -134,6 +187,7 @@ class AgentLoop:
             MessageTool(send_callback=self.bus.publish_outbound),
             SpawnTool(manager=self.subagents),
             HandoffTool(bus=self.bus),
+            SearchHistoryTool(self.context.memory),
         ]
         if self.cron_service:
             all_tools.append(CronTool(self.cron_service))
@@ -153,45 +207,94 @@ class AgentLoop:
     async def run(self) -> None:
         """Run the agent loop, processing messages from the bus.
 
-        Messages from different sessions are processed concurrently.
-        Messages within the same session are serialized via per-session locks.
+        A fixed pool of ``max_concurrent_messages`` workers takes messages
+        from this agent's bus queue, so traffic spikes wait in the queue
+        instead of starting unbounded LLM calls. Messages within the same
+        session are serialized via per-session locks. On stop() or
+        cancellation, bursts still held by the bus coalescer are queued and
+        in-flight turns get ``SHUTDOWN_DRAIN_S`` to finish.
         """
         self._running = True
-        logger.info("Agent loop started")
-
+        self._stop_requested = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.max_concurrent_messages)
+        ]
+        logger.info("Agent loop started ({} workers)", len(self._workers))
+
+        try:
+            # Workers keep running until we flip _running below, also if we are cancelled
+            await self._stop_requested.wait()
+        finally:
+            self._stop_requested = None
+            # Hand held bursts to the workers before they stop taking new messages
+            await self.bus.flush_pending()
+            self._running = False
+            await self._drain_workers()
+            await self._cancel_consolidations()
+            # Drain write-behind session saves on stop() or cancellation
+            await self.sessions.close()
+
+    async def _worker(self) -> None:
+        """Process messages one at a time until the loop stops."""
         while self._running:
             try:
                 msg = await asyncio.wait_for(
-                    self.bus.consume_inbound(),
+                    self.bus.consume_inbound(self._consumer),
                     timeout=1.0
                 )
-                # Process each message concurrently; lock per session inside
-                asyncio.create_task(self._handle_message(msg))
             except asyncio.TimeoutError:
                 continue
+            try:
+                await self._dispatch(msg)
+            except Exception as e:
+                logger.error("Unhandled error processing message: {}", e)
+
+    async def _drain_workers(self) -> None:
+        """Wait for in-flight turns, cancelling whatever is left after the timeout."""
+        workers, self._workers = self._workers, []
+        if not workers:
+            return
+        _, pending = await asyncio.wait(workers, timeout=SHUTDOWN_DRAIN_S)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning("Cancelled {} turns still running after {}s", len(pending), SHUTDOWN_DRAIN_S)
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    @asynccontextmanager
+    async def _session_lock(self, key: str) -> AsyncIterator[None]:
+        """Serialize turns of one session; the entry is dropped once nobody uses it."""
+        entry = self._session_locks.get(key)
+        if entry is None:
+            entry = self._session_locks[key] = _SessionLock()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                del self._session_locks[key]
+
+    async def _dispatch(self, msg: InboundMessage) -> None:
+        """Handle a consumed message and release its bus scheduling slot."""
+        try:
+            await self._handle_message(msg)
+        finally:
+            await self.bus.task_done(msg, self._consumer)
 
     async def _handle_message(self, msg: InboundMessage) -> None:
         """Handle a single message with per-session serialization."""
-        # Accept handoff messages targeted at this agent's channels
-        effective_channel = msg.channel
-        if msg.channel.startswith("handoff:") and self.channels:
-            target = msg.channel.split(":", 1)[1]
-            if target in self.channels or target == getattr(self, 'entity', None):
-                effective_channel = msg.metadata.get("origin_channel", msg.channel)
-                msg = InboundMessage(
-                    channel=effective_channel, sender_id=msg.sender_id,
-                    chat_id=msg.chat_id, content=msg.content,
-                    media=msg.media, metadata=msg.metadata,
-                )
-
-        # Skip messages from channels this agent doesn't serve
-        if self.channels and msg.channel not in self.channels and msg.channel != "system":
-            # Re-queue so another agent can pick it up
-            await self.bus.publish_inbound(msg)
-            return
+        # Handoffs are routed here by the bus; continue on the origin channel
+        if msg.channel.startswith("handoff:"):
+            msg = InboundMessage(
+                channel=msg.metadata.get("origin_channel", msg.channel), sender_id=msg.sender_id,
+                chat_id=msg.chat_id, content=msg.content,
+                media=msg.media, metadata=msg.metadata,
+            )
 
-        lock = self._session_locks.setdefault(msg.session_key, asyncio.Lock())
-        async with lock:
+        async with self._session_lock(msg.session_key):
+            streamed = 0
             try:
                 # Skip LLM when template is provided (e.g., boleta_emitida)
                 template_content = msg.metadata.get("template_sugerido")
@@ -204,7 +307,21 @@ class AgentLoop:
                         metadata=msg.metadata,
                     )
                 else:
-                    response = await self._process_message(msg)
+                    # With streaming, completed ||| chunks go out while the
+                    # model is still generating; the response holds the rest
+                    async def publish_chunk(text: str) -> None:
+                        nonlocal streamed
+                        streamed += 1
+                        await self.bus.publish_outbound(OutboundMessage(
+                            channel=msg.metadata.get("reply_channel", msg.channel),
+                            chat_id=msg.chat_id,
+                            content=text,
+                            metadata=msg.metadata,
+                        ))
+
+                    response = await self._process_message(
+                        msg, on_chunk=publish_chunk if self.streaming else None,
+                    )
 
                 if response:
                     chunks = _split_chunks(response.content)
@@ -227,6 +344,10 @@ class AgentLoop:
                         except Exception as e:
                             logger.error("Failed to decode PDF base64: {}", e)
 
+                    if streamed and not response.content:
+                        # Everything was streamed already; only media is left
+                        chunks = [""] if media_list else []
+
                     for i, chunk in enumerate(chunks):
                         if i > 0:
                             await asyncio.sleep(0.8)
@@ -250,19 +371,35 @@ class AgentLoop:
     
     def stop(self) -> None:
         """Stop the agent loop and clean up scratch directory."""
-        self._running = False
+        if self._stop_requested is not None:
+            self._stop_requested.set()  # run() queues held bursts, then stops the workers
+        else:
+            self._running = False
         shutil.rmtree(self._scratch_dir, ignore_errors=True)
         logger.info("Agent loop stopping")
+
+    async def close(self) -> None:
+        """Stop the loop and persist any session saves still pending."""
+        self.stop()
+        await self._cancel_consolidations()
+        await self.sessions.close()
     
-    async def _process_message(self, msg: InboundMessage) -> OutboundMessage | None:
+    async def _process_message(
+        self,
+        msg: InboundMessage,
+        on_chunk: Callable[[str], Awaitable[None]] | None = None,
+    ) -> OutboundMessage | None:
         """
         Process a single inbound message.
         
         Args:
             msg: The inbound message to process.
+            on_chunk: If set, the LLM response is streamed and each completed
+                ||| chunk is passed here as soon as it is generated.
         
         Returns:
-            The response message, or None if no response needed.
+            The response message, or None if no response needed. When chunks
+            were streamed, its content only holds the chunks not yet sent.
         """
         # Handle system messages (subagent announces)
         # The chat_id contains the original "channel:chat_id" to route back to
@@ -299,7 +436,7 @@ class AgentLoop:
 
         # Build initial messages (use get_history for LLM-formatted messages)
         messages = self.context.build_messages(
-            history=session.get_history(),
+            history=self._history(session),
             current_message=msg.content,
             media=msg.media if msg.media else None,
             channel=msg.channel,
@@ -307,29 +444,28 @@ class AgentLoop:
             customer_context=customer_context,
         )
         
+        # Tool schemas are fixed for the turn (exclude message tool for
+        # crm_event to force a direct response)
+        tool_defs = self.tools.get_definitions()
+        if msg.channel == "crm_event":
+            tool_defs = [t for t in tool_defs if t.get("function", {}).get("name") != "message"]
+
         # Agent loop
         iteration = 0
         final_content = None
+        streamed: list[str] = []  # chunks of the current LLM response already sent
+        interim: list[str] = []  # chunks sent from responses that went on to call tools
         
         while iteration < self.max_iterations:
             iteration += 1
+            streamed.clear()
             
-            # Call LLM (exclude message tool for crm_event to force direct response)
-            tool_defs = self.tools.get_definitions()
-            if msg.channel == "crm_event":
-                tool_defs = [t for t in tool_defs if t.get("function", {}).get("name") != "message"]
-
-            response = await self.provider.chat(
-                messages=messages,
-                tools=tool_defs,
-                model=self.model,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                thinking=self.thinking,
-            )
+            # Call LLM
+            response = await self._chat(messages, tool_defs, on_chunk, streamed)
             
             # Handle tool calls
             if response.has_tool_calls:
+                interim.extend(streamed)
                 # Add assistant message with tool calls
                 tool_call_dicts = [
                     {
@@ -346,13 +482,14 @@ class AgentLoop:
                     messages, response.content, tool_call_dicts
                 )
                 
-                # Execute tools (pass request_ctx for session-aware tools)
-                for tool_call in response.tool_calls:
-                    args_str = json.dumps(tool_call.arguments)
-                    logger.debug(f"Executing tool: {tool_call.name} with arguments: {args_str}")
-                    result = await self.tools.execute(
-                        tool_call.name, tool_call.arguments, ctx=request_ctx
-                    )
+                # Execute tools (pass request_ctx for session-aware tools);
+                # independent read-only calls run concurrently
+                results = await self.tools.execute_batch(
+                    [(tc.name, tc.arguments) for tc in response.tool_calls],
+                    ctx=request_ctx,
+                    max_parallel=self.max_parallel_tools,
+                )
+                for tool_call, result in zip(response.tool_calls, results):
                     messages = self.context.add_tool_result(
                         messages, tool_call.id, tool_call.name, result
                     )
@@ -364,18 +501,143 @@ class AgentLoop:
         if final_content is None:
             final_content = "I've completed processing but have no response to give."
         
-        # Save to session
+        # Save to session, including interim chunks the user already received
         session.add_message("user", msg.content)
-        session.add_message("assistant", final_content)
+        session.add_message("assistant", "|||".join([*interim, final_content]))
         await self.sessions.save(session)
+        self._schedule_consolidation(session)
+
+        content = final_content
+        if streamed:
+            # Drop the leading chunks already delivered while streaming
+            chunks = _split_chunks(final_content)
+            sent = 0
+            while sent < min(len(chunks), len(streamed)) and chunks[sent] == streamed[sent]:
+                sent += 1
+            content = "|||".join(chunks[sent:])
         
         out_channel = msg.metadata.get("reply_channel", msg.channel)
         return OutboundMessage(
             channel=out_channel,
             chat_id=msg.chat_id,
-            content=final_content,
+            content=content,
             metadata=msg.metadata,
         )
+
+    async def _chat(
+        self,
+        messages: list[dict[str, Any]],
+        tool_defs: list[dict[str, Any]],
+        on_chunk: Callable[[str], Awaitable[None]] | None,
+        streamed: list[str],
+    ) -> LLMResponse:
+        """Call the LLM, streaming completed ||| chunks to ``on_chunk`` if given.
+
+        Chunks are only flushed until the first tool-call fragment arrives;
+        each one sent is recorded in ``streamed``. Text the model writes
+        before calling tools (e.g. "let me check your order") therefore
+        reaches the user while the tools run, which non-streaming mode never
+        sends; ``_process_message`` keeps it in the saved reply.
+        """
+        kwargs = dict(
+            messages=messages,
+            tools=tool_defs,
+            model=self.model,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            thinking=self.thinking,
+        )
+        if on_chunk is None:
+            async with self.provider.inflight():
+                response = await self.provider.chat(**kwargs)
+            self._record_usage(response.usage)
+            return response
+
+        buffer = ""
+        calling_tools = False
+        response: LLMResponse | None = None
+        async with self.provider.inflight():
+            async for chunk in self.provider.chat_stream(**kwargs):
+                if chunk.tool_call is not None:
+                    calling_tools = True
+                if chunk.content and not calling_tools:
+                    buffer += chunk.content
+                    while "|||" in buffer:
+                        piece, buffer = buffer.split("|||", 1)
+                        if piece.strip():
+                            streamed.append(piece.strip())
+                            await on_chunk(piece.strip())
+                if chunk.response is not None:
+                    response = chunk.response
+        if response is None:
+            return LLMResponse(content=None, finish_reason="error")
+        self._record_usage(response.usage)
+        return response
+
+    def _history(self, session: Session) -> list[dict[str, Any]]:
+        """Session history for the prompt, within the token budget if one is set."""
+        return session.get_history(
+            max_tokens=self.history_max_tokens or None,
+            count_tokens=self._count_tokens,
+            include_summary=True,
+        )
+
+    def _needs_consolidation(self, session: Session) -> bool:
+        """Whether the unconsolidated tail crossed the message or token threshold."""
+        pending = session.messages[session.last_consolidated:]
+        if len(pending) <= self.consolidate_keep_messages:
+            return False
+        if self.consolidate_after_messages and len(pending) >= self.consolidate_after_messages:
+            return True
+        if self.consolidate_after_tokens:
+            tokens = sum(count_message_tokens(m, self._count_tokens) for m in pending)
+            return tokens >= self.consolidate_after_tokens
+        return False
+
+    def _schedule_consolidation(self, session: Session) -> None:
+        """Fold old messages into the summary in the background, outside the session lock."""
+        if session.key in self._consolidations or not self._needs_consolidation(session):
+            return
+        task = asyncio.create_task(self._consolidate(session))
+        self._consolidations[session.key] = task
+        task.add_done_callback(lambda _: self._consolidations.pop(session.key, None))
+
+    async def _consolidate(self, session: Session) -> None:
+        async with self._consolidation_slots:
+            done = await self.context.memory.consolidate(
+                session, self.provider, self.model,
+                memory_window=2 * self.consolidate_keep_messages,
+            )
+        if not done:
+            return
+        # Persist unless the session was evicted meanwhile (a reloaded copy may be
+        # newer); its next turn triggers a fresh consolidation
+        if self.sessions.peek(session.key) is session:
+            await self.sessions.save(session)
+
+    async def _cancel_consolidations(self) -> None:
+        tasks = list(self._consolidations.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        """Share of prompt tokens served from the provider's prefix cache so far."""
+        return self._cache_read_tokens / self._prompt_tokens if self._prompt_tokens else 0.0
+
+    def _record_usage(self, usage: dict[str, int]) -> None:
+        prompt = usage.get("prompt_tokens") or 0
+        if not prompt:
+            return
+        cached = usage.get("cache_read_tokens", 0)
+        self._prompt_tokens += prompt
+        self._cache_read_tokens += cached
+        logger.debug(
+            "Prompt cache: {}/{} tokens cached ({:.0%}), {:.0%} overall, {} written",
+            cached, prompt, cached / prompt, self.cache_hit_ratio, usage.get("cache_write_tokens", 0),
+        )
     
     async def _process_system_message(self, msg: InboundMessage) -> OutboundMessage | None:
         """
@@ -418,27 +680,30 @@ class AgentLoop:
         
         # Build messages with the announce content
         messages = self.context.build_messages(
-            history=session.get_history(),
+            history=self._history(session),
             current_message=msg.content,
             channel=origin_channel,
             chat_id=origin_chat_id,
         )
         
         # Agent loop (limited for announce handling)
+        tool_defs = self.tools.get_definitions()
         iteration = 0
         final_content = None
         
         while iteration < self.max_iterations:
             iteration += 1
             
-            response = await self.provider.chat(
-                messages=messages,
-                tools=self.tools.get_definitions(),
-                model=self.model,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                thinking=self.thinking,
-            )
+            async with self.provider.inflight():
+                response = await self.provider.chat(
+                    messages=messages,
+                    tools=tool_defs,
+                    model=self.model,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                    thinking=self.thinking,
+                )
+            self._record_usage(response.usage)
             
             if response.has_tool_calls:
                 tool_call_dicts = [
@@ -456,12 +721,12 @@ class AgentLoop:
                     messages, response.content, tool_call_dicts
                 )
                 
-                for tool_call in response.tool_calls:
-                    args_str = json.dumps(tool_call.arguments)
-                    logger.debug(f"Executing tool: {tool_call.name} with arguments: {args_str}")
-                    result = await self.tools.execute(
-                        tool_call.name, tool_call.arguments, ctx=request_ctx
-                    )
+                results = await self.tools.execute_batch(
+                    [(tc.name, tc.arguments) for tc in response.tool_calls],
+                    ctx=request_ctx,
+                    max_parallel=self.max_parallel_tools,
+                )
+                for tool_call, result in zip(response.tool_calls, results):
                     messages = self.context.add_tool_result(
                         messages, tool_call.id, tool_call.name, result
                     )
@@ -476,6 +741,7 @@ class AgentLoop:
         session.add_message("user", f"[System: {msg.sender_id}] {msg.content}")
         session.add_message("assistant", final_content)
         await self.sessions.save(session)
+        self._schedule_consolidation(session)
         
         return OutboundMessage(
             channel=origin_channel,
@@ -2,12 +2,15 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
+import sqlite3
 from pathlib import Path
 from typing import TYPE_CHECKING
 
 from loguru import logger
 
+from nanobot.agent.history_index import HistoryIndex
 from nanobot.utils.helpers import ensure_dir
 
 if TYPE_CHECKING:
@@ -27,12 +30,19 @@ _SAVE_MEMORY_TOOL = [
                     "history_entry": {
                         "type": "string",
                         "description": "A paragraph (2-5 sentences) summarizing key events/decisions/topics. "
-                        "Start with [YYYY-MM-DD HH:MM]. Include detail useful for grep search.",
+                        "Start with [YYYY-MM-DD HH:MM]. Include detail useful for keyword search.",
                     },
                     "memory_update": {
                         "type": "string",
                         "description": "Full updated long-term memory as markdown. Include all existing "
-                        "facts plus new ones. Return unchanged if nothing new.",
+                        "facts plus new ones. Return unchanged if nothing new. It is shared by every "
+                        "conversation: never add one customer's personal details (put those in "
+                        "conversation_summary).",
+                    },
+                    "conversation_summary": {
+                        "type": "string",
+                        "description": "Concise summary of this whole conversation so far (the previous "
+                        "summary plus the processed messages): what the user wants, decisions, open items.",
                     },
                 },
                 "required": ["history_entry", "memory_update"],
@@ -42,13 +52,23 @@ _SAVE_MEMORY_TOOL = [
 ]
 
 
+# Consolidation rounds read MEMORY.md, ask the LLM and rewrite it; rounds of
+# other chats (or other agents of the same entity) must not interleave
+_memory_locks: dict[Path, asyncio.Lock] = {}
+
+
+def _memory_lock(memory_dir: Path) -> asyncio.Lock:
+    return _memory_locks.setdefault(memory_dir.resolve(), asyncio.Lock())
+
+
 class MemoryStore:
-    """Two-layer memory: MEMORY.md (long-term facts) + HISTORY.md (grep-searchable log)."""
+    """Two-layer memory: MEMORY.md (long-term facts) + HISTORY.md (indexed, searchable log)."""
 
     def __init__(self, workspace: Path):
         self.memory_dir = ensure_dir(workspace / "memory")
         self.memory_file = self.memory_dir / "MEMORY.md"
         self.history_file = self.memory_dir / "HISTORY.md"
+        self.history_index = HistoryIndex(self.history_file, self.memory_dir / "history.db")
 
     def read_long_term(self) -> str:
         if self.memory_file.exists():
@@ -61,6 +81,11 @@ class MemoryStore:
     def append_history(self, entry: str) -> None:
         with open(self.history_file, "a", encoding="utf-8") as f:
             f.write(entry.rstrip() + "\n\n")
+        try:
+            self.history_index.sync()
+        except sqlite3.Error as e:
+            # The log itself is written; search_history catches up on its next sync
+            logger.warning("Failed to index HISTORY.md: {}", e)
 
     def get_memory_context(self) -> str:
         long_term = self.read_long_term()
@@ -74,21 +99,30 @@ class MemoryStore:
         *,
         archive_all: bool = False,
         memory_window: int = 50,
-    ) -> None:
-        """Consolidate old messages into MEMORY.md + HISTORY.md via LLM tool call."""
+    ) -> bool:
+        """
+        Consolidate old messages into MEMORY.md + HISTORY.md via LLM tool call.
+
+        Also refreshes the rolling ``session.metadata["summary"]``. Messages
+        appended while the LLM call runs are left for the next round.
+
+        Returns:
+            True if messages were consolidated.
+        """
         if archive_all:
-            old_messages = session.messages
-            keep_count = 0
+            end = len(session.messages)
+            old_messages = session.messages[:end]
             logger.info("Memory consolidation (archive_all): {} messages", len(session.messages))
         else:
             keep_count = memory_window // 2
             if len(session.messages) <= keep_count:
-                return
+                return False
             if len(session.messages) - session.last_consolidated <= 0:
-                return
-            old_messages = session.messages[session.last_consolidated:-keep_count]
+                return False
+            end = len(session.messages) - keep_count
+            old_messages = session.messages[session.last_consolidated:end]
             if not old_messages:
-                return
+                return False
             logger.info("Memory consolidation: {} to consolidate, {} keep", len(old_messages), keep_count)
 
         lines = []
@@ -98,41 +132,55 @@ class MemoryStore:
             tools = f" [tools: {', '.join(m['tools_used'])}]" if m.get("tools_used") else ""
             lines.append(f"[{m.get('timestamp', '?')[:16]}] {m['role'].upper()}{tools}: {m['content']}")
 
-        current_memory = self.read_long_term()
-        prompt = f"""Process this conversation and call the save_memory tool with your consolidation.
+        # Held across read, LLM call and rewrite: MEMORY.md is shared by every chat
+        async with _memory_lock(self.memory_dir):
+            current_memory = self.read_long_term()
+            previous_summary = session.metadata.get("summary", "")
+            prompt = f"""Process this conversation and call the save_memory tool with your consolidation.
 
 ## Current Long-term Memory
 {current_memory or "(empty)"}
 
+## Summary of the Conversation Before These Messages
+{previous_summary or "(none)"}
+
 ## Conversation to Process
 {chr(10).join(lines)}"""
 
-        try:
-            response = await provider.chat(
-                messages=[
-                    {"role": "system", "content": "You are a memory consolidation agent. Call the save_memory tool with your consolidation of the conversation."},
-                    {"role": "user", "content": prompt},
-                ],
-                tools=_SAVE_MEMORY_TOOL,
-                model=model,
-            )
-
-            if not response.has_tool_calls:
-                logger.warning("Memory consolidation: LLM did not call save_memory, skipping")
-                return
-
-            args = response.tool_calls[0].arguments
-            if entry := args.get("history_entry"):
-                if not isinstance(entry, str):
-                    entry = json.dumps(entry, ensure_ascii=False)
-                self.append_history(entry)
-            if update := args.get("memory_update"):
-                if not isinstance(update, str):
-                    update = json.dumps(update, ensure_ascii=False)
-                if update != current_memory:
-                    self.write_long_term(update)
-
-            session.last_consolidated = 0 if archive_all else len(session.messages) - keep_count
-            logger.info("Memory consolidation done: {} messages, last_consolidated={}", len(session.messages), session.last_consolidated)
-        except Exception as e:
-            logger.error("Memory consolidation failed: {}", e)
+            try:
+                async with provider.inflight():
+                    response = await provider.chat(
+                        messages=[
+                            {"role": "system", "content": "You are a memory consolidation agent. Call the save_memory tool with your consolidation of the conversation."},
+                            {"role": "user", "content": prompt},
+                        ],
+                        tools=_SAVE_MEMORY_TOOL,
+                        model=model,
+                    )
+
+                if not response.has_tool_calls:
+                    logger.warning("Memory consolidation: LLM did not call save_memory, skipping")
+                    return False
+
+                args = response.tool_calls[0].arguments
+                if entry := args.get("history_entry"):
+                    if not isinstance(entry, str):
+                        entry = json.dumps(entry, ensure_ascii=False)
+                    self.append_history(entry)
+                if update := args.get("memory_update"):
+                    if not isinstance(update, str):
+                        update = json.dumps(update, ensure_ascii=False)
+                    if update != current_memory:
+                        self.write_long_term(update)
+                summary = args.get("conversation_summary")
+                if isinstance(summary, str) and summary.strip():
+                    session.metadata["summary"] = summary.strip()
+                elif entry:
+                    session.metadata["summary"] = "\n\n".join(filter(None, [previous_summary, entry]))
+
+                session.last_consolidated = 0 if archive_all else end
+                logger.info("Memory consolidation done: {} messages, last_consolidated={}", len(session.messages), session.last_consolidated)
+            except Exception as e:
+                logger.error("Memory consolidation failed: {}", e)
+                return False
+            return True
@@ -4,28 +4,140 @@ import json
 import os
 import re
 import shutil
+import time
+from dataclasses import dataclass
 from pathlib import Path
 
 # Default builtin skills directory (relative to this file)
 BUILTIN_SKILLS_DIR = Path(__file__).parent.parent / "skills"
 
 
+@dataclass
+class _Skill:
+    """A catalogued skill: SKILL.md parsed once per change."""
+
+    name: str
+    path: Path
+    source: str  # agent | workspace | builtin
+    content: str  # raw SKILL.md
+    body: str  # content without frontmatter
+    frontmatter: dict | None
+    meta: dict  # nanobot/openclaw metadata from the frontmatter
+    available: bool
+    missing: str  # human-readable unmet requirements
+
+
 class SkillsLoader:
     """
     Loader for agent skills.
     
     Skills are markdown files (SKILL.md) that teach the agent how to use
     specific tools or perform certain tasks.
+
+    All SKILL.md files are parsed into an in-memory catalog (frontmatter,
+    availability, stripped body). The catalog is revalidated against the
+    skill directories' mtimes at most every ``revalidate_interval_s`` seconds
+    and rebuilt only when something changed, so prompt assembly does no
+    filesystem work in steady state. ``version`` increments on each rebuild.
     """
     
     def __init__(self, workspace: Path, builtin_skills_dir: Path | None = None,
                  agent_skills_dir: Path | None = None,
-                 allowed_skills: list[str] | None = None):
+                 allowed_skills: list[str] | None = None,
+                 revalidate_interval_s: float = 2.0):
         self.workspace = workspace
         self.agent_skills = agent_skills_dir  # highest priority
         self.workspace_skills = workspace / "skills"  # shared
         self.builtin_skills = builtin_skills_dir or BUILTIN_SKILLS_DIR
         self.allowed_skills = set(allowed_skills) if allowed_skills else None  # None = all
+        self.revalidate_interval_s = revalidate_interval_s
+        self._catalog: dict[str, _Skill] | None = None
+        self._fingerprint: tuple | None = None
+        self._checked_at = 0.0
+        self._version = 0
+        self._summary: str | None = None
+        self._always: list[str] | None = None
+
+    @property
+    def version(self) -> int:
+        """Counter bumped whenever the skill catalog is rebuilt."""
+        self._get_catalog()
+        return self._version
+
+    def invalidate(self) -> None:
+        """Force a rescan on next access (e.g. right after writing a SKILL.md)."""
+        self._checked_at = 0.0
+        self._fingerprint = None
+
+    def _roots(self) -> list[tuple[Path, str]]:
+        """Skill directories in priority order."""
+        roots = []
+        if self.agent_skills:
+            roots.append((self.agent_skills, "agent"))
+        roots.append((self.workspace_skills, "workspace"))
+        if self.builtin_skills:
+            roots.append((self.builtin_skills, "builtin"))
+        return roots
+
+    def _scan_fingerprint(self) -> tuple:
+        """Modification times of the skill roots, skill dirs and SKILL.md files."""
+        stamps = []
+        for root, _ in self._roots():
+            if not root.is_dir():
+                stamps.append((str(root), 0))
+                continue
+            stamps.append((str(root), root.stat().st_mtime_ns))
+            for skill_file in sorted(root.glob("*/SKILL.md")):
+                try:
+                    stamps.append((str(skill_file), skill_file.stat().st_mtime_ns))
+                except OSError:
+                    continue
+        return tuple(stamps)
+
+    def _get_catalog(self) -> dict[str, _Skill]:
+        """Return the skill catalog, rebuilding it if the skill files changed."""
+        now = time.monotonic()
+        if self._catalog is not None and now - self._checked_at < self.revalidate_interval_s:
+            return self._catalog
+        self._checked_at = now
+
+        fingerprint = self._scan_fingerprint()
+        if self._catalog is None or fingerprint != self._fingerprint:
+            self._catalog = self._build_catalog()
+            self._fingerprint = fingerprint
+            self._version += 1
+            self._summary = None
+            self._always = None
+        return self._catalog
+
+    def _build_catalog(self) -> dict[str, _Skill]:
+        """Read and parse every SKILL.md (first root wins on name clashes)."""
+        catalog: dict[str, _Skill] = {}
+        for root, source in self._roots():
+            if not root.is_dir():
+                continue
+            for skill_dir in sorted(root.iterdir()):
+                skill_file = skill_dir / "SKILL.md"
+                if skill_dir.name in catalog or not skill_file.is_file():
+                    continue
+                try:
+                    content = skill_file.read_text(encoding="utf-8")
+                except OSError:
+                    continue
+                frontmatter = self._parse_frontmatter(content)
+                meta = self._parse_nanobot_metadata((frontmatter or {}).get("metadata", ""))
+                catalog[skill_dir.name] = _Skill(
+                    name=skill_dir.name,
+                    path=skill_file,
+                    source=source,
+                    content=content,
+                    body=self._strip_frontmatter(content),
+                    frontmatter=frontmatter,
+                    meta=meta,
+                    available=self._check_requirements(meta),
+                    missing=self._get_missing_requirements(meta),
+                )
+        return catalog
     
     def list_skills(self, filter_unavailable: bool = True) -> list[dict[str, str]]:
         """
@@ -37,40 +149,13 @@ class SkillsLoader:
         Returns:
             List of skill info dicts with 'name', 'path', 'source'.
         """
-        skills = []
-
-        # Agent-specific skills (highest priority)
-        if self.agent_skills and self.agent_skills.exists():
-            for skill_dir in self.agent_skills.iterdir():
-                if skill_dir.is_dir():
-                    skill_file = skill_dir / "SKILL.md"
-                    if skill_file.exists():
-                        skills.append({"name": skill_dir.name, "path": str(skill_file), "source": "agent"})
-
-        # Shared workspace skills
-        if self.workspace_skills.exists():
-            for skill_dir in self.workspace_skills.iterdir():
-                if skill_dir.is_dir():
-                    skill_file = skill_dir / "SKILL.md"
-                    if skill_file.exists():
-                        skills.append({"name": skill_dir.name, "path": str(skill_file), "source": "workspace"})
-        
-        # Built-in skills
-        if self.builtin_skills and self.builtin_skills.exists():
-            for skill_dir in self.builtin_skills.iterdir():
-                if skill_dir.is_dir():
-                    skill_file = skill_dir / "SKILL.md"
-                    if skill_file.exists() and not any(s["name"] == skill_dir.name for s in skills):
-                        skills.append({"name": skill_dir.name, "path": str(skill_file), "source": "builtin"})
-        
-        # Filter by allowed_skills whitelist (None = all)
-        if self.allowed_skills is not None:
-            skills = [s for s in skills if s["name"] in self.allowed_skills]
-
-        # Filter by requirements
-        if filter_unavailable:
-            return [s for s in skills if self._check_requirements(self._get_skill_meta(s["name"]))]
-        return skills
+        return [
+            {"name": skill.name, "path": str(skill.path), "source": skill.source}
+            for skill in self._get_catalog().values()
+            # Filter by allowed_skills whitelist (None = all) and by requirements
+            if (self.allowed_skills is None or skill.name in self.allowed_skills)
+            and (skill.available or not filter_unavailable)
+        ]
     
     def load_skill(self, name: str) -> str | None:
         """
@@ -82,24 +167,8 @@ class SkillsLoader:
         Returns:
             Skill content or None if not found.
         """
-        # Check agent-specific first
-        if self.agent_skills:
-            agent_skill = self.agent_skills / name / "SKILL.md"
-            if agent_skill.exists():
-                return agent_skill.read_text(encoding="utf-8")
-
-        # Check shared workspace
-        workspace_skill = self.workspace_skills / name / "SKILL.md"
-        if workspace_skill.exists():
-            return workspace_skill.read_text(encoding="utf-8")
-        
-        # Check built-in
-        if self.builtin_skills:
-            builtin_skill = self.builtin_skills / name / "SKILL.md"
-            if builtin_skill.exists():
-                return builtin_skill.read_text(encoding="utf-8")
-        
-        return None
+        skill = self._get_catalog().get(name)
+        return skill.content if skill else None
     
     def load_skills_for_context(self, skill_names: list[str]) -> str:
         """
@@ -111,12 +180,12 @@ class SkillsLoader:
         Returns:
             Formatted skills content.
         """
+        catalog = self._get_catalog()
         parts = []
         for name in skill_names:
-            content = self.load_skill(name)
-            if content:
-                content = self._strip_frontmatter(content)
-                parts.append(f"### Skill: {name}\n\n{content}")
+            skill = catalog.get(name)
+            if skill and skill.content:
+                parts.append(f"### Skill: {name}\n\n{skill.body}")
         
         return "\n\n---\n\n".join(parts) if parts else ""
     
@@ -130,8 +199,13 @@ class SkillsLoader:
         Returns:
             XML-formatted skills summary.
         """
+        catalog = self._get_catalog()
+        if self._summary is not None:
+            return self._summary
+
         all_skills = self.list_skills(filter_unavailable=False)
         if not all_skills:
+            self._summary = ""
             return ""
         
         def escape_xml(s: str) -> str:
@@ -139,27 +213,24 @@ class SkillsLoader:
         
         lines = ["<skills>"]
         for s in all_skills:
-            name = escape_xml(s["name"])
-            path = s["path"]
-            desc = escape_xml(self._get_skill_description(s["name"]))
-            skill_meta = self._get_skill_meta(s["name"])
-            available = self._check_requirements(skill_meta)
+            skill = catalog[s["name"]]
+            name = escape_xml(skill.name)
+            desc = escape_xml((skill.frontmatter or {}).get("description") or skill.name)
             
-            lines.append(f"  <skill available=\"{str(available).lower()}\">")
+            lines.append(f"  <skill available=\"{str(skill.available).lower()}\">")
             lines.append(f"    <name>{name}</name>")
             lines.append(f"    <description>{desc}</description>")
-            lines.append(f"    <location>{path}</location>")
+            lines.append(f"    <location>{skill.path}</location>")
             
             # Show missing requirements for unavailable skills
-            if not available:
-                missing = self._get_missing_requirements(skill_meta)
-                if missing:
-                    lines.append(f"    <requires>{escape_xml(missing)}</requires>")
+            if not skill.available and skill.missing:
+                lines.append(f"    <requires>{escape_xml(skill.missing)}</requires>")
             
             lines.append(f"  </skill>")
         lines.append("</skills>")
         
-        return "\n".join(lines)
+        self._summary = "\n".join(lines)
+        return self._summary
     
     def _get_missing_requirements(self, skill_meta: dict) -> str:
         """Get a description of missing requirements."""
@@ -208,19 +279,20 @@ class SkillsLoader:
         return True
     
     def _get_skill_meta(self, name: str) -> dict:
-        """Get nanobot metadata for a skill (cached in frontmatter)."""
-        meta = self.get_skill_metadata(name) or {}
-        return self._parse_nanobot_metadata(meta.get("metadata", ""))
+        """Get nanobot metadata for a skill (parsed from its frontmatter)."""
+        skill = self._get_catalog().get(name)
+        return skill.meta if skill else {}
     
     def get_always_skills(self) -> list[str]:
         """Get skills marked as always=true that meet requirements."""
-        result = []
-        for s in self.list_skills(filter_unavailable=True):
-            meta = self.get_skill_metadata(s["name"]) or {}
-            skill_meta = self._parse_nanobot_metadata(meta.get("metadata", ""))
-            if skill_meta.get("always") or meta.get("always"):
-                result.append(s["name"])
-        return result
+        catalog = self._get_catalog()
+        if self._always is None:
+            self._always = [
+                s["name"] for s in self.list_skills(filter_unavailable=True)
+                if catalog[s["name"]].meta.get("always")
+                or (catalog[s["name"]].frontmatter or {}).get("always")
+            ]
+        return list(self._always)
     
     def get_skill_metadata(self, name: str) -> dict | None:
         """
@@ -232,10 +304,12 @@ class SkillsLoader:
         Returns:
             Metadata dict or None.
         """
-        content = self.load_skill(name)
-        if not content:
-            return None
-        
+        skill = self._get_catalog().get(name)
+        return dict(skill.frontmatter) if skill and skill.frontmatter is not None else None
+
+    @staticmethod
+    def _parse_frontmatter(content: str) -> dict | None:
+        """Parse the simple ``key: value`` YAML frontmatter of a SKILL.md."""
         if content.startswith("---"):
             match = re.match(r"^---\n(.*?)\n---", content, re.DOTALL)
             if match:
@@ -20,6 +20,10 @@ class Tool(ABC):
         "array": list,
         "object": dict,
     }
+
+    # Side-effect-free tools may run concurrently with the other safe calls
+    # of the same assistant turn; all other tools run serially, in order.
+    concurrency_safe: bool = False
     
     @property
     @abstractmethod
@@ -48,6 +48,7 @@ class CuidadoTextilTool(Tool):
         self._refs = Path(references_dir)
 
     name = "consulta_cuidado"
+    concurrency_safe = True
     description = (
         "Consulta guías de cuidado textil. Parámetros opcionales: "
         "prenda (tipo de tela/prenda) y mancha (tipo de mancha). "
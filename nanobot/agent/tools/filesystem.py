@@ -9,6 +9,8 @@ from nanobot.agent.tools.base import Tool
 class ReadFileTool(Tool):
     """Tool to read file contents."""
 
+    concurrency_safe = True
+
     def __init__(self, base_dir: str | None = None):
         self._base_dir = Path(base_dir).resolve() if base_dir else None
 
@@ -165,6 +167,8 @@ class EditFileTool(Tool):
 
 class ListDirTool(Tool):
     """Tool to list directory contents."""
+
+    concurrency_safe = True
     
     @property
     def name(self) -> str:
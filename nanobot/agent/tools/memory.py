@@ -0,0 +1,77 @@
+"""Memory tools: search_history."""
+
+import asyncio
+import re
+import sqlite3
+from typing import TYPE_CHECKING, Any
+
+from nanobot.agent.tools.base import Tool
+
+if TYPE_CHECKING:
+    from nanobot.agent.memory import MemoryStore
+
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}( \d{2}:\d{2})?$")
+_TERM = re.compile(r"\w")
+MAX_OUTPUT_CHARS = 8000
+
+
+class SearchHistoryTool(Tool):
+    """Search the memory/HISTORY.md event log through its full-text index."""
+
+    name = "search_history"
+    concurrency_safe = True
+    description = (
+        "Search past events in memory/HISTORY.md by keywords and/or date range. "
+        "Returns only the matching entries, newest first."
+    )
+    parameters = {
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "Keywords that must all appear (case and accents ignored)",
+            },
+            "since": {"type": "string", "description": "Earliest date, YYYY-MM-DD or YYYY-MM-DD HH:MM"},
+            "until": {"type": "string", "description": "Latest date (inclusive), YYYY-MM-DD or YYYY-MM-DD HH:MM"},
+            "limit": {"type": "integer", "description": "Entries (1-50)", "minimum": 1, "maximum": 50},
+        },
+    }
+
+    def __init__(self, memory: "MemoryStore"):
+        self._memory = memory
+
+    async def execute(
+        self,
+        query: str = "",
+        since: str = "",
+        until: str = "",
+        limit: int = 10,
+        **kwargs: Any,
+    ) -> str:
+        if not (_TERM.search(query) or since or until):
+            return "Error: provide a query (words or numbers), a date range, or both"
+        for label, value in (("since", since), ("until", until)):
+            if value and not _DATE.match(value):
+                return f"Error: {label} must be YYYY-MM-DD or YYYY-MM-DD HH:MM, got '{value}'"
+
+        try:
+            entries = await asyncio.to_thread(
+                self._memory.history_index.search,
+                query, since or None, until or None, min(max(limit, 1), 50),
+            )
+        except sqlite3.Error as e:
+            return f"Error: history index unavailable ({e}); grep memory/HISTORY.md instead"
+        if not entries:
+            return "No matching history entries."
+
+        out, size = [], 0
+        for entry in entries:
+            if size + len(entry) > MAX_OUTPUT_CHARS:
+                if not out:  # a single entry larger than the whole budget
+                    out.append(entry[:MAX_OUTPUT_CHARS] + "\n... (entry truncated)")
+                if len(entries) > len(out):
+                    out.append(f"... {len(entries) - len(out)} more entries; narrow the search")
+                break
+            out.append(entry)
+            size += len(entry)
+        return "\n\n".join(out)
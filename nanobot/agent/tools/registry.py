@@ -1,7 +1,11 @@
 """Tool registry for dynamic tool management."""
 
+import asyncio
+import json
 from typing import Any
 
+from loguru import logger
+
 from nanobot.agent.tools.base import Tool
 
 
@@ -9,19 +13,31 @@ class ToolRegistry:
     """
     Registry for agent tools.
     
-    Allows dynamic registration and execution of tools.
+    Allows dynamic registration and execution of tools. Tool schemas are
+    built once per registry version (bumped by register/unregister) and
+    shared between calls, so callers must not mutate them.
     """
     
     def __init__(self):
         self._tools: dict[str, Tool] = {}
+        self._version = 0
+        self._definitions: list[dict[str, Any]] | None = None
+        self._definitions_version = -1
     
     def register(self, tool: Tool) -> None:
         """Register a tool."""
         self._tools[tool.name] = tool
+        self._version += 1
     
     def unregister(self, name: str) -> None:
         """Unregister a tool by name."""
-        self._tools.pop(name, None)
+        if self._tools.pop(name, None) is not None:
+            self._version += 1
+
+    @property
+    def version(self) -> int:
+        """Counter bumped whenever the set of tools changes."""
+        return self._version
     
     def get(self, name: str) -> Tool | None:
         """Get a tool by name."""
@@ -32,8 +48,11 @@ class ToolRegistry:
         return name in self._tools
     
     def get_definitions(self) -> list[dict[str, Any]]:
-        """Get all tool definitions in OpenAI format."""
-        return [tool.to_schema() for tool in self._tools.values()]
+        """Get all tool definitions in OpenAI format (cached per registry version)."""
+        if self._definitions is None or self._definitions_version != self._version:
+            self._definitions = [tool.to_schema() for tool in self._tools.values()]
+            self._definitions_version = self._version
+        return self._definitions
     
     async def execute(
         self, name: str, params: dict[str, Any], ctx: dict[str, Any] | None = None
@@ -61,6 +80,53 @@ class ToolRegistry:
         except Exception as e:
             return f"Error executing {name}: {str(e)}"
     
+    async def execute_batch(
+        self,
+        calls: list[tuple[str, dict[str, Any]]],
+        ctx: dict[str, Any] | None = None,
+        max_parallel: int = 4,
+    ) -> list[str]:
+        """
+        Execute the tool calls of one assistant turn.
+
+        Consecutive calls to ``concurrency_safe`` tools run together (at most
+        ``max_parallel`` at a time); any other call waits for the calls before
+        it and blocks the ones after it. Results are returned in call order.
+
+        Args:
+            calls: (name, params) pairs in the order the model issued them.
+            ctx: Optional request context passed to every call.
+            max_parallel: Concurrency cap for safe calls.
+
+        Returns:
+            One result string per call.
+        """
+        results: list[str] = [""] * len(calls)
+        semaphore = asyncio.Semaphore(max(1, max_parallel))
+
+        async def run(i: int) -> None:
+            async with semaphore:
+                name, params = calls[i]
+                logger.debug(
+                    "Executing tool: {} with arguments: {}",
+                    name, json.dumps(params, ensure_ascii=False),
+                )
+                results[i] = await self.execute(name, params, ctx=ctx)
+
+        group: list[int] = []
+        for i, (name, _) in enumerate(calls):
+            tool = self._tools.get(name)
+            if tool is not None and tool.concurrency_safe:
+                group.append(i)
+                continue
+            if group:
+                await asyncio.gather(*(run(j) for j in group))
+                group = []
+            await run(i)
+        if group:
+            await asyncio.gather(*(run(j) for j in group))
+        return results
+
     @property
     def tool_names(self) -> list[str]:
         """Get list of registered tool names."""
@@ -4,11 +4,33 @@ import json
 import os
 from typing import Any
 
+from loguru import logger
+
 from nanobot.agent.tools.base import Tool
+from nanobot.utils.cache import AsyncTTLCache
 
 
 _client_cache = None
 
+# Reference data (catalog, branches) changes a few times a day; slots change
+# as pickups are booked, so they get a much shorter TTL. Both are shared by
+# every agent in the process and flushed by invalidate_reference_cache().
+_catalog_cache = AsyncTTLCache(ttl_s=300.0, stale_s=900.0, negative_ttl_s=30.0)
+_slots_cache = AsyncTTLCache(ttl_s=60.0, stale_s=60.0, negative_ttl_s=15.0)
+# Customers keyed by normalized phone; unknown numbers are retried sooner
+# so a customer registered mid-conversation is found quickly.
+_customer_cache = AsyncTTLCache(ttl_s=300.0, stale_s=300.0, negative_ttl_s=60.0, max_entries=10_000)
+
+_ESTADOS_PEDIDO_ACTIVO = ["registrado", "en_proceso", "terminado", "mensaje_enviado"]
+_pedidos_rpc_missing = False  # set once fn_pedidos_activos_v1 is known to be absent
+
+_INVALIDATION_SCOPES = {
+    "catalogo": [(_catalog_cache, ("servicios",)), (_catalog_cache, ("catalogo",))],
+    "sucursales": [(_catalog_cache, ("sucursal_default",)), (_slots_cache, ())],
+    "horarios": [(_slots_cache, ())],
+    "clientes": [(_customer_cache, ())],
+}
+
 
 async def _get_client():
     """Create and cache async Supabase client lazily."""
@@ -27,10 +49,42 @@ async def _get_client():
     return _client_cache
 
 
+def invalidate_reference_cache(scope: str | None = None) -> int:
+    """
+    Drop cached reference data so the next query hits Supabase.
+
+    Args:
+        scope: "catalogo", "sucursales", "horarios" or "clientes"; None clears
+            everything.
+
+    Returns:
+        Number of entries dropped.
+    """
+    if scope is None:
+        return sum(c.invalidate() for c in (_catalog_cache, _slots_cache, _customer_cache))
+    targets = _INVALIDATION_SCOPES.get(scope)
+    if targets is None:
+        raise ValueError(f"Unknown cache scope: {scope}")
+    return sum(cache.invalidate(prefix) for cache, prefix in targets)
+
+
+def normalize_phone(chat_id: str | None) -> str | None:
+    """WhatsApp JID or phone -> bare digits ('51987654321@s.whatsapp.net' -> '51987654321').
+
+    Returns None for ids that are not phone numbers (CLI, Telegram, ...).
+    """
+    if not chat_id:
+        return None
+    raw = chat_id.split("@")[0]
+    digits = raw.replace("+", "").replace(" ", "").replace("-", "")
+    return digits if digits.isdigit() else None
+
+
 class SupabaseTool(Tool):
     """Query laundry CRM data from Supabase."""
 
     name = "consulta"
+    concurrency_safe = True  # read-only queries
     description = (
         "Consulta datos del negocio de lavanderia. "
         "Acciones: catalogo, mi_pedido, tracking, servicios, horarios."
@@ -63,37 +117,27 @@ class SupabaseTool(Tool):
         "required": ["accion"],
     }
 
-    def __init__(self):
-        self._phone: str | None = None
-        self._cliente_cache: dict | None = None
-        self._cliente_loaded = False
-
-    def set_phone(self, phone: str) -> None:
-        """Set current customer phone from WhatsApp chat_id."""
-        # WhatsApp JID: 51987654321@s.whatsapp.net -> 51987654321
-        raw_phone = phone.split("@")[0] if "@" in phone else phone
-        if raw_phone != self._phone:
-            self._phone = raw_phone
-            self._cliente_cache = None
-            self._cliente_loaded = False
-
     async def build_customer_context(self, chat_id: str) -> str:
         """Build customer context for the system prompt from chat id."""
-        self.set_phone(chat_id)
+        phone = normalize_phone(chat_id)
         db = await _get_client()
-        cliente = await self._get_cliente(db)
+        cliente = await self._get_cliente(db, phone)
 
         name = cliente.get("nombre") if cliente else None
         if not name:
             return ""
 
         return (
-            f"\n## Cliente actual\nNombre: {name}\nTelefono: {self._phone}\n"
+            f"\n## Cliente actual\nNombre: {name}\nTelefono: {phone}\n"
             f"Saluda al cliente por su nombre."
         )
 
     # ------------------------------------------------------------------
     async def execute(self, accion: str, _ctx: dict | None = None, **kwargs: Any) -> str:
+        # The customer is whoever this conversation is with (never a model argument)
+        phone = normalize_phone((_ctx or {}).get("chat_id"))
+        kwargs = {k: v for k, v in kwargs.items() if k in self.parameters["properties"]}
+
         try:
             db = await _get_client()
         except RuntimeError as e:
@@ -111,7 +155,7 @@ class SupabaseTool(Tool):
             return f"Error: accion '{accion}' no reconocida"
 
         try:
-            return await handler(db, **kwargs)
+            return await handler(db, phone, **kwargs)
         except Exception as e:
             return f"Error consultando datos: {e}"
 
@@ -119,15 +163,18 @@ class SupabaseTool(Tool):
     # Acciones
     # ------------------------------------------------------------------
 
-    async def _servicios(self, db, **_) -> str:
+    async def _servicios(self, db, phone: str | None, **_) -> str:
         """Return available service categories."""
-        res = await (
-            db.table("servicios_catalogo")
-            .select("categoria")
-            .eq("activo", True)
-            .execute()
-        )
-        cats = sorted(set(r["categoria"] for r in res.data))
+        async def load() -> list[str]:
+            res = await (
+                db.table("servicios_catalogo")
+                .select("categoria")
+                .eq("activo", True)
+                .execute()
+            )
+            return sorted(set(r["categoria"] for r in res.data))
+
+        cats = await _catalog_cache.get_or_load(("servicios",), load)
         if not cats:
             return "No hay categorias disponibles en este momento."
 
@@ -137,61 +184,57 @@ class SupabaseTool(Tool):
         lines.append("\nPregunta por una categoria para ver precios.")
         return "\n".join(lines)
 
-    async def _catalogo(self, db, categoria: str = "", busqueda: str = "",
+    async def _catalogo(self, db, phone: str | None, categoria: str = "", busqueda: str = "",
                          sucursal_id: str = "", **_) -> str:
         """Return prices filtered by category/search within a branch."""
         # Resolve branch
-        sid = sucursal_id or await self._resolve_sucursal(db)
-
-        query = (
-            db.table("servicios_catalogo")
-            .select("nombre, categoria, precio, unidad, tiempo_estimado_horas")
-            .eq("activo", True)
-        )
-        if sid:
-            query = query.eq("sucursal_id", sid)
-        if categoria:
-            query = query.eq("categoria", categoria.lower())
-        if busqueda:
-            query = query.ilike("nombre", f"%{busqueda}%")
-
-        query = query.order("categoria").order("precio")
-        res = await query.limit(10).execute()
-
-        if not res.data:
+        sid = sucursal_id or await self._resolve_sucursal(db, phone)
+        categoria = categoria.lower()
+        busqueda = busqueda.strip().lower()  # ilike is case-insensitive anyway
+
+        async def load() -> list[dict]:
+            query = (
+                db.table("servicios_catalogo")
+                .select("nombre, categoria, precio, unidad, tiempo_estimado_horas")
+                .eq("activo", True)
+            )
+            if sid:
+                query = query.eq("sucursal_id", sid)
+            if categoria:
+                query = query.eq("categoria", categoria)
+            if busqueda:
+                query = query.ilike("nombre", f"%{busqueda}%")
+
+            query = query.order("categoria").order("precio")
+            res = await query.limit(10).execute()
+            return res.data
+
+        rows = await _catalog_cache.get_or_load(("catalogo", sid, categoria, busqueda), load)
+        if not rows:
             return "No se encontraron servicios con ese filtro."
 
         lines = []
         current_cat = ""
-        for s in res.data:
+        for s in rows:
             if s["categoria"] != current_cat:
                 current_cat = s["categoria"]
                 lines.append(f"\n{current_cat.title()}:")
             tiempo = f" (~{s['tiempo_estimado_horas']}h)" if s.get("tiempo_estimado_horas") else ""
             lines.append(f"  • {s['nombre']}: S/{s['precio']:.2f} por {s['unidad']}{tiempo}")
 
-        total = len(res.data)
+        total = len(rows)
         if total == 10:
             lines.append("\n(Mostrando primeros 10 resultados. Se mas especifico para ver mas.)")
         return "\n".join(lines)
 
-    async def _mi_pedido(self, db, **_) -> str:
+    async def _mi_pedido(self, db, phone: str | None, **_) -> str:
         """Return active orders for the current customer."""
-        cliente = await self._get_cliente(db)
-        if not cliente:
+        data = await self._pedidos_activos(db, phone, with_entregas=False)
+        if not data["cliente"]:
             return "No encontre tu cuenta. Es tu primera vez con nosotros?"
 
-        res = await (
-            db.table("pedidos")
-            .select("codigo, estado, importe, cargo_delivery, created_at, observaciones")
-            .eq("cliente_id", cliente["cliente_id"])
-            .in_("estado", ["registrado", "en_proceso", "terminado", "mensaje_enviado"])
-            .order("created_at", desc=True)
-            .limit(5)
-            .execute()
-        )
-
-        if not res.data:
+        pedidos = data["pedidos"][:5]
+        if not pedidos:
             return "No tienes pedidos activos en este momento."
 
         estado_emoji = {
@@ -203,7 +246,7 @@ class SupabaseTool(Tool):
         }
 
         lines = ["Tus pedidos activos:\n"]
-        for p in res.data:
+        for p in pedidos:
             estado = estado_emoji.get(p["estado"], p["estado"])
             total = (p["importe"] or 0) + (p["cargo_delivery"] or 0)
             lines.append(f"  Pedido {p['codigo']}")
@@ -214,34 +257,14 @@ class SupabaseTool(Tool):
             lines.append("")
         return "\n".join(lines)
 
-    async def _tracking(self, db, **_) -> str:
+    async def _tracking(self, db, phone: str | None, **_) -> str:
         """Return delivery tracking for active orders."""
-        cliente = await self._get_cliente(db)
-        if not cliente:
+        data = await self._pedidos_activos(db, phone, with_entregas=True)
+        if not data["cliente"]:
             return "No encontre tu cuenta."
-
-        # Get active orders with deliveries
-        pedidos = await (
-            db.table("pedidos")
-            .select("codigo")
-            .eq("cliente_id", cliente["cliente_id"])
-            .in_("estado", ["registrado", "en_proceso", "terminado", "mensaje_enviado"])
-            .execute()
-        )
-        if not pedidos.data:
+        if not data["pedidos"]:
             return "No tienes pedidos activos."
-
-        codigos = [p["codigo"] for p in pedidos.data]
-        entregas = await (
-            db.table("entregas")
-            .select("pedido_codigo, tipo, estado, fecha_programada, franja_horaria, estimado_llegada")
-            .in_("pedido_codigo", codigos)
-            .in_("estado", ["pendiente", "asignado", "en_camino"])
-            .order("fecha_programada")
-            .execute()
-        )
-
-        if not entregas.data:
+        if not data["entregas"]:
             return "No hay entregas programadas en este momento."
 
         estado_emoji = {
@@ -251,7 +274,7 @@ class SupabaseTool(Tool):
         }
 
         lines = ["Seguimiento de entregas:\n"]
-        for e in entregas.data:
+        for e in data["entregas"]:
             estado = estado_emoji.get(e["estado"], e["estado"])
             lines.append(f"  Pedido {e['pedido_codigo']} ({e['tipo']})")
             lines.append(f"  Estado: {estado}")
@@ -262,19 +285,25 @@ class SupabaseTool(Tool):
             lines.append("")
         return "\n".join(lines)
 
-    async def _horarios(self, db, sucursal_id: str = "", **_) -> str:
+    async def _horarios(self, db, phone: str | None, sucursal_id: str = "", **_) -> str:
         """Return available pickup/delivery time slots."""
-        sid = sucursal_id or await self._resolve_sucursal(db)
+        sid = sucursal_id or await self._resolve_sucursal(db, phone)
         if not sid:
             return "Necesito saber tu sucursal para mostrarte horarios disponibles."
 
         from datetime import date
 
-        try:
+        fecha = date.today().isoformat()
+
+        async def load() -> Any:
             res = await db.rpc(
                 "fn_slots_disponibles_v1",
-                {"p_sucursal_id": sid, "p_fecha": date.today().isoformat()},
+                {"p_sucursal_id": sid, "p_fecha": fecha},
             ).execute()
+            return res.data
+
+        try:
+            data = await _slots_cache.get_or_load(("horarios", sid, fecha), load)
         except Exception:
             # Fallback if RPC doesn't exist or fails
             return (
@@ -284,10 +313,9 @@ class SupabaseTool(Tool):
                 "Contactanos para agendar tu recojo."
             )
 
-        if not res.data:
+        if not data:
             return "No hay horarios disponibles para hoy. Intenta con otro dia."
 
-        data = res.data if isinstance(res.data, dict) else res.data
         slots = data.get("slots", data) if isinstance(data, dict) else data
 
         if not slots:
@@ -305,53 +333,90 @@ class SupabaseTool(Tool):
     # Helpers
     # ------------------------------------------------------------------
 
-    async def _get_cliente(self, db) -> dict | None:
-        """Find customer by phone (tries telefono_whatsapp then telefono)."""
-        if not self._phone:
+    async def _get_cliente(self, db, phone: str | None) -> dict | None:
+        """Find customer by phone (cached process-wide, see ``_customer_cache``)."""
+        if not phone:
             return None
-        if self._cliente_loaded:
-            return self._cliente_cache
-
-        # Normalize: ensure +country format for WhatsApp field
-        phone_with_plus = self._phone if self._phone.startswith("+") else f"+{self._phone}"
-
-        # Try telefono_whatsapp first (primary for WhatsApp users)
-        res = await (
-            db.table("clientes")
-            .select("cliente_id, nombre, sucursal_id, telefono, telefono_whatsapp")
-            .eq("telefono_whatsapp", phone_with_plus)
-            .limit(1)
-            .execute()
-        )
-        if res.data:
-            self._cliente_cache = res.data[0]
-            self._cliente_loaded = True
-            return self._cliente_cache
-
-        # Fallback: try telefono field with raw number
-        res = await (
-            db.table("clientes")
-            .select("cliente_id, nombre, sucursal_id, telefono, telefono_whatsapp")
-            .eq("telefono", self._phone)
-            .limit(1)
+
+        async def load() -> dict | None:
+            # One round trip: telefono_whatsapp is stored as +E.164, telefono as bare digits
+            res = await (
+                db.table("clientes")
+                .select("cliente_id, nombre, sucursal_id, telefono, telefono_whatsapp")
+                .or_(f"telefono_whatsapp.eq.+{phone},telefono.eq.{phone}")
+                .limit(2)
+                .execute()
+            )
+            # Prefer the WhatsApp match, as the sequential lookup used to
+            for row in res.data:
+                if row.get("telefono_whatsapp") == f"+{phone}":
+                    return row
+            return res.data[0] if res.data else None
+
+        return await _customer_cache.get_or_load(("cliente", phone), load)
+
+    async def _pedidos_activos(self, db, phone: str | None, with_entregas: bool) -> dict:
+        """
+        Customer, active orders (newest first) and pending deliveries.
+
+        One call to fn_pedidos_activos_v1 (migrations/003); falls back to
+        separate queries if the function is not installed.
+        """
+        global _pedidos_rpc_missing
+        if not phone:
+            return {"cliente": None, "pedidos": [], "entregas": []}
+
+        if not _pedidos_rpc_missing:
+            try:
+                res = await db.rpc("fn_pedidos_activos_v1", {"p_telefono": phone}).execute()
+                return res.data
+            except Exception as e:
+                if getattr(e, "code", None) == "PGRST202":  # function not found
+                    _pedidos_rpc_missing = True
+                    logger.warning("fn_pedidos_activos_v1 not installed; using separate queries")
+                else:
+                    logger.warning("fn_pedidos_activos_v1 failed ({}); using separate queries", e)
+
+        cliente = await self._get_cliente(db, phone)
+        if not cliente:
+            return {"cliente": None, "pedidos": [], "entregas": []}
+
+        pedidos = await (
+            db.table("pedidos")
+            .select("codigo, estado, importe, cargo_delivery, created_at, observaciones")
+            .eq("cliente_id", cliente["cliente_id"])
+            .in_("estado", _ESTADOS_PEDIDO_ACTIVO)
+            .order("created_at", desc=True)
             .execute()
         )
-        self._cliente_cache = res.data[0] if res.data else None
-        self._cliente_loaded = True
-        return self._cliente_cache
+        entregas = []
+        if with_entregas and pedidos.data:
+            res = await (
+                db.table("entregas")
+                .select("pedido_codigo, tipo, estado, fecha_programada, franja_horaria, estimado_llegada")
+                .in_("pedido_codigo", [p["codigo"] for p in pedidos.data])
+                .in_("estado", ["pendiente", "asignado", "en_camino"])
+                .order("fecha_programada")
+                .execute()
+            )
+            entregas = res.data
+        return {"cliente": cliente, "pedidos": pedidos.data, "entregas": entregas}
 
-    async def _resolve_sucursal(self, db) -> str:
+    async def _resolve_sucursal(self, db, phone: str | None) -> str:
         """Get branch ID from current customer, or first active branch."""
-        cliente = await self._get_cliente(db)
+        cliente = await self._get_cliente(db, phone)
         if cliente and cliente.get("sucursal_id"):
             return cliente["sucursal_id"]
 
         # Fallback: first active branch
-        res = await (
-            db.table("sucursales")
-            .select("id")
-            .eq("estado", "Activa")
-            .limit(1)
-            .execute()
-        )
-        return res.data[0]["id"] if res.data else ""
+        async def load() -> str:
+            res = await (
+                db.table("sucursales")
+                .select("id")
+                .eq("estado", "Activa")
+                .limit(1)
+                .execute()
+            )
+            return res.data[0]["id"] if res.data else ""
+
+        return await _catalog_cache.get_or_load(("sucursal_default",), load)
@@ -0,0 +1,118 @@
+"""Debounced per-session coalescing of inbound message bursts."""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from loguru import logger
+
+from nanobot.bus.events import InboundMessage
+
+
+@dataclass
+class CoalesceState:
+    """Messages buffered for one session while its window is open."""
+    messages: list[InboundMessage] = field(default_factory=list)
+    first_at: float = 0.0
+    timer: asyncio.Task | None = None
+
+
+def merge_messages(messages: list[InboundMessage]) -> InboundMessage:
+    """Fold a burst into one message: texts joined by newlines, media concatenated."""
+    if len(messages) == 1:
+        return messages[0]
+    first, last = messages[0], messages[-1]
+    return InboundMessage(
+        channel=last.channel,
+        sender_id=last.sender_id,
+        chat_id=last.chat_id,
+        content="\n".join(m.content for m in messages if m.content),
+        timestamp=first.timestamp,
+        media=[path for m in messages for path in m.media],
+        metadata={
+            **last.metadata,
+            "coalesced_count": len(messages),
+            "coalesced_message_ids": [
+                m.metadata["message_id"] for m in messages if m.metadata.get("message_id")
+            ],
+        },
+    )
+
+
+class MessageCoalescer:
+    """
+    Holds inbound messages of configured channels for a short quiet window.
+
+    Every new message of a session restarts its window; when the window
+    expires (or ``max_wait_s`` since the first message, or ``max_messages``
+    is reached) the burst is merged into one message and handed to
+    ``forward``. Channels without a window pass straight through.
+    """
+
+    def __init__(
+        self,
+        forward: Callable[[InboundMessage], Awaitable[None]],
+        windows_s: dict[str, float],
+        max_wait_s: float = 5.0,
+        max_messages: int = 10,
+    ):
+        self._forward = forward
+        self.windows_s = {ch: w for ch, w in windows_s.items() if w > 0}
+        self.max_wait_s = max_wait_s
+        self.max_messages = max(1, max_messages)
+        self._states: dict[str, CoalesceState] = {}
+
+    async def publish(self, msg: InboundMessage) -> None:
+        """Buffer ``msg`` if its channel coalesces, otherwise forward it now."""
+        window = self.windows_s.get(msg.channel)
+        # CRM templates and other pre-rendered messages must stay separate
+        if not window or msg.metadata.get("template_sugerido"):
+            await self._flush(msg.session_key)  # an earlier burst of this chat goes first
+            await self._forward(msg)
+            return
+
+        key = msg.session_key
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = CoalesceState(first_at=time.monotonic())
+        state.messages.append(msg)
+        if state.timer:
+            state.timer.cancel()
+            state.timer = None
+
+        if len(state.messages) >= self.max_messages:
+            await self._flush(key)
+            return
+        remaining = self.max_wait_s - (time.monotonic() - state.first_at)
+        state.timer = asyncio.create_task(self._flush_after(key, max(0.0, min(window, remaining))))
+
+    async def _flush_after(self, key: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        state = self._states.get(key)
+        if state is not None:
+            state.timer = None  # do not cancel ourselves in _flush
+        await self._flush(key)
+
+    async def _flush(self, key: str) -> None:
+        state = self._states.pop(key, None)
+        if state is None or not state.messages:
+            return
+        if state.timer:
+            state.timer.cancel()
+        if len(state.messages) > 1:
+            logger.debug("Coalesced {} messages for {}", len(state.messages), key)
+        try:
+            await self._forward(merge_messages(state.messages))
+        except Exception as e:
+            logger.error("Failed to forward coalesced messages for {}: {}", key, e)
+
+    async def flush_all(self) -> None:
+        """Forward every pending burst immediately (e.g. on shutdown)."""
+        for key in list(self._states):
+            await self._flush(key)
+
+    @property
+    def pending(self) -> int:
+        """Number of messages currently held back."""
+        return sum(len(s.messages) for s in self._states.values())
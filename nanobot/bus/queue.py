@@ -1,8 +1,17 @@
 """Async message queue for decoupled channel-agent communication."""
 
 import asyncio
+from collections import deque
+from contextlib import AbstractAsyncContextManager
 
+from loguru import logger
+
+from nanobot.bus.coalesce import MessageCoalescer
 from nanobot.bus.events import InboundMessage, OutboundMessage
+from nanobot.bus.scheduler import InboundScheduler
+from nanobot.config.schema import BusConfig
+
+MAX_DEAD_LETTERS = 200
 
 
 class MessageBus:
@@ -10,20 +19,115 @@ class MessageBus:
     Async message bus that decouples chat channels from the agent core.
 
     Channels push messages to the inbound queue, and the agent processes
-    them and pushes responses to the outbound queue.
+    them and pushes responses to the outbound queue. The inbound side is
+    scheduled by priority class (see ``nanobot.bus.scheduler``): consumers
+    must call ``task_done`` once they have finished with each message.
+
+    With several agent profiles, each registers as a consumer with the
+    channels it serves and gets its own inbound queue; ``publish_inbound``
+    routes every message straight to the one consumer that should handle
+    it. Messages no consumer serves go to ``dead_letters``.
+
+    Channels listed in ``BusConfig.coalesce_ms`` are debounced first: a
+    burst from one chat is merged into a single message (see
+    ``nanobot.bus.coalesce``).
     """
 
-    def __init__(self):
-        self.inbound: asyncio.Queue[InboundMessage] = asyncio.Queue()
+    def __init__(self, config: BusConfig | None = None):
+        self._config = config
+        config = config or BusConfig()
+        self.coalescer = MessageCoalescer(
+            self._enqueue,
+            {ch: ms / 1000 for ch, ms in config.coalesce_ms.items()},
+            max_wait_s=config.coalesce_max_wait_ms / 1000,
+            max_messages=config.coalesce_max_messages,
+        )
+        self.inbound = InboundScheduler(config)  # used until a consumer registers
         self.outbound: asyncio.Queue[OutboundMessage] = asyncio.Queue()
+        self._queues: dict[str, InboundScheduler] = {}
+        self._by_channel: dict[str, str] = {}
+        self._catch_all: str | None = None
+        self.dead_letters: deque[InboundMessage] = deque(maxlen=MAX_DEAD_LETTERS)
+        self.dead_letter_count = 0
+
+    def register_consumer(self, name: str, channels: set[str] | None = None) -> str:
+        """
+        Give consumer ``name`` its own inbound queue.
+
+        Args:
+            name: Consumer (agent profile) name; ``handoff:<name>`` reaches it.
+            channels: Channels it serves; None means every channel not
+                claimed by another consumer. The first claim wins.
+
+        Returns:
+            The registered name (suffixed if ``name`` was already taken).
+        """
+        if name in self._queues:
+            taken, n = name, 2
+            while f"{taken}#{n}" in self._queues:
+                n += 1
+            name = f"{taken}#{n}"
+            logger.warning("Bus consumer '{}' already registered; using '{}'", taken, name)
+        self._queues[name] = InboundScheduler(self._config)
+        if channels is None:
+            self._catch_all = self._catch_all or name
+            return name
+        for channel in channels:
+            owner = self._by_channel.setdefault(channel, name)
+            if owner != name:
+                logger.warning("Channel '{}' already served by '{}', not by '{}'", channel, owner, name)
+        return name
+
+    def _route(self, msg: InboundMessage) -> InboundScheduler | None:
+        """Pick the queue of the consumer that should handle ``msg``."""
+        if not self._queues:
+            return self.inbound
+        channel = msg.channel
+        if channel.startswith("handoff:"):
+            # Target is a consumer name or a channel that consumer serves
+            target = channel.split(":", 1)[1]
+            name = target if target in self._queues else self._by_channel.get(target)
+            return self._queues.get(name) if name else None
+        if channel == "system":
+            # Subagent announce: chat_id is "<origin channel>:<chat id>"
+            channel = msg.chat_id.split(":", 1)[0]
+        name = self._by_channel.get(channel, self._catch_all)
+        return self._queues.get(name) if name else None
 
     async def publish_inbound(self, msg: InboundMessage) -> None:
-        """Publish a message from a channel to the agent."""
-        await self.inbound.put(msg)
+        """Publish a message from a channel to the agent (waits if its class is full)."""
+        await self.coalescer.publish(msg)
+
+    async def flush_pending(self) -> None:
+        """Enqueue every burst the coalescer still holds (call before shutting down)."""
+        await self.coalescer.flush_all()
+
+    async def _enqueue(self, msg: InboundMessage) -> None:
+        """Route ``msg`` to its consumer's queue, or to the dead letters."""
+        queue = self._route(msg)
+        if queue is None:
+            self.dead_letter_count += 1
+            self.dead_letters.append(msg)
+            logger.warning(
+                "No agent serves '{}' (chat {}); message moved to dead letters", msg.channel, msg.chat_id,
+            )
+            return
+        await queue.put(msg)
+
+    async def consume_inbound(self, consumer: str | None = None) -> InboundMessage:
+        """Consume the next inbound message for ``consumer`` (blocks until available)."""
+        return await self._queue(consumer).get()
 
-    async def consume_inbound(self) -> InboundMessage:
-        """Consume the next inbound message (blocks until available)."""
-        return await self.inbound.get()
+    async def task_done(self, msg: InboundMessage, consumer: str | None = None) -> None:
+        """Mark a consumed inbound message as processed, freeing its class slot."""
+        await self._queue(consumer).task_done(msg)
+
+    def _queue(self, consumer: str | None) -> InboundScheduler:
+        return self._queues[consumer] if consumer is not None else self.inbound
+
+    def slot(self, priority: str) -> AbstractAsyncContextManager[None]:
+        """Concurrency slot for work that does not go through the queue (cron, heartbeat)."""
+        return self.inbound.slot(priority)
 
     async def publish_outbound(self, msg: OutboundMessage) -> None:
         """Publish a response from the agent to channels."""
@@ -35,10 +139,15 @@ class MessageBus:
 
     @property
     def inbound_size(self) -> int:
-        """Number of pending inbound messages."""
-        return self.inbound.qsize()
+        """Number of pending inbound messages (all consumers, including held bursts)."""
+        queued = self.inbound.depth + sum(q.depth for q in self._queues.values())
+        return queued + self.coalescer.pending
 
     @property
     def outbound_size(self) -> int:
         """Number of pending outbound messages."""
         return self.outbound.qsize()
+
+    def stats(self, consumer: str | None = None) -> dict[str, dict]:
+        """Inbound queue metrics per priority class (of one consumer, or the shared queue)."""
+        return self._queue(consumer).stats()
@@ -0,0 +1,217 @@
+"""Priority / fair-share scheduler behind the inbound side of the MessageBus."""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from loguru import logger
+
+from nanobot.bus.events import InboundMessage
+from nanobot.config.schema import BusConfig
+
+# Highest priority first
+PRIORITY_CLASSES = ("interactive", "crm", "background")
+BACKGROUND_CHANNELS = {"cron", "heartbeat"}
+
+WAIT_BUCKETS_S = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DEPTH_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def classify(msg: InboundMessage) -> str:
+    """
+    Priority class of an inbound message.
+
+    ``metadata["priority"]`` wins when it names a class; otherwise CRM
+    events are "crm", cron/heartbeat are "background" and everything else
+    (customer chats, handoffs, subagent announces) is "interactive".
+    """
+    priority = msg.metadata.get("priority")
+    if priority in PRIORITY_CLASSES:
+        return priority
+    channel = msg.channel
+    if channel.startswith("handoff:"):
+        channel = msg.metadata.get("origin_channel", channel)
+    if channel == "crm_event":
+        return "crm"
+    if channel in BACKGROUND_CHANNELS:
+        return "background"
+    return "interactive"
+
+
+def session_of(msg: InboundMessage) -> str:
+    """Session a message is processed in (handoffs continue on their origin channel)."""
+    if msg.channel.startswith("handoff:"):
+        return f"{msg.metadata.get('origin_channel', msg.channel)}:{msg.chat_id}"
+    return msg.session_key
+
+
+class _Histogram:
+    """Fixed-bucket histogram (cumulative counts, Prometheus style)."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def as_dict(self) -> dict[str, float]:
+        out: dict[str, float] = {}
+        running = 0
+        for bound, n in zip(self.buckets, self.counts):
+            running += n
+            out[f"le_{bound:g}"] = running
+        out["le_inf"] = self.count
+        out["count"] = self.count
+        out["sum"] = round(self.sum, 3)
+        return out
+
+
+class _ClassQueue:
+    """Pending messages of one priority class, one FIFO per session key."""
+
+    def __init__(self, name: str, max_concurrency: int, max_depth: int):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_depth = max(1, max_depth)
+        self.sessions: dict[str, deque[tuple[float, InboundMessage]]] = {}
+        self.ready: deque[str] = deque()  # round-robin order of keys with pending messages
+        self.depth = 0
+        self.in_flight = 0
+        self.blocked_producers = 0
+        self.wait_hist = _Histogram(WAIT_BUCKETS_S)
+        self.depth_hist = _Histogram(DEPTH_BUCKETS)
+
+    def push(self, msg: InboundMessage) -> None:
+        key = session_of(msg)
+        pending = self.sessions.get(key)
+        if pending is None:
+            pending = self.sessions[key] = deque()
+            self.ready.append(key)
+        pending.append((time.monotonic(), msg))
+        self.depth += 1
+        self.depth_hist.observe(self.depth)
+
+    def next_key(self, busy: set[str]) -> str | None:
+        """First session in round-robin order that has no message being processed."""
+        if self.depth == 0 or self.in_flight >= self.max_concurrency:
+            return None
+        return next((key for key in self.ready if key not in busy), None)
+
+    def pop(self, key: str) -> InboundMessage:
+        self.ready.remove(key)
+        pending = self.sessions[key]
+        enqueued_at, msg = pending.popleft()
+        if pending:
+            self.ready.append(key)  # back of the line: one message per session per round
+        else:
+            del self.sessions[key]
+        self.depth -= 1
+        self.wait_hist.observe(time.monotonic() - enqueued_at)
+        return msg
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "sessions": len(self.sessions),
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "max_depth": self.max_depth,
+            "blocked_producers": self.blocked_producers,
+            "wait_s": self.wait_hist.as_dict(),
+            "depth_on_enqueue": self.depth_hist.as_dict(),
+        }
+
+
+class InboundScheduler:
+    """
+    Inbound queue with priority classes, per-session fairness and backpressure.
+
+    - ``get()`` hands out the oldest-waiting session of the highest class
+      that still has a free concurrency slot; within a class, sessions take
+      turns so one chatty chat (or one CRM batch) cannot starve the rest.
+    - Each message handed out holds a slot of its class until
+      ``task_done(msg)`` is called.
+    - A session has at most one message handed out at a time; its next
+      message stays queued until ``task_done``, so consumers never sit on a
+      slot waiting for another turn of the same session to finish.
+    - ``put()`` blocks while its class already holds ``max_depth`` messages.
+    """
+
+    def __init__(self, config: BusConfig | None = None):
+        config = config or BusConfig()
+        self._classes = {
+            name: _ClassQueue(name, getattr(config, name).max_concurrency, getattr(config, name).max_depth)
+            for name in PRIORITY_CLASSES
+        }
+        self._busy: set[str] = set()  # sessions with a message handed out
+        self._cond = asyncio.Condition()
+
+    async def put(self, msg: InboundMessage) -> None:
+        """Enqueue a message, waiting while its class is over ``max_depth``."""
+        q = self._classes[classify(msg)]
+        async with self._cond:
+            if q.depth >= q.max_depth:
+                q.blocked_producers += 1
+                logger.warning("Inbound '{}' queue full ({}); applying backpressure", q.name, q.depth)
+                try:
+                    await self._cond.wait_for(lambda: q.depth < q.max_depth)
+                finally:
+                    q.blocked_producers -= 1
+            q.push(msg)
+            self._cond.notify_all()
+
+    async def get(self) -> InboundMessage:
+        """Take the next message to process (blocks until one is dispatchable)."""
+        async with self._cond:
+            while True:
+                for q in self._classes.values():
+                    key = q.next_key(self._busy)
+                    if key is not None:
+                        q.in_flight += 1
+                        self._busy.add(key)
+                        msg = q.pop(key)
+                        self._cond.notify_all()  # wake producers waiting for room
+                        return msg
+                await self._cond.wait()
+
+    async def task_done(self, msg: InboundMessage) -> None:
+        """Release the class slot and session held by a message returned from ``get()``."""
+        self._busy.discard(session_of(msg))
+        await self._release(classify(msg))
+
+    @asynccontextmanager
+    async def slot(self, priority: str) -> AsyncIterator[None]:
+        """Hold a concurrency slot of ``priority`` for work that bypasses the queue."""
+        q = self._classes[priority]
+        async with self._cond:
+            await self._cond.wait_for(lambda: q.in_flight < q.max_concurrency)
+            q.in_flight += 1
+        try:
+            yield
+        finally:
+            await self._release(priority)
+
+    async def _release(self, priority: str) -> None:
+        q = self._classes[priority]
+        async with self._cond:
+            q.in_flight = max(0, q.in_flight - 1)
+            self._cond.notify_all()
+
+    @property
+    def depth(self) -> int:
+        return sum(q.depth for q in self._classes.values())
+
+    def stats(self) -> dict[str, dict]:
+        """Depth, in-flight count and wait/depth histograms per priority class."""
+        return {name: q.stats() for name, q in self._classes.items()}
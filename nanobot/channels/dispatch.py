@@ -0,0 +1,107 @@
+"""Concurrent outbound delivery with per-chat ordering and per-channel limits."""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+from loguru import logger
+
+from nanobot.bus.events import OutboundMessage
+from nanobot.config.schema import OutboundLimitConfig
+
+
+class _TokenBucket:
+    """Allows ``rate`` acquisitions per second with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class OutboundDispatcher:
+    """
+    Sends outbound messages through one short-lived worker per (channel, chat).
+
+    Messages of one chat are sent strictly in order; different chats send
+    concurrently, at most ``max_concurrent_chats`` at a time per channel and
+    no faster than the channel's ``sends_per_second``. A worker exits as soon
+    as its chat queue is empty.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[OutboundMessage], Awaitable[None]],
+        limits: dict[str, OutboundLimitConfig] | None = None,
+    ):
+        self._send = send
+        self._limits = limits or {}
+        self._queues: dict[tuple[str, str], deque[OutboundMessage]] = {}
+        self._workers: dict[tuple[str, str], asyncio.Task] = {}
+        self._slots: dict[str, asyncio.Semaphore] = {}
+        self._buckets: dict[str, _TokenBucket | None] = {}
+
+    def submit(self, msg: OutboundMessage) -> None:
+        """Queue ``msg`` behind earlier messages of the same chat."""
+        key = (msg.channel, msg.chat_id)
+        self._queues.setdefault(key, deque()).append(msg)
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._drain(key))
+
+    def _limits_for(self, channel: str) -> tuple[asyncio.Semaphore, _TokenBucket | None]:
+        if channel not in self._slots:
+            limit = self._limits.get(channel) or OutboundLimitConfig()
+            self._slots[channel] = asyncio.Semaphore(max(1, limit.max_concurrent_chats))
+            self._buckets[channel] = (
+                _TokenBucket(limit.sends_per_second, limit.burst)
+                if limit.sends_per_second > 0 else None
+            )
+        return self._slots[channel], self._buckets[channel]
+
+    async def _drain(self, key: tuple[str, str]) -> None:
+        queue = self._queues[key]
+        slot, bucket = self._limits_for(key[0])
+        try:
+            while queue:
+                msg = queue.popleft()
+                # Per message, not per drain: a chatty chat cannot hold a slot
+                async with slot:
+                    if bucket:
+                        await bucket.acquire()
+                    try:
+                        await self._send(msg)
+                    except Exception as e:
+                        logger.error("Outbound send to {}:{} failed: {}", key[0], key[1], e)
+        finally:
+            del self._workers[key]
+            if not queue:
+                del self._queues[key]
+
+    @property
+    def pending(self) -> int:
+        """Messages queued but not yet handed to a channel."""
+        return sum(len(q) for q in self._queues.values())
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Let in-flight chats finish for up to ``timeout`` seconds, then cancel the rest."""
+        workers = list(self._workers.values())
+        if not workers:
+            return
+        _, pending = await asyncio.wait(workers, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if self.pending:
+            logger.warning("Dropped {} undelivered outbound messages on shutdown", self.pending)
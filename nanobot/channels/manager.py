@@ -10,6 +10,7 @@ from loguru import logger
 from nanobot.bus.events import OutboundMessage
 from nanobot.bus.queue import MessageBus
 from nanobot.channels.base import BaseChannel
+from nanobot.channels.dispatch import OutboundDispatcher
 from nanobot.config.schema import Config
 from nanobot.integrations.supabase import SupabaseCRMClient
 
@@ -21,7 +22,7 @@ class ChannelManager:
     Responsibilities:
     - Initialize enabled channels (Telegram, WhatsApp, etc.)
     - Start/stop channels
-    - Route outbound messages
+    - Route outbound messages (one ordered queue per chat, chats in parallel)
     """
     
     def __init__(self, config: Config, bus: MessageBus):
@@ -32,7 +33,10 @@ class ChannelManager:
         self._crm_client = SupabaseCRMClient(
             url=config.tools.supabase.url,
             service_key=config.tools.supabase.service_key,
+            batch_size=config.tools.supabase.crm_batch_size,
+            flush_interval_s=config.tools.supabase.crm_flush_ms / 1000,
         )
+        self._dispatcher = OutboundDispatcher(self._send, config.channels.outbound)
 
         self._init_channels()
     
@@ -180,6 +184,7 @@ class ChannelManager:
                 await self._dispatch_task
             except asyncio.CancelledError:
                 pass
+        await self._dispatcher.close()
         
         # Close Supabase client
         await self._crm_client.close()
@@ -193,7 +198,7 @@ class ChannelManager:
                 logger.error(f"Error stopping {name}: {e}")
     
     async def _dispatch_outbound(self) -> None:
-        """Dispatch outbound messages to the appropriate channel."""
+        """Hand outbound messages to the per-chat dispatcher."""
         logger.info("Outbound dispatcher started")
         
         while True:
@@ -203,31 +208,8 @@ class ChannelManager:
                     timeout=1.0
                 )
                 
-                channel = self.channels.get(msg.channel)
-                if channel:
-                    try:
-                        logger.info(f"Outbound → {msg.channel}:{msg.chat_id} | {msg.content[:200]}")
-                        await channel.send(msg)
-
-                        # Update crm_mensajes if this was a CRM-triggered message
-                        crm_id = (msg.metadata or {}).get("crm_mensaje_id")
-                        if crm_id and self._crm_client.enabled:
-                            evo_id = (msg.metadata or {}).get("evolution_msg_id", "")
-                            await self._crm_client.mark_sent(
-                                crm_mensaje_id=crm_id,
-                                evolution_msg_id=evo_id,
-                                mensaje_generado=msg.content,
-                            )
-                    except Exception as e:
-                        logger.error(f"Error sending to {msg.channel}: {e}")
-
-                        # Mark CRM message as failed
-                        crm_id = (msg.metadata or {}).get("crm_mensaje_id")
-                        if crm_id and self._crm_client.enabled:
-                            await self._crm_client.mark_failed(
-                                crm_mensaje_id=crm_id,
-                                error=str(e),
-                            )
+                if msg.channel in self.channels:
+                    self._dispatcher.submit(msg)
                 else:
                     logger.warning(f"Unknown channel: {msg.channel}")
                     
@@ -235,6 +217,33 @@ class ChannelManager:
                 continue
             except asyncio.CancelledError:
                 break
+
+    async def _send(self, msg: OutboundMessage) -> None:
+        """Send one message and record the result for CRM-triggered messages."""
+        channel = self.channels[msg.channel]
+        try:
+            logger.info(f"Outbound → {msg.channel}:{msg.chat_id} | {msg.content[:200]}")
+            await channel.send(msg)
+
+            # Update crm_mensajes if this was a CRM-triggered message
+            crm_id = (msg.metadata or {}).get("crm_mensaje_id")
+            if crm_id and self._crm_client.enabled:
+                evo_id = (msg.metadata or {}).get("evolution_msg_id", "")
+                await self._crm_client.mark_sent(
+                    crm_mensaje_id=crm_id,
+                    evolution_msg_id=evo_id,
+                    mensaje_generado=msg.content,
+                )
+        except Exception as e:
+            logger.error(f"Error sending to {msg.channel}: {e}")
+
+            # Mark CRM message as failed
+            crm_id = (msg.metadata or {}).get("crm_mensaje_id")
+            if crm_id and self._crm_client.enabled:
+                await self._crm_client.mark_failed(
+                    crm_mensaje_id=crm_id,
+                    error=str(e),
+                )
     
     def get_channel(self, name: str) -> BaseChannel | None:
         """Get a channel by name."""
@@ -1,6 +1,7 @@
 """CLI commands for nanobot."""
 
 import asyncio
+import signal
 from pathlib import Path
 
 import typer
@@ -237,6 +238,7 @@ def gateway(
     from nanobot.cron.service import CronService
     from nanobot.cron.types import CronJob
     from nanobot.heartbeat.service import HeartbeatService
+    from nanobot.utils.http import close_http_clients, configure_http
 
     if verbose:
         import logging
@@ -245,9 +247,10 @@ def gateway(
     console.print(f"{__logo__} Starting nanobot gateway on port {port}...")
 
     config = load_config()
+    configure_http(config.http)
 
     # Create components
-    bus = MessageBus()
+    bus = MessageBus(config.bus)
 
     # Create provider using factory
     provider = create_provider(config)
@@ -276,24 +279,37 @@ def gateway(
             workspace=config.workspace_path,
             model=defaults.model,
             max_iterations=defaults.max_tool_iterations,
+            max_parallel_tools=defaults.max_parallel_tools,
+            max_concurrent_messages=defaults.max_concurrent_messages,
+            provider_max_inflight=defaults.provider_max_inflight,
             brave_api_key=config.tools.web.search.api_key or None,
             exec_config=config.tools.exec,
             cron_service=cron,
             temperature=defaults.temperature,
             max_tokens=defaults.max_tokens,
             thinking=defaults.thinking,
+            streaming=defaults.streaming,
+            static_prompt_prefix=defaults.static_prompt_prefix,
+            history_max_tokens=defaults.history_max_tokens,
+            consolidate_after_messages=defaults.consolidate_after_messages,
+            consolidate_after_tokens=defaults.consolidate_after_tokens,
+            consolidate_keep_messages=defaults.consolidate_keep_messages,
+            max_concurrent_consolidations=defaults.max_concurrent_consolidations,
+            session_config=config.sessions,
         )
         agents = {"default": agent}
     
     # Set cron callback (needs agent)
     async def on_cron_job(job: CronJob) -> str | None:
         """Execute a cron job through the agent."""
-        response = await agent.process_direct(
-            job.payload.message,
-            session_key=f"cron:{job.id}",
-            channel=job.payload.channel or "cli",
-            chat_id=job.payload.to or "direct",
-        )
+        # Counted against the background class limit of the bus
+        async with bus.slot("background"):
+            response = await agent.process_direct(
+                job.payload.message,
+                session_key=f"cron:{job.id}",
+                channel=job.payload.channel or "cli",
+                chat_id=job.payload.to or "direct",
+            )
         if job.payload.deliver and job.payload.to:
             from nanobot.bus.events import OutboundMessage
             await bus.publish_outbound(OutboundMessage(
@@ -307,7 +323,8 @@ def gateway(
     # Create heartbeat service
     async def on_heartbeat(prompt: str) -> str:
         """Execute heartbeat through the agent."""
-        return await agent.process_direct(prompt, session_key="heartbeat")
+        async with bus.slot("background"):
+            return await agent.process_direct(prompt, session_key="heartbeat")
     
     heartbeat = HeartbeatService(
         workspace=config.workspace_path,
@@ -331,6 +348,14 @@ def gateway(
     console.print(f"[green]✓[/green] Heartbeat: every 30m")
     
     async def run():
+        # SIGTERM (e.g. docker stop) shuts down like Ctrl+C so pending saves are drained
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, asyncio.current_task().cancel,
+            )
+        except (NotImplementedError, RuntimeError):
+            pass  # Not supported on Windows
+
         try:
             await cron.start()
             await heartbeat.start()
@@ -349,13 +374,14 @@ def gateway(
                 )
 
             await asyncio.gather(*tasks)
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
             console.print("\nShutting down...")
             heartbeat.stop()
             cron.stop()
             for a in agents.values():
-                a.stop()
+                await a.close()
             await channels.stop_all()
+            await close_http_clients()
     
     asyncio.run(run())
 
@@ -377,8 +403,10 @@ def agent(
     from nanobot.bus.queue import MessageBus
     from nanobot.providers.factory import create_provider
     from nanobot.agent.loop import AgentLoop
+    from nanobot.utils.http import close_http_clients, configure_http
 
     config = load_config()
+    configure_http(config.http)
 
     bus = MessageBus()
     provider = create_provider(config)
@@ -393,13 +421,27 @@ def agent(
         temperature=defaults.temperature,
         max_tokens=defaults.max_tokens,
         thinking=defaults.thinking,
+        max_parallel_tools=defaults.max_parallel_tools,
+        max_concurrent_messages=defaults.max_concurrent_messages,
+        provider_max_inflight=defaults.provider_max_inflight,
+        static_prompt_prefix=defaults.static_prompt_prefix,
+        history_max_tokens=defaults.history_max_tokens,
+        consolidate_after_messages=defaults.consolidate_after_messages,
+        consolidate_after_tokens=defaults.consolidate_after_tokens,
+        consolidate_keep_messages=defaults.consolidate_keep_messages,
+        max_concurrent_consolidations=defaults.max_concurrent_consolidations,
+        session_config=config.sessions,
     )
     
     if message:
         # Single message mode
         async def run_once():
-            response = await agent_loop.process_direct(message, session_id)
-            console.print(f"\n{__logo__} {response}")
+            try:
+                response = await agent_loop.process_direct(message, session_id)
+                console.print(f"\n{__logo__} {response}")
+            finally:
+                await agent_loop.close()
+                await close_http_clients()
         
         asyncio.run(run_once())
     else:
@@ -418,6 +460,8 @@ def agent(
                 except KeyboardInterrupt:
                     console.print("\nGoodbye!")
                     break
+            await agent_loop.close()
+            await close_http_clients()
         
         asyncio.run(run_interactive())
 
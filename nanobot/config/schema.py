@@ -38,11 +38,20 @@ class FeishuConfig(BaseModel):
     allow_from: list[str] = Field(default_factory=list)  # Allowed user open_ids
 
 
+class OutboundLimitConfig(BaseModel):
+    """Outbound send limits for one channel."""
+    max_concurrent_chats: int = 8  # Chats of this channel sending at the same time
+    sends_per_second: float = 0.0  # Messages per second across the channel (0 = unlimited)
+    burst: int = 1  # Messages allowed back to back before the rate applies
+
+
 class ChannelsConfig(BaseModel):
     """Configuration for chat channels."""
     whatsapp: WhatsAppConfig = Field(default_factory=WhatsAppConfig)
     telegram: TelegramConfig = Field(default_factory=TelegramConfig)
     feishu: FeishuConfig = Field(default_factory=FeishuConfig)
+    # Per channel name (e.g. {"whatsapp": {"sends_per_second": 5}}); missing = defaults
+    outbound: dict[str, OutboundLimitConfig] = Field(default_factory=dict)
 
 
 class AgentDefaults(BaseModel):
@@ -54,6 +63,19 @@ class AgentDefaults(BaseModel):
     temperature: float = 0.7
     max_tool_iterations: int = 20
     thinking: bool = True  # Enable/disable model thinking (GLM-4.7, etc.)
+    max_parallel_tools: int = 4  # Concurrent side-effect-free tool calls per assistant turn
+    streaming: bool = False  # Stream LLM output and send each ||| chunk as soon as it completes
+    max_concurrent_messages: int = 16  # Worker pool size: messages processed at once per agent
+    provider_max_inflight: int = 0  # Concurrent LLM requests per provider, shared by all agents (0 = no cap)
+    prompt_caching: bool = True  # Cache breakpoints / prompt_cache_key where the provider supports them
+    static_prompt_prefix: bool = False  # Same system prompt for every chat; time/chat/customer go in the user turn
+    history_max_tokens: int = 0  # Token budget for session history in the prompt (0 = message count only)
+    # Background consolidation folds old messages into a summary + memory files.
+    # Off by default: the entity's MEMORY.md is shared by all of its chats.
+    consolidate_after_messages: int = 0  # Unsummarized messages that trigger it (0 = off)
+    consolidate_after_tokens: int = 0  # ...or unsummarized tokens (0 = off)
+    consolidate_keep_messages: int = 20  # Recent messages left verbatim in the prompt
+    max_concurrent_consolidations: int = 1  # Consolidation LLM calls at once per agent
 
 
 class AgentProfile(BaseModel):
@@ -66,6 +88,41 @@ class AgentProfile(BaseModel):
     tools: list[str] = Field(default_factory=list)  # Tool names to enable (empty = all)
     skills: list[str] = Field(default_factory=list)  # Skill names to enable (empty = all)
     session_backend: str = "file"     # "file" | "supabase"
+    history_max_tokens: int | None = None  # Override defaults.history_max_tokens
+
+
+class SessionConfig(BaseModel):
+    """Session persistence configuration."""
+    incremental: bool = True  # File backend: append new messages instead of rewriting the file
+    compact_ratio: float = 0.25  # Compact when superseded records exceed this fraction of live lines
+    compact_min_garbage: int = 64  # ...and at least this many records are superseded
+    load_window: int = 50  # Supabase backend: newest messages fetched when loading a session
+    write_behind: bool = True  # save() only marks the session dirty; a background task persists it
+    flush_interval_s: float = 1.0  # Write-behind: flush dirty sessions at least this often
+    flush_batch_size: int = 32  # ...or as soon as this many sessions are dirty
+    cache_max_bytes: int = 64 * 1024 * 1024  # Approximate memory budget for loaded sessions
+    cache_max_entries: int = 10_000  # Upper bound on loaded sessions regardless of size
+    cache_ttl_s: float = 7200  # Drop sessions idle this long (0 = only evict under pressure)
+
+
+class BusClassConfig(BaseModel):
+    """Limits for one inbound priority class."""
+    max_concurrency: int  # Messages of this class processed at the same time
+    max_depth: int  # Publishers wait (backpressure) once this many are queued
+
+
+class BusConfig(BaseModel):
+    """Inbound message scheduling (interactive > crm > background)."""
+    interactive: BusClassConfig = Field(
+        default_factory=lambda: BusClassConfig(max_concurrency=64, max_depth=2000)
+    )
+    crm: BusClassConfig = Field(default_factory=lambda: BusClassConfig(max_concurrency=4, max_depth=1000))
+    background: BusClassConfig = Field(default_factory=lambda: BusClassConfig(max_concurrency=2, max_depth=100))
+    # Merge bursts of messages from one chat into a single turn, per channel
+    # (e.g. {"whatsapp": 1500}); a window restarts with every new message
+    coalesce_ms: dict[str, int] = Field(default_factory=dict)
+    coalesce_max_wait_ms: int = 5000  # Never hold a burst longer than this after its first message
+    coalesce_max_messages: int = 10  # ...or once this many messages are buffered
 
 
 class AgentsConfig(BaseModel):
@@ -98,6 +155,25 @@ class GatewayConfig(BaseModel):
     port: int = 18790
     webhook_enabled: bool = False
     webhook_secret: str = ""  # For CRM webhook auth (future)
+    dedup_backend: str = "memory"  # "memory" | "sqlite" (survives restarts, shared by workers on one host)
+    dedup_path: str = ""  # SQLite file; empty = <data dir>/webhook/dedup.db
+    dedup_ttl_s: float = 86400.0  # Remember delivery ids this long
+    dedup_capacity: int = 100_000  # ...but at most this many
+    spool_enabled: bool = False  # Ack webhooks once spooled to disk; a replay task feeds the bus
+    spool_dir: str = ""  # Empty = <data dir>/webhook/spool
+    spool_segment_mb: int = 64  # Roll to a new log segment after this size
+    spool_fsync_ms: float = 5.0  # Group-commit window: appends within it share one fsync
+
+
+class HttpConfig(BaseModel):
+    """Shared outbound HTTP client pool (tools and providers)."""
+    max_connections: int = 20  # Per named client (one client per upstream service)
+    max_keepalive_connections: int = 10
+    keepalive_expiry_s: float = 30.0
+    http2: bool = False  # Needs the optional 'h2' package
+    timeout_s: float = 30.0  # Default read/write/pool timeout; callers may override per request
+    connect_timeout_s: float = 10.0
+    connect_retries: int = 1  # Retries on connection failures only (never replays a sent request)
 
 
 class WebSearchConfig(BaseModel):
@@ -121,6 +197,8 @@ class SupabaseConfig(BaseModel):
     """Supabase connection configuration."""
     url: str = ""
     service_key: str = ""  # service_role key for server-side access
+    crm_batch_size: int = 50  # crm_mensajes status updates written per bulk call
+    crm_flush_ms: int = 1000  # ...or this long after the first pending update
 
 
 class ToolsConfig(BaseModel):
@@ -137,6 +215,9 @@ class Config(BaseSettings):
     providers: ProvidersConfig = Field(default_factory=ProvidersConfig)
     gateway: GatewayConfig = Field(default_factory=GatewayConfig)
     tools: ToolsConfig = Field(default_factory=ToolsConfig)
+    sessions: SessionConfig = Field(default_factory=SessionConfig)
+    http: HttpConfig = Field(default_factory=HttpConfig)
+    bus: BusConfig = Field(default_factory=BusConfig)
     
     @property
     def workspace_path(self) -> Path:
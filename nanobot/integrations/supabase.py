@@ -1,20 +1,46 @@
 """Lightweight Supabase client for updating crm_mensajes."""
 
+import asyncio
 from datetime import datetime, timezone
 
 import httpx
 from loguru import logger
 
+# Worth retrying: rate limiting and transient upstream failures
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
 
 class SupabaseCRMClient:
     """Updates crm_mensajes table via Supabase REST API.
 
     Uses httpx to avoid adding supabase-py as a heavy dependency.
+    Status updates are buffered and written in bulk (one RPC call per batch,
+    see migrations/004) once ``batch_size`` are pending or
+    ``flush_interval_s`` after the first one; ``close()`` writes the rest.
     All operations are fire-and-forget (errors logged, not raised).
     """
 
-    def __init__(self, url: str, service_key: str):
+    BULK_RPC = "fn_crm_mensajes_actualizar_v1"
+
+    def __init__(
+        self,
+        url: str,
+        service_key: str,
+        batch_size: int = 50,
+        flush_interval_s: float = 1.0,
+        max_retries: int = 3,
+        retry_backoff_s: float = 0.25,
+    ):
         self.enabled = bool(url and service_key)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_s = flush_interval_s
+        self.max_retries = max_retries
+        self.retry_backoff_s = retry_backoff_s
+        self._pending: dict[str, dict] = {}  # crm_mensaje_id -> columns to set
+        self._timer: asyncio.Task | None = None
+        self._flushes: set[asyncio.Task] = set()
+        self._flush_lock = asyncio.Lock()  # one batch at a time keeps per-id order
+        self._rpc_missing = False
         if self.enabled:
             self._client = httpx.AsyncClient(
                 base_url=f"{url.rstrip('/')}/rest/v1",
@@ -40,7 +66,7 @@ class SupabaseCRMClient:
         if not self.enabled:
             return
         now = datetime.now(timezone.utc).isoformat()
-        await self._update(crm_mensaje_id, {
+        self._enqueue(crm_mensaje_id, {
             "estado_envio": "enviado_api",
             "mensaje_renderizado": mensaje_generado,
             "metadata": {
@@ -62,7 +88,7 @@ class SupabaseCRMClient:
         if not self.enabled:
             return
         now = datetime.now(timezone.utc).isoformat()
-        await self._update(crm_mensaje_id, {
+        self._enqueue(crm_mensaje_id, {
             "estado_envio": "fallido",
             "detalle_error": error,
             "metadata": {
@@ -72,23 +98,93 @@ class SupabaseCRMClient:
             },
         })
 
+    def _enqueue(self, crm_mensaje_id: str, data: dict) -> None:
+        # Later updates of the same record win column by column, like sequential PATCHes
+        self._pending[crm_mensaje_id] = {**self._pending.get(crm_mensaje_id, {}), **data}
+        if len(self._pending) >= self.batch_size:
+            task = asyncio.create_task(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval_s)
+        self._timer = None  # do not cancel ourselves in flush()
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write all pending updates now."""
+        async with self._flush_lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            if len(batch) > 1 and not self._rpc_missing and await self._update_bulk(batch):
+                return
+            await asyncio.gather(*(self._update(i, data) for i, data in batch.items()))
+
+    async def _update_bulk(self, batch: dict[str, dict]) -> bool:
+        """Write ``batch`` with one RPC call; False if the caller should PATCH one by one."""
+        resp = await self._request(
+            "POST",
+            f"/rpc/{self.BULK_RPC}",
+            what=f"{len(batch)} crm_mensajes",
+            json={"p_cambios": [{"id": i, "campos": data} for i, data in batch.items()]},
+        )
+        if resp is None:
+            return True  # already retried and logged; PATCHing would hit the same outage
+        if resp.status_code == 404 and "PGRST202" in resp.text:
+            logger.warning("{} not deployed; updating crm_mensajes one by one", self.BULK_RPC)
+            self._rpc_missing = True
+            return False
+        if resp.status_code not in (200, 204):
+            logger.error(
+                "Supabase bulk update failed for {} records: {} {}",
+                len(batch), resp.status_code, resp.text[:200],
+            )
+        return True
+
     async def _update(self, crm_mensaje_id: str, data: dict) -> None:
         """Update a crm_mensajes record by ID."""
-        try:
-            resp = await self._client.patch(
-                "/crm_mensajes",
-                params={"id": f"eq.{crm_mensaje_id}"},
-                json=data,
+        resp = await self._request(
+            "PATCH",
+            "/crm_mensajes",
+            what=crm_mensaje_id,
+            params={"id": f"eq.{crm_mensaje_id}"},
+            json=data,
+        )
+        if resp is not None and resp.status_code not in (200, 204):
+            logger.error(
+                "Supabase update failed for {}: {} {}",
+                crm_mensaje_id, resp.status_code, resp.text[:200],
             )
-            if resp.status_code not in (200, 204):
-                logger.error(
-                    "Supabase update failed for {}: {} {}",
-                    crm_mensaje_id, resp.status_code, resp.text[:200],
-                )
-        except Exception as e:
-            logger.error("Supabase request failed for {}: {}", crm_mensaje_id, e)
+
+    async def _request(self, method: str, path: str, what: str, **kwargs) -> httpx.Response | None:
+        """Send a request, retrying transient failures with exponential backoff."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = await self._client.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                error = str(e) or type(e).__name__
+            except Exception as e:
+                logger.error("Supabase request failed for {}: {}", what, e)
+                return None
+            else:
+                if resp.status_code not in _RETRY_STATUS:
+                    return resp
+                error = f"{resp.status_code} {resp.text[:200]}"
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.retry_backoff_s * 2 ** attempt)
+        logger.error("Supabase request failed for {}: {}", what, error)
+        return None
 
     async def close(self) -> None:
-        """Close the HTTP client."""
+        """Write pending updates and close the HTTP client."""
         if self._client:
+            await self.flush()
+            if self._flushes:
+                await asyncio.gather(*self._flushes, return_exceptions=True)
             await self._client.aclose()
@@ -1,8 +1,11 @@
 """Base LLM provider interface."""
 
+import asyncio
+import json
 from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, AsyncIterator, Callable
 
 
 @dataclass
@@ -28,6 +31,27 @@ class LLMResponse:
         return len(self.tool_calls) > 0
 
 
+@dataclass
+class ToolCallDelta:
+    """A fragment of a streamed tool call; id and name arrive once, arguments piecemeal."""
+    index: int
+    id: str | None = None
+    name: str | None = None
+    arguments: str = ""
+
+
+@dataclass
+class LLMStreamChunk:
+    """One increment of a streamed response.
+
+    ``content`` carries a text delta and ``tool_call`` a tool-call fragment.
+    The last chunk of a stream carries the fully assembled ``response``.
+    """
+    content: str | None = None
+    tool_call: ToolCallDelta | None = None
+    response: LLMResponse | None = None
+
+
 class LLMProvider(ABC):
     """
     Abstract base class for LLM providers.
@@ -36,9 +60,28 @@ class LLMProvider(ABC):
     while maintaining a consistent interface.
     """
     
+    _inflight: asyncio.Semaphore | None = None
+    _inflight_limit = 0
+
     def __init__(self, api_key: str | None = None, api_base: str | None = None):
         self.api_key = api_key
         self.api_base = api_base
+
+    def limit_inflight(self, max_inflight: int) -> None:
+        """Cap concurrent requests to this provider across all its users (0 = unlimited)."""
+        if max_inflight == self._inflight_limit:
+            return
+        self._inflight_limit = max_inflight
+        self._inflight = asyncio.Semaphore(max_inflight) if max_inflight > 0 else None
+
+    @asynccontextmanager
+    async def inflight(self) -> AsyncIterator[None]:
+        """Hold one of the provider's request slots (see ``limit_inflight``)."""
+        if self._inflight is None:
+            yield
+            return
+        async with self._inflight:
+            yield
     
     @abstractmethod
     async def chat(
@@ -65,8 +108,177 @@ class LLMProvider(ABC):
             LLMResponse with content and/or tool calls.
         """
         pass
+
+    async def chat_stream(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+        thinking: bool = True,
+    ) -> AsyncIterator[LLMStreamChunk]:
+        """
+        Stream a chat completion request.
+
+        Yields content deltas and tool-call fragments as they arrive, then a
+        final chunk with the assembled LLMResponse. Errors are reported like
+        ``chat()``: as a final response with finish_reason "error". The default
+        implementation falls back to ``chat()`` and yields the content at once.
+        """
+        response = await self.chat(
+            messages=messages,
+            tools=tools,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            thinking=thinking,
+        )
+        if response.content:
+            yield LLMStreamChunk(content=response.content)
+        yield LLMStreamChunk(response=response)
     
     @abstractmethod
     def get_default_model(self) -> str:
         """Get the default model for this provider."""
         pass
+
+
+_EPHEMERAL = {"type": "ephemeral"}
+
+# OpenAI-format streams only report token usage (and cache hits) when asked to
+STREAM_OPTIONS = {"include_usage": True}
+
+
+def parse_usage(usage: Any) -> dict[str, int]:
+    """
+    Normalize an OpenAI/LiteLLM usage object.
+
+    Adds ``cache_read_tokens`` (OpenAI ``prompt_tokens_details.cached_tokens``,
+    Anthropic ``cache_read_input_tokens``) and ``cache_write_tokens``
+    (Anthropic ``cache_creation_input_tokens``) when the provider reports them.
+    """
+    if not usage:
+        return {}
+    result = {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+    details = getattr(usage, "prompt_tokens_details", None)
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or getattr(details, "cached_tokens", None)
+    cache_write = getattr(usage, "cache_creation_input_tokens", None)
+    if cache_read:
+        result["cache_read_tokens"] = int(cache_read)
+    if cache_write:
+        result["cache_write_tokens"] = int(cache_write)
+    return result
+
+
+def _with_cache_control(message: dict[str, Any]) -> dict[str, Any]:
+    content = message.get("content")
+    if isinstance(content, str) and content:
+        blocks = [{"type": "text", "text": content, "cache_control": _EPHEMERAL}]
+    elif isinstance(content, list) and content:
+        blocks = [*content[:-1], {**content[-1], "cache_control": _EPHEMERAL}]
+    else:
+        return message
+    return {**message, "content": blocks}
+
+
+def add_cache_breakpoints(
+    messages: list[dict[str, Any]],
+    tools: list[dict[str, Any]] | None,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]] | None]:
+    """
+    Mark the stable prompt prefix with ``cache_control`` breakpoints.
+
+    Breakpoints go on the last tool definition, the system prompt and the
+    latest user message, so the tools + system prefix is shared by every
+    turn and each tool-loop iteration reuses the conversation so far
+    (Anthropic allows four per request). Returns copies; the inputs are
+    not modified.
+    """
+    if tools:
+        tools = [*tools[:-1], {**tools[-1], "cache_control": _EPHEMERAL}]
+    messages = list(messages)
+    if messages and messages[0].get("role") == "system":
+        messages[0] = _with_cache_control(messages[0])
+    for i in range(len(messages) - 1, 0, -1):
+        if messages[i].get("role") == "user":
+            messages[i] = _with_cache_control(messages[i])
+            break
+    return messages, tools
+
+
+def _parse_tool_arguments(raw: str) -> dict[str, Any]:
+    """Parse streamed tool-call arguments, keeping unparseable input as ``raw``."""
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return {"raw": raw}
+
+
+async def stream_openai_chunks(
+    stream: AsyncIterator[Any],
+    parse_arguments: Callable[[str], Any] = _parse_tool_arguments,
+) -> AsyncIterator[LLMStreamChunk]:
+    """
+    Translate an OpenAI-format chat completion stream into LLMStreamChunks.
+
+    Works for the OpenAI SDK and LiteLLM, which both emit ``choices[0].delta``
+    chunks with content and indexed tool-call fragments.
+    """
+    content: list[str] = []
+    reasoning: list[str] = []
+    calls: dict[int, dict[str, Any]] = {}
+    finish_reason = "stop"
+    usage: dict[str, int] = {}
+
+    async for chunk in stream:
+        if getattr(chunk, "usage", None):
+            usage = parse_usage(chunk.usage)
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        if choice.finish_reason:
+            finish_reason = choice.finish_reason
+        delta = choice.delta
+        if delta is None:
+            continue
+
+        if getattr(delta, "reasoning_content", None):
+            reasoning.append(delta.reasoning_content)
+        if delta.content:
+            content.append(delta.content)
+            yield LLMStreamChunk(content=delta.content)
+
+        for tc in getattr(delta, "tool_calls", None) or []:
+            fn = tc.function
+            fragment = ToolCallDelta(
+                index=tc.index if tc.index is not None else len(calls),
+                id=tc.id,
+                name=fn.name if fn else None,
+                arguments=(fn.arguments or "") if fn else "",
+            )
+            buf = calls.setdefault(fragment.index, {"id": None, "name": None, "arguments": ""})
+            buf["id"] = fragment.id or buf["id"]
+            buf["name"] = fragment.name or buf["name"]
+            buf["arguments"] += fragment.arguments
+            yield LLMStreamChunk(tool_call=fragment)
+
+    tool_calls = [
+        ToolCallRequest(
+            id=buf["id"] or f"call_{index}",
+            name=buf["name"],
+            arguments=parse_arguments(buf["arguments"] or "{}"),
+        )
+        for index, buf in sorted(calls.items())
+    ]
+    yield LLMStreamChunk(response=LLMResponse(
+        content="".join(content) or None,
+        tool_calls=tool_calls,
+        finish_reason=finish_reason,
+        usage=usage,
+        reasoning_content="".join(reasoning) or None,
+    ))
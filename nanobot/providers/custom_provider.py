@@ -2,12 +2,19 @@
 
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, AsyncIterator
 
 import json_repair
 from openai import AsyncOpenAI
 
-from nanobot.providers.base import LLMProvider, LLMResponse, ToolCallRequest
+from nanobot.providers.base import (
+    STREAM_OPTIONS,
+    LLMProvider,
+    LLMResponse,
+    LLMStreamChunk,
+    ToolCallRequest,
+    stream_openai_chunks,
+)
 
 
 class CustomProvider(LLMProvider):
@@ -18,15 +25,33 @@ class CustomProvider(LLMProvider):
         self._client = AsyncOpenAI(api_key=api_key, base_url=api_base)
 
     async def chat(self, messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None = None,
-                   model: str | None = None, max_tokens: int = 4096, temperature: float = 0.7) -> LLMResponse:
+                   model: str | None = None, max_tokens: int = 4096, temperature: float = 0.7,
+                   thinking: bool = True) -> LLMResponse:
+        try:
+            return self._parse(await self._client.chat.completions.create(
+                **self._kwargs(messages, tools, model, max_tokens, temperature)))
+        except Exception as e:
+            return LLMResponse(content=f"Error: {e}", finish_reason="error")
+
+    async def chat_stream(self, messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None = None,
+                          model: str | None = None, max_tokens: int = 4096, temperature: float = 0.7,
+                          thinking: bool = True) -> AsyncIterator[LLMStreamChunk]:
+        try:
+            stream = await self._client.chat.completions.create(
+                **self._kwargs(messages, tools, model, max_tokens, temperature),
+                stream=True, stream_options=STREAM_OPTIONS)
+            async for chunk in stream_openai_chunks(stream, parse_arguments=json_repair.loads):
+                yield chunk
+        except Exception as e:
+            yield LLMStreamChunk(response=LLMResponse(content=f"Error: {e}", finish_reason="error"))
+
+    def _kwargs(self, messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None,
+                model: str | None, max_tokens: int, temperature: float) -> dict[str, Any]:
         kwargs: dict[str, Any] = {"model": model or self.default_model, "messages": messages,
                                   "max_tokens": max(1, max_tokens), "temperature": temperature}
         if tools:
             kwargs.update(tools=tools, tool_choice="auto")
-        try:
-            return self._parse(await self._client.chat.completions.create(**kwargs))
-        except Exception as e:
-            return LLMResponse(content=f"Error: {e}", finish_reason="error")
+        return kwargs
 
     def _parse(self, response: Any) -> LLMResponse:
         choice = response.choices[0]
@@ -26,12 +26,14 @@ def create_provider(config: Config) -> LLMProvider:
         return OpenAIProvider(
             api_key=config.providers.openai.api_key or None,
             api_base=config.providers.openai.api_base,
-            default_model=model
+            default_model=model,
+            prompt_caching=config.agents.defaults.prompt_caching,
         )
     else:
         # Default to LiteLLM for all other cases (including "litellm" and unknown values)
         return LiteLLMProvider(
             api_key=config.get_api_key(),
             api_base=config.get_api_base(),
-            default_model=model
+            default_model=model,
+            prompt_caching=config.agents.defaults.prompt_caching,
         )
@@ -1,12 +1,22 @@
 """LiteLLM provider implementation for multi-provider support."""
 
 import os
-from typing import Any
+from typing import Any, AsyncIterator
 
 import litellm
 from litellm import acompletion
 
-from nanobot.providers.base import LLMProvider, LLMResponse, ToolCallRequest
+from nanobot.providers.base import (
+    STREAM_OPTIONS,
+    LLMProvider,
+    LLMResponse,
+    LLMStreamChunk,
+    ToolCallRequest,
+    add_cache_breakpoints,
+    parse_usage,
+    stream_openai_chunks,
+)
+from nanobot.providers.registry import find_by_model, find_gateway
 
 
 class LiteLLMProvider(LLMProvider):
@@ -21,10 +31,13 @@ class LiteLLMProvider(LLMProvider):
         self, 
         api_key: str | None = None, 
         api_base: str | None = None,
-        default_model: str = "anthropic/claude-opus-4-5"
+        default_model: str = "anthropic/claude-opus-4-5",
+        prompt_caching: bool = True,
     ):
         super().__init__(api_key, api_base)
         self.default_model = default_model
+        self.prompt_caching = prompt_caching
+        self._gateway = find_gateway(api_key=api_key, api_base=api_base)
         
         # Detect OpenRouter by api_key prefix or explicit api_base
         self.is_openrouter = (
@@ -84,6 +97,50 @@ class LiteLLMProvider(LLMProvider):
         Returns:
             LLMResponse with content and/or tool calls.
         """
+        kwargs = self._build_kwargs(messages, tools, model, max_tokens, temperature, thinking)
+        
+        try:
+            response = await acompletion(**kwargs)
+            return self._parse_response(response)
+        except Exception as e:
+            # Return error as content for graceful handling
+            return LLMResponse(
+                content=f"Error calling LLM: {str(e)}",
+                finish_reason="error",
+            )
+
+    async def chat_stream(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+        thinking: bool = True,
+    ) -> AsyncIterator[LLMStreamChunk]:
+        """Stream a chat completion via LiteLLM (see LLMProvider.chat_stream)."""
+        kwargs = self._build_kwargs(messages, tools, model, max_tokens, temperature, thinking)
+
+        try:
+            stream = await acompletion(**kwargs, stream=True, stream_options=STREAM_OPTIONS)
+            async for chunk in stream_openai_chunks(stream):
+                yield chunk
+        except Exception as e:
+            yield LLMStreamChunk(response=LLMResponse(
+                content=f"Error calling LLM: {str(e)}",
+                finish_reason="error",
+            ))
+
+    def _build_kwargs(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None,
+        model: str | None,
+        max_tokens: int,
+        temperature: float,
+        thinking: bool,
+    ) -> dict[str, Any]:
+        """Resolve the LiteLLM model name and assemble the completion kwargs."""
         model = model or self.default_model
         
         # For OpenRouter, prefix model name if not already prefixed
@@ -113,6 +170,9 @@ class LiteLLMProvider(LLMProvider):
         if "gemini" in model.lower() and not model.startswith("gemini/"):
             model = f"gemini/{model}"
         
+        if self._supports_prompt_caching(model):
+            messages, tools = add_cache_breakpoints(messages, tools)
+
         kwargs: dict[str, Any] = {
             "model": model,
             "messages": messages,
@@ -131,17 +191,23 @@ class LiteLLMProvider(LLMProvider):
         if tools:
             kwargs["tools"] = tools
             kwargs["tool_choice"] = "auto"
-        
-        try:
-            response = await acompletion(**kwargs)
-            return self._parse_response(response)
-        except Exception as e:
-            # Return error as content for graceful handling
-            return LLMResponse(
-                content=f"Error calling LLM: {str(e)}",
-                finish_reason="error",
-            )
+
+        return kwargs
     
+    def _supports_prompt_caching(self, model: str) -> bool:
+        """Whether ``cache_control`` breakpoints are understood for ``model`` (registry flag)."""
+        if not self.prompt_caching:
+            return False
+        if self._gateway:
+            # Gateways only forward cache_control to Anthropic models
+            return self._gateway.supports_prompt_caching and (
+                "claude" in model.lower() or "anthropic" in model.lower()
+            )
+        if self.is_vllm:
+            return False
+        spec = find_by_model(model)
+        return bool(spec and spec.supports_prompt_caching)
+
     def _parse_response(self, response: Any) -> LLMResponse:
         """Parse LiteLLM response into our standard format."""
         choice = response.choices[0]
@@ -165,13 +231,7 @@ class LiteLLMProvider(LLMProvider):
                     arguments=args,
                 ))
         
-        usage = {}
-        if hasattr(response, "usage") and response.usage:
-            usage = {
-                "prompt_tokens": response.usage.prompt_tokens,
-                "completion_tokens": response.usage.completion_tokens,
-                "total_tokens": response.usage.total_tokens,
-            }
+        usage = parse_usage(getattr(response, "usage", None))
         
         return LLMResponse(
             content=message.content,
@@ -5,13 +5,20 @@ from __future__ import annotations
 import asyncio
 import hashlib
 import json
-from typing import Any, AsyncGenerator
+from typing import Any, AsyncGenerator, AsyncIterator
 
 import httpx
 from loguru import logger
 
 from oauth_cli_kit import get_token as get_codex_token
-from nanobot.providers.base import LLMProvider, LLMResponse, ToolCallRequest
+from nanobot.providers.base import (
+    LLMProvider,
+    LLMResponse,
+    LLMStreamChunk,
+    ToolCallDelta,
+    ToolCallRequest,
+)
+from nanobot.utils.http import get_http_client
 
 DEFAULT_CODEX_URL = "https://chatgpt.com/backend-api/codex/responses"
 DEFAULT_ORIGINATOR = "nanobot"
@@ -31,13 +38,26 @@ class OpenAICodexProvider(LLMProvider):
         model: str | None = None,
         max_tokens: int = 4096,
         temperature: float = 0.7,
+        thinking: bool = True,
     ) -> LLMResponse:
+        response: LLMResponse | None = None
+        async for chunk in self.chat_stream(messages, tools, model, max_tokens, temperature, thinking):
+            if chunk.response is not None:
+                response = chunk.response
+        return response or LLMResponse(content="Error calling Codex: empty stream", finish_reason="error")
+
+    async def chat_stream(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+        thinking: bool = True,
+    ) -> AsyncIterator[LLMStreamChunk]:
         model = model or self.default_model
         system_prompt, input_items = _convert_messages(messages)
 
-        token = await asyncio.to_thread(get_codex_token)
-        headers = _build_headers(token.account_id, token.access)
-
         body: dict[str, Any] = {
             "model": _strip_model_prefix(model),
             "store": False,
@@ -55,25 +75,26 @@ class OpenAICodexProvider(LLMProvider):
             body["tools"] = _convert_tools(tools)
 
         url = DEFAULT_CODEX_URL
+        started = False
 
         try:
+            token = await asyncio.to_thread(get_codex_token)
+            headers = _build_headers(token.account_id, token.access)
             try:
-                content, tool_calls, finish_reason = await _request_codex(url, headers, body, verify=True)
+                async for chunk in _stream_codex(url, headers, body, verify=True):
+                    started = True
+                    yield chunk
             except Exception as e:
-                if "CERTIFICATE_VERIFY_FAILED" not in str(e):
+                if started or "CERTIFICATE_VERIFY_FAILED" not in str(e):
                     raise
                 logger.warning("SSL certificate verification failed for Codex API; retrying with verify=False")
-                content, tool_calls, finish_reason = await _request_codex(url, headers, body, verify=False)
-            return LLMResponse(
-                content=content,
-                tool_calls=tool_calls,
-                finish_reason=finish_reason,
-            )
+                async for chunk in _stream_codex(url, headers, body, verify=False):
+                    yield chunk
         except Exception as e:
-            return LLMResponse(
+            yield LLMStreamChunk(response=LLMResponse(
                 content=f"Error calling Codex: {str(e)}",
                 finish_reason="error",
-            )
+            ))
 
     def get_default_model(self) -> str:
         return self.default_model
@@ -97,18 +118,19 @@ def _build_headers(account_id: str, token: str) -> dict[str, str]:
     }
 
 
-async def _request_codex(
+async def _stream_codex(
     url: str,
     headers: dict[str, str],
     body: dict[str, Any],
     verify: bool,
-) -> tuple[str, list[ToolCallRequest], str]:
-    async with httpx.AsyncClient(timeout=60.0, verify=verify) as client:
-        async with client.stream("POST", url, headers=headers, json=body) as response:
-            if response.status_code != 200:
-                text = await response.aread()
-                raise RuntimeError(_friendly_error(response.status_code, text.decode("utf-8", "ignore")))
-            return await _consume_sse(response)
+) -> AsyncGenerator[LLMStreamChunk, None]:
+    client = get_http_client("codex" if verify else "codex-insecure", verify=verify)
+    async with client.stream("POST", url, headers=headers, json=body, timeout=60.0) as response:
+        if response.status_code != 200:
+            text = await response.aread()
+            raise RuntimeError(_friendly_error(response.status_code, text.decode("utf-8", "ignore")))
+        async for chunk in _iter_codex_chunks(response):
+            yield chunk
 
 
 def _convert_tools(tools: list[dict[str, Any]]) -> list[dict[str, Any]]:
@@ -242,7 +264,8 @@ async def _iter_sse(response: httpx.Response) -> AsyncGenerator[dict[str, Any],
         buffer.append(line)
 
 
-async def _consume_sse(response: httpx.Response) -> tuple[str, list[ToolCallRequest], str]:
+async def _iter_codex_chunks(response: httpx.Response) -> AsyncGenerator[LLMStreamChunk, None]:
+    """Translate Codex Responses SSE events into stream chunks, ending with the assembled response."""
     content = ""
     tool_calls: list[ToolCallRequest] = []
     tool_call_buffers: dict[str, dict[str, Any]] = {}
@@ -257,16 +280,29 @@ async def _consume_sse(response: httpx.Response) -> tuple[str, list[ToolCallRequ
                 if not call_id:
                     continue
                 tool_call_buffers[call_id] = {
+                    "index": len(tool_call_buffers),
                     "id": item.get("id") or "fc_0",
                     "name": item.get("name"),
                     "arguments": item.get("arguments") or "",
                 }
+                buf = tool_call_buffers[call_id]
+                yield LLMStreamChunk(tool_call=ToolCallDelta(
+                    index=buf["index"], id=f"{call_id}|{buf['id']}", name=buf["name"],
+                    arguments=buf["arguments"],
+                ))
         elif event_type == "response.output_text.delta":
-            content += event.get("delta") or ""
+            delta = event.get("delta") or ""
+            content += delta
+            if delta:
+                yield LLMStreamChunk(content=delta)
         elif event_type == "response.function_call_arguments.delta":
             call_id = event.get("call_id")
             if call_id and call_id in tool_call_buffers:
-                tool_call_buffers[call_id]["arguments"] += event.get("delta") or ""
+                delta = event.get("delta") or ""
+                tool_call_buffers[call_id]["arguments"] += delta
+                yield LLMStreamChunk(tool_call=ToolCallDelta(
+                    index=tool_call_buffers[call_id]["index"], arguments=delta,
+                ))
         elif event_type == "response.function_call_arguments.done":
             call_id = event.get("call_id")
             if call_id and call_id in tool_call_buffers:
@@ -296,7 +332,11 @@ async def _consume_sse(response: httpx.Response) -> tuple[str, list[ToolCallRequ
         elif event_type in {"error", "response.failed"}:
             raise RuntimeError("Codex response failed")
 
-    return content, tool_calls, finish_reason
+    yield LLMStreamChunk(response=LLMResponse(
+        content=content,
+        tool_calls=tool_calls,
+        finish_reason=finish_reason,
+    ))
 
 
 _FINISH_REASON_MAP = {"completed": "stop", "incomplete": "length", "failed": "error", "cancelled": "error"}
@@ -1,11 +1,20 @@
 """OpenAI provider implementation using the official OpenAI SDK."""
 
+import hashlib
 import json
-from typing import Any
+from typing import Any, AsyncIterator
 
 from openai import AsyncOpenAI
 
-from nanobot.providers.base import LLMProvider, LLMResponse, ToolCallRequest
+from nanobot.providers.base import (
+    STREAM_OPTIONS,
+    LLMProvider,
+    LLMResponse,
+    LLMStreamChunk,
+    ToolCallRequest,
+    parse_usage,
+    stream_openai_chunks,
+)
 
 
 class OpenAIProvider(LLMProvider):
@@ -23,10 +32,13 @@ class OpenAIProvider(LLMProvider):
         self,
         api_key: str | None = None,
         api_base: str | None = None,
-        default_model: str = "gpt-4o"
+        default_model: str = "gpt-4o",
+        prompt_caching: bool = True,
     ):
         super().__init__(api_key, api_base)
         self.default_model = default_model
+        # prompt_cache_key is an api.openai.com parameter; compatible servers may reject it
+        self.prompt_caching = prompt_caching and (not api_base or "api.openai.com" in api_base)
 
         # Initialize async OpenAI client
         # If api_key is None, will read from OPENAI_API_KEY env var
@@ -58,6 +70,52 @@ class OpenAIProvider(LLMProvider):
         Returns:
             LLMResponse with content and/or tool calls.
         """
+        kwargs = self._build_kwargs(messages, tools, model, max_tokens, temperature, thinking)
+
+        try:
+            response = await self.client.chat.completions.create(**kwargs)
+            return self._parse_response(response)
+        except Exception as e:
+            # Return error as content for graceful handling
+            return LLMResponse(
+                content=f"Error calling OpenAI API: {str(e)}",
+                finish_reason="error",
+            )
+
+    async def chat_stream(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+        thinking: bool = True,
+    ) -> AsyncIterator[LLMStreamChunk]:
+        """Stream a chat completion via OpenAI SDK (see LLMProvider.chat_stream)."""
+        kwargs = self._build_kwargs(messages, tools, model, max_tokens, temperature, thinking)
+
+        try:
+            stream = await self.client.chat.completions.create(
+                **kwargs, stream=True, stream_options=STREAM_OPTIONS,
+            )
+            async for chunk in stream_openai_chunks(stream):
+                yield chunk
+        except Exception as e:
+            yield LLMStreamChunk(response=LLMResponse(
+                content=f"Error calling OpenAI API: {str(e)}",
+                finish_reason="error",
+            ))
+
+    def _build_kwargs(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None,
+        model: str | None,
+        max_tokens: int,
+        temperature: float,
+        thinking: bool,
+    ) -> dict[str, Any]:
+        """Assemble the chat completion kwargs."""
         model = model or self.default_model
 
         kwargs: dict[str, Any] = {
@@ -83,15 +141,22 @@ class OpenAIProvider(LLMProvider):
             kwargs["tools"] = tools
             kwargs["tool_choice"] = "auto"
 
-        try:
-            response = await self.client.chat.completions.create(**kwargs)
-            return self._parse_response(response)
-        except Exception as e:
-            # Return error as content for graceful handling
-            return LLMResponse(
-                content=f"Error calling OpenAI API: {str(e)}",
-                finish_reason="error",
-            )
+        if self.prompt_caching:
+            kwargs["prompt_cache_key"] = self._prompt_cache_key(messages, tools)
+
+        return kwargs
+
+    @staticmethod
+    def _prompt_cache_key(messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None) -> str:
+        """
+        Key requests by their stable prefix (system prompt + tools).
+
+        OpenAI caches prefixes automatically; the key routes requests that
+        share a prefix to the same cache shard, raising the hit rate.
+        """
+        system = messages[0].get("content") if messages and messages[0].get("role") == "system" else ""
+        digest = hashlib.sha256(json.dumps([system, tools or []], sort_keys=True).encode())
+        return f"nanobot-{digest.hexdigest()[:32]}"
 
     def _parse_response(self, response: Any) -> LLMResponse:
         """Parse OpenAI response into our standard format."""
@@ -115,13 +180,7 @@ class OpenAIProvider(LLMProvider):
                     arguments=args,
                 ))
 
-        usage = {}
-        if response.usage:
-            usage = {
-                "prompt_tokens": response.usage.prompt_tokens,
-                "completion_tokens": response.usage.completion_tokens,
-                "total_tokens": response.usage.total_tokens,
-            }
+        usage = parse_usage(response.usage)
 
         return LLMResponse(
             content=message.content,
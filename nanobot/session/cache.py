@@ -0,0 +1,156 @@
+"""Memory-bounded LRU cache for loaded sessions."""
+
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from nanobot.session.manager import Session
+
+
+@dataclass
+class _Entry:
+    """A cached session plus its size accounting."""
+
+    session: "Session"
+    size: int  # approximate bytes held by session.messages and metadata
+    meta_size: int  # the metadata part of ``size``, re-measured on every put
+    counted: int  # messages already included in ``size``
+    messages: list  # the list ``counted`` refers to (clear() swaps it out)
+    used_at: float
+
+
+def _message_size(message: dict[str, Any]) -> int:
+    """Approximate the memory footprint of one message by its JSON length."""
+    return len(json.dumps(message, ensure_ascii=False, default=str))
+
+
+class SessionCache:
+    """
+    LRU cache of sessions bounded by approximate bytes and entry count.
+
+    Sizes are updated incrementally on ``put``: only messages appended since
+    the last accounting are measured. Sessions for which ``is_pinned`` returns
+    True (e.g. dirty, not yet persisted) are never evicted, so the cache may
+    briefly exceed its limits while they are pending. ``ttl_s`` additionally
+    expires sessions idle for longer than that (0 disables it).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entries: int,
+        ttl_s: float = 0,
+        is_pinned: Callable[[str], bool] | None = None,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._is_pinned = is_pinned or (lambda key: False)
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> "Session | None":
+        """Return a cached session and mark it most recently used."""
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(key, entry, time.monotonic()):
+            self._evict(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry.used_at = time.monotonic()
+        self._entries.move_to_end(key)
+        return entry.session
+
+    def peek(self, key: str) -> "Session | None":
+        """Return a cached session without touching LRU order or hit counters."""
+        entry = self._entries.get(key)
+        return entry.session if entry is not None else None
+
+    def put(self, key: str, session: "Session") -> None:
+        """Insert or refresh a session, re-measure it and enforce the limits."""
+        entry = self._entries.get(key)
+        if entry is None or entry.session is not session or entry.messages is not session.messages:
+            if entry is not None:
+                self.bytes -= entry.size
+            entry = _Entry(
+                session=session,
+                size=0,
+                meta_size=0,
+                counted=0,
+                messages=session.messages,
+                used_at=0.0,
+            )
+            self._entries[key] = entry
+
+        meta_size = _message_size(session.metadata)
+        added = meta_size - entry.meta_size
+        entry.meta_size = meta_size
+        added += sum(_message_size(m) for m in session.messages[entry.counted:])
+        entry.size += added
+        entry.counted = len(session.messages)
+        self.bytes += added
+        entry.used_at = time.monotonic()
+        self._entries.move_to_end(key)
+        self._enforce_limits(keep=key)
+
+    def pop(self, key: str) -> "Session | None":
+        """Remove a session without counting it as an eviction."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self.bytes -= entry.size
+        return entry.session
+
+    def clear(self) -> None:
+        """Drop every cached session."""
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """Return size and hit/miss/eviction counters."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _expired(self, key: str, entry: _Entry, now: float) -> bool:
+        return bool(self.ttl_s) and now - entry.used_at > self.ttl_s and not self._is_pinned(key)
+
+    def _enforce_limits(self, keep: str) -> None:
+        """Evict idle and least recently used unpinned sessions until within limits.
+
+        ``keep`` (the session just stored, which the caller is using) is never evicted.
+        """
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            over = self.bytes > self.max_bytes or len(self._entries) > self.max_entries
+            if not over and not self._expired(key, entry, now):
+                break  # Oldest first: nothing further back is idle either
+            if key != keep and not self._is_pinned(key):
+                self._evict(key)
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        self.evictions += 1
+        logger.debug(f"Session cache evicted {key} (~{entry.size} bytes)")
@@ -1,15 +1,19 @@
 """Session management for conversation history."""
 
+import asyncio
 import json
+import os
 from pathlib import Path
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any
 
-from cachetools import TTLCache
 from loguru import logger
 
+from nanobot.config.schema import SessionConfig
+from nanobot.session.cache import SessionCache
 from nanobot.utils.helpers import ensure_dir, safe_filename
+from nanobot.utils.tokens import TokenCounter, count_message_tokens, estimate_tokens
 
 
 @dataclass
@@ -25,6 +29,7 @@ class Session:
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
     metadata: dict[str, Any] = field(default_factory=dict)
+    last_consolidated: int = 0  # messages[:last_consolidated] are folded into the memory summary
 
     def add_message(self, role: str, content: str, **kwargs: Any) -> None:
         """Add a message to the session."""
@@ -37,42 +42,132 @@ class Session:
         self.messages.append(msg)
         self.updated_at = datetime.now()
 
-    def get_history(self, max_messages: int = 50) -> list[dict[str, Any]]:
+    def get_history(
+        self,
+        max_messages: int = 50,
+        max_tokens: int | None = None,
+        count_tokens: TokenCounter = estimate_tokens,
+        include_summary: bool = False,
+    ) -> list[dict[str, Any]]:
         """
         Get message history for LLM context.
 
         Args:
             max_messages: Maximum messages to return.
+            max_tokens: Token budget; messages are taken newest-first until
+                the next one would exceed it (None = count limit only).
+            count_tokens: Tokenizer used against ``max_tokens``.
+            include_summary: Prepend the consolidated summary stored in
+                ``metadata["summary"]`` (it counts against the budget) and
+                leave out the messages it already covers.
 
         Returns:
             List of messages in LLM format.
         """
+        summary = self.metadata.get("summary") if include_summary else None
+        messages = self.messages[self.last_consolidated:] if summary else self.messages
+
         # Get recent messages
-        recent = self.messages[-max_messages:] if len(self.messages) > max_messages else self.messages
+        recent = messages[-max_messages:] if len(messages) > max_messages else messages
 
         # Convert to LLM format (just role and content)
-        return [{"role": m["role"], "content": m["content"]} for m in recent]
+        history = [{"role": m["role"], "content": m["content"]} for m in recent]
+
+        summary_msg = (
+            {"role": "user", "content": f"[Summary of the earlier conversation]\n{summary}"}
+            if summary else None
+        )
+        if max_tokens is not None:
+            budget = max_tokens
+            if summary_msg:
+                cost = count_message_tokens(summary_msg, count_tokens)
+                if cost <= budget:
+                    budget -= cost
+                else:
+                    summary_msg = None  # a summary that does not fit is dropped whole
+            start = len(history)
+            while start > 0:
+                cost = count_message_tokens(history[start - 1], count_tokens)
+                if cost > budget:
+                    break
+                budget -= cost
+                start -= 1
+            history = history[start:]
+        return [summary_msg, *history] if summary_msg else history
 
     def clear(self) -> None:
         """Clear all messages in the session."""
         self.messages = []
+        self.last_consolidated = 0
+        self.metadata.pop("summary", None)
         self.updated_at = datetime.now()
 
 
+@dataclass
+class _PersistState:
+    """Bookkeeping for incremental saves of one session."""
+
+    persisted: int = 0  # messages of session.messages already stored
+    garbage: int = 0  # superseded metadata records on disk (file backend)
+    last: dict[str, Any] | None = None  # last persisted message (identity-checked)
+    base: int = 0  # stored sequence number of session.messages[0] (supabase backend)
+
+    def matches(self, session: Session) -> bool:
+        """True if the session still extends what is stored (no clear/rewrite since)."""
+        if self.persisted > len(session.messages):
+            return False
+        if self.persisted == 0:
+            return self.last is None
+        return session.messages[self.persisted - 1] is self.last
+
+
 class SessionManager:
     """
     Manages conversation sessions.
 
     Supports two backends:
     - "file" (default): JSONL files in ~/.nanobot/sessions/
-    - "supabase": sesiones_chat table in Supabase
+    - "supabase": sesiones_chat (metadata) + sesiones_chat_mensajes (one row
+      per message) in Supabase; only new rows are inserted on save and only
+      the newest ``load_window`` rows are fetched on load
+
+    In incremental mode (default) the file backend only appends the messages
+    added since the last save, followed by a trailing metadata record. The
+    newest metadata record wins on load; superseded ones are garbage that is
+    compacted away in a background thread once it crosses a threshold.
+
+    With write-behind (default) ``save()`` only marks the session dirty;
+    repeated saves of the same key coalesce and a background task persists
+    all dirty sessions every ``flush_interval_s`` or once ``flush_batch_size``
+    are pending. ``close()`` drains whatever is still dirty.
+
+    Loaded sessions live in a ``SessionCache`` bounded by approximate bytes
+    (``cache_max_bytes``); dirty sessions are pinned until flushed.
     """
 
-    def __init__(self, workspace: Path, backend: str = "file"):
+    def __init__(
+        self,
+        workspace: Path,
+        backend: str = "file",
+        config: SessionConfig | None = None,
+    ):
         self.workspace = workspace
         self.backend = backend
+        self.config = config or SessionConfig()
         self.sessions_dir = ensure_dir(Path.home() / ".nanobot" / "sessions")
-        self._cache: TTLCache = TTLCache(maxsize=100, ttl=7200)
+        self._persist_state: dict[str, _PersistState] = {}
+        self._compactions: dict[str, asyncio.Task] = {}
+        self._dirty: dict[str, Session] = {}
+        self._writing: dict[str, Session] = {}  # being persisted right now
+        self._cache = SessionCache(
+            max_bytes=self.config.cache_max_bytes,
+            max_entries=self.config.cache_max_entries,
+            ttl_s=self.config.cache_ttl_s,
+            is_pinned=self._is_pinned,
+        )
+        self._flush_lock = asyncio.Lock()
+        self._flush_wake: asyncio.Event | None = None
+        self._flush_task: asyncio.Task | None = None
 
     def _get_session_path(self, key: str) -> Path:
         """Get the file path for a session."""
@@ -90,8 +185,14 @@ class SessionManager:
             The session.
         """
         # Check cache first (both backends use it)
-        if key in self._cache:
-            return self._cache[key]
+        session = self._cache.get(key)
+        if session is not None:
+            return session
+        # Not yet flushed (or still being written): the backend copy is stale
+        pending = self.peek(key)
+        if pending is not None:
+            self._cache.put(key, pending)
+            return pending
 
         # Load from backend
         if self.backend == "supabase":
@@ -101,17 +202,108 @@ class SessionManager:
 
         if session is None:
             session = Session(key=key)
+            self._persist_state[key] = _PersistState()
 
-        self._cache[key] = session
+        self._cache.put(key, session)
         return session
 
+    def peek(self, key: str) -> Session | None:
+        """The session held in memory for ``key``, if any; never loads from the backend."""
+        return self._dirty.get(key) or self._writing.get(key) or self._cache.peek(key)
+
     async def save(self, session: Session) -> None:
-        """Save a session to the configured backend."""
+        """Save a session (deferred to the background flusher in write-behind mode)."""
+        if not self.config.write_behind:
+            self._cache.put(session.key, session)
+            await self._write([session])
+            return
+
+        self._dirty[session.key] = session
+        self._cache.put(session.key, session)
+        self._ensure_flusher()
+        if len(self._dirty) >= self.config.flush_batch_size:
+            self._flush_wake.set()
+
+    def cache_stats(self) -> dict[str, int]:
+        """Return session cache size and hit/miss/eviction counters."""
+        return self._cache.stats()
+
+    def _is_pinned(self, key: str) -> bool:
+        """Sessions with unsaved changes, a write in flight or a running compaction must stay cached."""
+        return key in self._dirty or key in self._writing or key in self._compactions
+
+    async def flush(self) -> None:
+        """Persist every dirty session now."""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            batch = list(self._dirty.values())
+            self._dirty.clear()
+            try:
+                await self._write(batch)
+            except Exception as e:
+                logger.error(f"Session flush failed ({len(batch)} sessions): {e}")
+                # Retry on the next flush unless a newer save already re-queued them
+                for session in batch:
+                    self._dirty.setdefault(session.key, session)
+
+    async def _write(self, sessions: list[Session]) -> None:
+        """Persist ``sessions`` while keeping them pinned and visible to ``peek``.
+
+        Evicting a session mid-write would let ``get_or_create`` reload the
+        stale backend copy and resave it over the one being written.
+        """
+        for session in sessions:
+            self._writing[session.key] = session
+        try:
+            await self._persist(sessions)
+        finally:
+            for session in sessions:
+                if self._writing.get(session.key) is session:
+                    del self._writing[session.key]
+
+    async def close(self) -> None:
+        """Stop the background flusher and persist everything still dirty."""
+        task, self._flush_task = self._flush_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        if self._compactions:
+            await asyncio.gather(*self._compactions.values(), return_exceptions=True)
+
+    def _ensure_flusher(self) -> None:
+        """Start the background flush task on first use."""
+        task = self._flush_task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            self._flush_wake = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        """Flush dirty sessions on the interval or when woken by the size trigger."""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wake.wait(), self.config.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wake.clear()
+            if self._dirty:
+                # Shielded so close() cannot abort a batch halfway through
+                await asyncio.shield(self.flush())
+
+    async def _persist(self, sessions: list[Session]) -> None:
+        """Write a batch of sessions to the configured backend."""
         if self.backend == "supabase":
-            await self._save_supabase(session)
-        else:
-            self._save_file(session)
-        self._cache[session.key] = session
+            await self._save_supabase(sessions)
+            return
+        for session in sessions:
+            if self.config.incremental:
+                await self._append_file(session)
+            else:
+                self._save_file(session)
 
     def delete(self, key: str) -> bool:
         """
@@ -125,6 +317,9 @@ class SessionManager:
         """
         # Remove from cache
         self._cache.pop(key, None)
+        self._dirty.pop(key, None)
+        self._writing.pop(key, None)
+        self._persist_state.pop(key, None)
 
         # Remove file (file backend only; supabase deletion not implemented yet)
         path = self._get_session_path(key)
@@ -144,18 +339,19 @@ class SessionManager:
 
         for path in self.sessions_dir.glob("*.jsonl"):
             try:
-                # Read just the metadata line
-                with open(path) as f:
-                    first_line = f.readline().strip()
-                    if first_line:
-                        data = json.loads(first_line)
-                        if data.get("_type") == "metadata":
-                            sessions.append({
-                                "key": path.stem.replace("_", ":"),
-                                "created_at": data.get("created_at"),
-                                "updated_at": data.get("updated_at"),
-                                "path": str(path)
-                            })
+                # Incremental saves end with the newest metadata record;
+                # rewritten files start with it
+                data = json.loads(_read_last_line(path) or "{}")
+                if data.get("_type") != "metadata":
+                    with open(path) as f:
+                        data = json.loads(f.readline().strip() or "{}")
+                if data.get("_type") == "metadata":
+                    sessions.append({
+                        "key": path.stem.replace("_", ":"),
+                        "created_at": data.get("created_at"),
+                        "updated_at": data.get("updated_at"),
+                        "path": str(path)
+                    })
             except Exception:
                 continue
 
@@ -176,29 +372,56 @@ class SessionManager:
             messages = []
             metadata = {}
             created_at = None
+            updated_at = None
+            metadata_records = 0
+            last_consolidated = 0
+            torn = False
 
             with open(path) as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
+                lines = [line for line in f if line.strip()]
+            for i, line in enumerate(lines):
+                try:
                     data = json.loads(line)
-
-                    if data.get("_type") == "metadata":
-                        metadata = data.get("metadata", {})
-                        created_at = (
-                            datetime.fromisoformat(data["created_at"])
-                            if data.get("created_at") else None
-                        )
-                    else:
-                        messages.append(data)
-
+                except json.JSONDecodeError:
+                    # A crash mid-append leaves a torn last line: drop only that one
+                    if i < len(lines) - 1:
+                        raise
+                    logger.warning(f"Session {key}: dropping torn last line of {path.name}")
+                    torn = True
+                    break
+
+                # Later metadata records supersede earlier ones
+                if data.get("_type") == "metadata":
+                    metadata_records += 1
+                    metadata = data.get("metadata", {})
+                    last_consolidated = data.get("last_consolidated", 0)
+                    created_at = (
+                        datetime.fromisoformat(data["created_at"])
+                        if data.get("created_at") else None
+                    )
+                    updated_at = (
+                        datetime.fromisoformat(data["updated_at"])
+                        if data.get("updated_at") else None
+                    )
+                else:
+                    messages.append(data)
+
+            if torn:
+                # No persist state: the next save rewrites the file instead of appending to it
+                self._persist_state.pop(key, None)
+            else:
+                self._persist_state[key] = _PersistState(
+                    persisted=len(messages),
+                    garbage=max(metadata_records - 1, 0),
+                    last=messages[-1] if messages else None,
+                )
             return Session(
                 key=key,
                 messages=messages,
                 created_at=created_at or datetime.now(),
-                metadata=metadata
+                updated_at=updated_at or datetime.now(),
+                metadata=metadata,
+                last_consolidated=last_consolidated,
             )
         except Exception as e:
             logger.warning(f"Failed to load session {key}: {e}")
@@ -207,21 +430,84 @@ class SessionManager:
     def _save_file(self, session: Session) -> None:
         """Save a session to JSONL file (atomic write via tmp + replace)."""
         path = self._get_session_path(session.key)
-        tmp = path.with_suffix(".tmp")
+        _write_snapshot(path, self._metadata_record(session), session.messages)
+        self._persist_state[session.key] = _PersistState(
+            persisted=len(session.messages),
+            last=session.messages[-1] if session.messages else None,
+        )
 
-        with open(tmp, "w") as f:
-            metadata_line = {
-                "_type": "metadata",
-                "created_at": session.created_at.isoformat(),
-                "updated_at": session.updated_at.isoformat(),
-                "metadata": session.metadata
-            }
-            f.write(json.dumps(metadata_line) + "\n")
+    async def _append_file(self, session: Session) -> None:
+        """Append messages added since the last save plus a trailing metadata record.
 
-            for msg in session.messages:
-                f.write(json.dumps(msg) + "\n")
+        Falls back to a full rewrite when the on-disk state is unknown or the
+        in-memory history no longer extends it (e.g. after ``Session.clear()``).
+        """
+        key = session.key
+        if pending := self._compactions.get(key):
+            await asyncio.shield(pending)
 
-        tmp.replace(path)
+        path = self._get_session_path(key)
+        state = self._persist_state.get(key)
+        if state is None or not state.matches(session) or not path.exists():
+            self._save_file(session)
+            return
+
+        new_messages = session.messages[state.persisted:]
+        lines = [json.dumps(m) for m in new_messages]
+        lines.append(json.dumps(self._metadata_record(session)))
+        with open(path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+        state.persisted = len(session.messages)
+        if new_messages:
+            state.last = new_messages[-1]
+        state.garbage += 1
+
+        if self._needs_compaction(state):
+            self._schedule_compaction(session, state)
+
+    def _needs_compaction(self, state: _PersistState) -> bool:
+        """Check whether superseded records crossed the configured threshold."""
+        return (
+            state.garbage >= self.config.compact_min_garbage
+            and state.garbage > self.config.compact_ratio * (state.persisted + 1)
+        )
+
+    def _schedule_compaction(self, session: Session, state: _PersistState) -> None:
+        """Rewrite the session file without superseded records in a worker thread."""
+        key = session.key
+        path = self._get_session_path(key)
+        metadata = self._metadata_record(session)
+        messages = session.messages[:state.persisted]
+
+        def compact() -> None:
+            # Skip if the session was deleted or rewritten meanwhile
+            if self._persist_state.get(key) is not state:
+                return
+            _write_snapshot(path, metadata, messages)
+            state.garbage = 0
+
+        task = asyncio.create_task(asyncio.to_thread(compact))
+        self._compactions[key] = task
+
+        def done(t: asyncio.Task) -> None:
+            if self._compactions.get(key) is t:
+                del self._compactions[key]
+            if not t.cancelled() and t.exception():
+                logger.warning(f"Session compaction failed for {key}: {t.exception()}")
+
+        task.add_done_callback(done)
+
+    @staticmethod
+    def _metadata_record(session: Session) -> dict[str, Any]:
+        """Build the metadata record written alongside the messages."""
+        return {
+            "_type": "metadata",
+            "created_at": session.created_at.isoformat(),
+            "updated_at": session.updated_at.isoformat(),
+            "metadata": session.metadata,
+            "last_consolidated": session.last_consolidated,
+        }
 
     # ------------------------------------------------------------------
     # Supabase backend
@@ -237,13 +523,18 @@ class SessionManager:
         return await _get_client()
 
     async def _load_supabase(self, key: str) -> Session | None:
-        """Load a session from Supabase."""
+        """Load session metadata plus its newest messages in one embedded query.
+
+        Returns None only for a session that does not exist; load errors propagate.
+        """
         try:
             db = await self._get_supabase()
             res = await (
                 db.table("sesiones_chat")
-                .select("messages, metadata, created_at, updated_at")
+                .select("metadata, created_at, updated_at, sesiones_chat_mensajes(seq, mensaje)")
                 .eq("key", key)
+                .order("seq", desc=True, foreign_table="sesiones_chat_mensajes")
+                .limit(self.config.load_window, foreign_table="sesiones_chat_mensajes")
                 .limit(1)
                 .execute()
             )
@@ -251,33 +542,120 @@ class SessionManager:
                 return None
 
             row = res.data[0]
+            rows = sorted(row.get("sesiones_chat_mensajes") or [], key=lambda r: r["seq"])
+            messages = [r["mensaje"] for r in rows]
+            base = rows[0]["seq"] if rows else 0
+            self._persist_state[key] = _PersistState(
+                persisted=len(messages),
+                last=messages[-1] if messages else None,
+                base=base,
+            )
+            metadata = dict(row.get("metadata") or {})
+            # Stored as a seq so it survives loading only the newest messages
+            consolidated_seq = metadata.pop("_last_consolidated_seq", 0)
             return Session(
                 key=key,
-                messages=row.get("messages") or [],
+                messages=messages,
                 created_at=datetime.fromisoformat(row["created_at"]) if row.get("created_at") else datetime.now(),
                 updated_at=datetime.fromisoformat(row["updated_at"]) if row.get("updated_at") else datetime.now(),
-                metadata=row.get("metadata") or {},
+                metadata=metadata,
+                last_consolidated=min(max(consolidated_seq - base, 0), len(messages)),
             )
         except Exception as e:
-            logger.warning(f"Supabase session load failed for {key}: {e}")
-            return None
+            # Never fall back to an empty session: its saves would start over
+            # at seq 0 and collide with (and be dropped as) the stored rows
+            logger.error(f"Supabase session load failed for {key}: {e}")
+            raise
+
+    async def _save_supabase(self, sessions: list[Session]) -> None:
+        """Upsert metadata and insert the messages added since the last save.
+
+        The whole batch costs one bulk upsert into sesiones_chat plus one into
+        sesiones_chat_mensajes, however many sessions it contains.
+        """
+        # Snapshot before the first await: messages appended while the
+        # requests are in flight belong to the next flush
+        plans = []
+        reset_keys = []
+        metadata_rows = []
+        message_rows = []
+        for session in sessions:
+            key = session.key
+            state = self._persist_state.get(key)
+            if state is None or not state.matches(session):
+                # Unknown or rewritten history (e.g. after clear()): replace all rows
+                reset_keys.append(key)
+                state = _PersistState()
+            count = len(session.messages)
+            message_rows.extend(
+                {"session_key": key, "seq": state.base + i, "mensaje": m}
+                for i, m in enumerate(session.messages[state.persisted:count], start=state.persisted)
+            )
+            metadata_rows.append({
+                "key": key,
+                "metadata": {
+                    **session.metadata,
+                    "_last_consolidated_seq": state.base + session.last_consolidated,
+                },
+                "created_at": session.created_at.isoformat(),
+                "updated_at": session.updated_at.isoformat(),
+            })
+            plans.append((key, state, count, session.messages[count - 1] if count else None))
 
-    async def _save_supabase(self, session: Session) -> None:
-        """Save a session to Supabase (upsert)."""
         try:
             db = await self._get_supabase()
-            await (
-                db.table("sesiones_chat")
-                .upsert({
-                    "key": session.key,
-                    "messages": session.messages,
-                    "metadata": session.metadata,
-                    "created_at": session.created_at.isoformat(),
-                    "updated_at": session.updated_at.isoformat(),
-                })
-                .execute()
-            )
+            await db.table("sesiones_chat").upsert(metadata_rows).execute()
+            if reset_keys:
+                await (
+                    db.table("sesiones_chat_mensajes")
+                    .delete()
+                    .in_("session_key", reset_keys)
+                    .execute()
+                )
+            if message_rows:
+                await (
+                    db.table("sesiones_chat_mensajes")
+                    .upsert(message_rows, on_conflict="session_key,seq", ignore_duplicates=True)
+                    .execute()
+                )
+            for key, state, count, last in plans:
+                state.persisted = count
+                state.last = last
+                self._persist_state[key] = state
         except Exception as e:
-            logger.error(f"Supabase session save failed for {session.key}: {e}")
+            logger.error(f"Supabase session save failed for {len(sessions)} sessions: {e}")
             # Fallback: also save to file so data isn't lost
-            self._save_file(session)
+            for session in sessions:
+                _write_snapshot(
+                    self._get_session_path(session.key),
+                    self._metadata_record(session),
+                    session.messages,
+                )
+
+
+def _write_snapshot(path: Path, metadata: dict[str, Any], messages: list[dict[str, Any]]) -> None:
+    """Write a full session file atomically (tmp + replace)."""
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        f.write(json.dumps(metadata) + "\n")
+        for msg in messages:
+            f.write(json.dumps(msg) + "\n")
+    tmp.replace(path)
+
+
+def _read_last_line(path: Path, block_size: int = 4096) -> str:
+    """Read the last non-empty line of a file without scanning it from the start."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        data = b""
+        pos = end
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+            stripped = data.rstrip(b"\n")
+            if b"\n" in stripped:
+                return stripped.rsplit(b"\n", 1)[1].decode()
+        return data.strip().decode()
@@ -0,0 +1,138 @@
+"""Async TTL cache with stale-while-revalidate and single-flight loading."""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+from loguru import logger
+
+
+@dataclass
+class _Entry:
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False, default=str))
+
+
+class AsyncTTLCache:
+    """
+    Small in-process cache for slowly changing reference data.
+
+    - Fresh entries are served directly for ``ttl_s`` seconds.
+    - For ``stale_s`` seconds after that they are still served, while a
+      background refresh replaces them (stale-while-revalidate).
+    - Empty results (``None``, ``[]``, ``{}``, ``""``) are cached for
+      ``negative_ttl_s`` instead, so misses do not pin a "not found" for long.
+    - Values larger than ``max_entry_bytes`` (JSON size) are returned but not stored.
+    - Concurrent misses for the same key share a single load.
+    - Loader errors are never cached; a stale value is kept if a refresh fails.
+    """
+
+    def __init__(
+        self,
+        ttl_s: float = 300.0,
+        stale_s: float = 600.0,
+        negative_ttl_s: float = 30.0,
+        max_entry_bytes: int = 64 * 1024,
+        max_entries: int = 512,
+        size_of: Callable[[Any], int] = _json_size,
+    ):
+        self.ttl_s = ttl_s
+        self.stale_s = stale_s
+        self.negative_ttl_s = negative_ttl_s
+        self.max_entry_bytes = max_entry_bytes
+        self.max_entries = max_entries
+        self._size_of = size_of
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for ``key``, calling ``loader`` when needed."""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now < entry.fresh_until:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if now < entry.stale_until:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self._start_load(key, loader).add_done_callback(_log_refresh_error)
+                return entry.value
+            del self._entries[key]
+
+        self.misses += 1
+        future = self._inflight.get(key) or self._start_load(key, loader)
+        # shield: a cancelled caller must not cancel the load other callers wait on
+        return await asyncio.shield(future)
+
+    def invalidate(self, prefix: tuple = ()) -> int:
+        """
+        Drop entries whose (tuple) key starts with ``prefix``; all if empty.
+
+        Loads already in flight are not stored. Returns the number dropped.
+        """
+        self._generation += 1
+        if not prefix:
+            dropped = len(self._entries)
+            self._entries.clear()
+            return dropped
+        n = len(prefix)
+        stale = [k for k in self._entries if isinstance(k, tuple) and k[:n] == prefix]
+        for k in stale:
+            del self._entries[k]
+        return len(stale)
+
+    def stats(self) -> dict[str, int]:
+        """Return entry count and hit/miss counters."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        generation = self._generation
+
+        async def load() -> Any:
+            try:
+                value = await loader()
+            finally:
+                self._inflight.pop(key, None)
+            if generation == self._generation:
+                self._store(key, value)
+            return value
+
+        task = asyncio.ensure_future(load())
+        self._inflight[key] = task
+        return task
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        if self._size_of(value) > self.max_entry_bytes:
+            self._entries.pop(key, None)
+            return
+        ttl = self.ttl_s if value else self.negative_ttl_s
+        now = time.monotonic()
+        self._entries[key] = _Entry(value, now + ttl, now + ttl + (self.stale_s if value else 0))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _log_refresh_error(task: asyncio.Future) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background cache refresh failed: {}", task.exception())
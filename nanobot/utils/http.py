@@ -0,0 +1,175 @@
+"""Process-wide pooled HTTP clients.
+
+Tools and providers borrow a named ``httpx.AsyncClient`` from here instead of
+opening one per call, so TCP/TLS connections are kept alive and reused. Each
+name is its own connection pool (and thus its own per-host limit); use one
+name per upstream service.
+
+Pooled clients never store cookies: they are shared by every chat, so a
+cookie set for one customer's request must not ride along on the next.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from http.cookiejar import CookieJar
+from typing import Any
+
+import httpx
+from loguru import logger
+
+from nanobot.config.schema import HttpConfig
+
+
+@dataclass
+class _PoolStats:
+    """Counters for one named client."""
+
+    requests: int = 0
+    connections: int = 0  # new TCP connections opened
+    tls_handshakes: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        reused = self.requests - self.connections
+        return {
+            "requests": self.requests,
+            "connections": self.connections,
+            "tls_handshakes": self.tls_handshakes,
+            "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+        }
+
+
+class _MeteredTransport(httpx.AsyncHTTPTransport):
+    """Transport that counts requests and new connections via the httpcore trace hook."""
+
+    def __init__(self, stats: _PoolStats, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._stats.requests += 1
+        outer = request.extensions.get("trace")
+
+        async def trace(event: str, info: dict[str, Any]) -> None:
+            if event.endswith("connect_tcp.complete"):
+                self._stats.connections += 1
+            elif event.endswith("start_tls.complete"):
+                self._stats.tls_handshakes += 1
+            if outer is not None:
+                await outer(event, info)
+
+        request.extensions["trace"] = trace
+        return await super().handle_async_request(request)
+
+
+class _NoCookieJar(CookieJar):
+    """Cookie jar that discards every cookie it is handed."""
+
+    def set_cookie(self, cookie: Any) -> None:
+        pass
+
+    def extract_cookies(self, response: Any, request: Any) -> None:
+        pass
+
+
+class HttpClientPool:
+    """Named, lazily created ``httpx.AsyncClient`` instances sharing one configuration."""
+
+    def __init__(self, config: HttpConfig | None = None):
+        self.config = config or HttpConfig()
+        self._clients: dict[str, tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = {}
+        self._stats: dict[str, _PoolStats] = {}
+        self._http2 = self.config.http2 and _h2_available()
+
+    def get(self, name: str = "default", **options: Any) -> httpx.AsyncClient:
+        """
+        Return the shared client for ``name``, creating it on first use.
+
+        Args:
+            name: Pool name, usually the upstream service (e.g. "brave").
+            **options: Extra ``httpx.AsyncClient`` arguments (verify,
+                follow_redirects, ...). Applied when the client is created,
+                so every caller of a name must pass the same options.
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(name)
+        # Connections are bound to the loop that opened them
+        if entry is not None and entry[1] is loop and not entry[0].is_closed:
+            return entry[0]
+
+        cfg = self.config
+        stats = self._stats.setdefault(name, _PoolStats())
+        limits = httpx.Limits(
+            max_connections=cfg.max_connections,
+            max_keepalive_connections=cfg.max_keepalive_connections,
+            keepalive_expiry=cfg.keepalive_expiry_s,
+        )
+        transport = _MeteredTransport(
+            stats,
+            limits=limits,
+            http2=self._http2,
+            verify=options.pop("verify", True),
+            retries=cfg.connect_retries,
+        )
+        client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(cfg.timeout_s, connect=cfg.connect_timeout_s),
+            cookies=_NoCookieJar(),
+            **options,
+        )
+        self._clients[name] = (client, loop)
+        return client
+
+    async def aclose(self) -> None:
+        """Close every client owned by the running loop.
+
+        Clients of other loops are left alone: their connections can only be
+        closed from the loop that opened them.
+        """
+        loop = asyncio.get_running_loop()
+        for name, (client, owner) in list(self._clients.items()):
+            if owner is loop:
+                await client.aclose()
+                del self._clients[name]
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Return request/connection counters and reuse ratio per client name."""
+        return {name: s.as_dict() for name, s in self._stats.items()}
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+_pool: HttpClientPool | None = None
+
+
+def configure_http(config: HttpConfig) -> None:
+    """Configure the shared pool (call once at startup, before any client is borrowed)."""
+    global _pool
+    _pool = HttpClientPool(config)
+
+
+def get_http_client(name: str = "default", **options: Any) -> httpx.AsyncClient:
+    """Borrow the process-wide client for ``name`` (see ``HttpClientPool.get``)."""
+    global _pool
+    if _pool is None:
+        _pool = HttpClientPool()
+    return _pool.get(name, **options)
+
+
+async def close_http_clients() -> None:
+    """Log connection reuse and close all pooled clients (call on shutdown)."""
+    for name, stats in http_stats().items():
+        logger.info("HTTP pool '{}': {}", name, stats)
+    if _pool is not None:
+        await _pool.aclose()
+
+
+def http_stats() -> dict[str, dict[str, Any]]:
+    """Return connection metrics for all pooled clients."""
+    return _pool.stats() if _pool is not None else {}
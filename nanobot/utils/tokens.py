@@ -0,0 +1,58 @@
+"""Token counting for prompt budgeting.
+
+The default estimator is a character heuristic: it needs no vocabulary files
+and is fast enough to run over a whole history on every turn. Exact
+tokenizers can be registered per model name prefix, e.g.::
+
+    import tiktoken
+    enc = tiktoken.get_encoding("o200k_base")
+    register_tokenizer("gpt-4o", lambda text: len(enc.encode(text)))
+"""
+
+from typing import Any, Callable
+
+TokenCounter = Callable[[str], int]
+
+MESSAGE_OVERHEAD = 4  # role and separators per chat message
+IMAGE_TOKENS = 1000  # rough cost of one attached image
+
+_tokenizers: dict[str, TokenCounter] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count: ~4 characters per token, non-ASCII counted double."""
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127) if not text.isascii() else 0
+    return (len(text) + non_ascii + 3) // 4
+
+
+def register_tokenizer(model_prefix: str, counter: TokenCounter) -> None:
+    """Use ``counter`` for models whose name starts with ``model_prefix`` (longest prefix wins)."""
+    _tokenizers[model_prefix.lower()] = counter
+
+
+def get_token_counter(model: str | None = None) -> TokenCounter:
+    """The registered tokenizer for ``model``, or the heuristic estimator."""
+    if model:
+        name = model.lower()
+        bare = name.split("/", 1)[-1]  # "anthropic/claude-x" also matches "claude"
+        matches = [p for p in _tokenizers if name.startswith(p) or bare.startswith(p)]
+        if matches:
+            return _tokenizers[max(matches, key=len)]
+    return estimate_tokens
+
+
+def count_message_tokens(message: dict[str, Any], counter: TokenCounter = estimate_tokens) -> int:
+    """Tokens of one chat message, including text parts of multimodal content."""
+    content = message.get("content")
+    if isinstance(content, str):
+        tokens = counter(content)
+    elif isinstance(content, list):
+        tokens = sum(
+            counter(part.get("text", "")) if part.get("type") == "text" else IMAGE_TOKENS
+            for part in content
+        )
+    else:
+        tokens = 0
+    return tokens + MESSAGE_OVERHEAD
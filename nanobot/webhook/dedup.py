@@ -0,0 +1,145 @@
+"""Idempotency stores for webhook deliveries.
+
+Evolution API and the CRM both retry deliveries, so every handler records
+the ids it has accepted and drops repeats. ``MemoryDedupStore`` is enough
+for a single gateway process; ``SQLiteDedupStore`` survives restarts and is
+shared by every gateway worker on the same host (WAL mode allows concurrent
+readers and one writer across processes).
+"""
+
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+
+from nanobot.config.schema import GatewayConfig
+
+
+class DedupStore(ABC):
+    """Remembers accepted delivery ids for ``ttl_s`` seconds, at most ``capacity`` of them."""
+
+    def __init__(self, ttl_s: float = 86400.0, capacity: int = 100_000):
+        self.ttl_s = ttl_s
+        self.capacity = max(1, capacity)
+
+    @abstractmethod
+    def check_and_mark(self, key: str) -> bool:
+        """
+        Atomically record ``key``.
+
+        Returns:
+            True if ``key`` was already recorded (a duplicate), False if this
+            call recorded it.
+        """
+
+    @abstractmethod
+    def unmark(self, key: str) -> None:
+        """Forget ``key`` so a retry is accepted (the delivery could not be stored)."""
+
+    def close(self) -> None:
+        """Release resources."""
+
+
+class MemoryDedupStore(DedupStore):
+    """In-process store: an insertion-ordered dict, so the oldest entry expires first."""
+
+    def __init__(self, ttl_s: float = 86400.0, capacity: int = 100_000):
+        super().__init__(ttl_s, capacity)
+        self._expires: OrderedDict[str, float] = OrderedDict()
+
+    def check_and_mark(self, key: str) -> bool:
+        now = time.monotonic()
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at > now:
+            return True
+        self._expires.pop(key, None)
+        self._expires[key] = now + self.ttl_s
+        # Constant TTL: the front of the dict is always the next to expire
+        while self._expires:
+            oldest_key, oldest_exp = next(iter(self._expires.items()))
+            if oldest_exp > now and len(self._expires) <= self.capacity:
+                break
+            del self._expires[oldest_key]
+        return False
+
+    def unmark(self, key: str) -> None:
+        self._expires.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+
+class SQLiteDedupStore(DedupStore):
+    """Store backed by a SQLite database in WAL mode, shared across processes."""
+
+    PRUNE_EVERY = 500  # inserts between expiry/capacity sweeps
+
+    def __init__(self, path: Path, ttl_s: float = 86400.0, capacity: int = 100_000):
+        super().__init__(ttl_s, capacity)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: transactions are managed explicitly below
+        self._db = sqlite3.connect(str(path), timeout=5.0, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS webhook_dedup ("
+            " key TEXT PRIMARY KEY, expires_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_webhook_dedup_expires ON webhook_dedup (expires_at)"
+        )
+        self._inserts = 0
+
+    def check_and_mark(self, key: str) -> bool:
+        now = time.time()  # wall clock: shared with other processes
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")  # take the write lock before reading
+        try:
+            db.execute("DELETE FROM webhook_dedup WHERE key = ? AND expires_at <= ?", (key, now))
+            cur = db.execute(
+                "INSERT OR IGNORE INTO webhook_dedup (key, expires_at) VALUES (?, ?)",
+                (key, now + self.ttl_s),
+            )
+            duplicate = cur.rowcount == 0
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        if not duplicate:
+            self._inserts += 1
+            if self._inserts % self.PRUNE_EVERY == 0:
+                self.prune()
+        return duplicate
+
+    def unmark(self, key: str) -> None:
+        self._db.execute("DELETE FROM webhook_dedup WHERE key = ?", (key,))
+
+    def prune(self) -> None:
+        """Delete expired entries and the oldest ones beyond ``capacity``."""
+        now = time.time()
+        self._db.execute("DELETE FROM webhook_dedup WHERE expires_at <= ?", (now,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM webhook_dedup").fetchone()
+        if count > self.capacity:
+            self._db.execute(
+                "DELETE FROM webhook_dedup WHERE key IN ("
+                " SELECT key FROM webhook_dedup ORDER BY expires_at LIMIT ?)",
+                (count - self.capacity,),
+            )
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def create_dedup_store(config: GatewayConfig) -> DedupStore:
+    """Build the store selected by ``config.dedup_backend`` ("memory" | "sqlite")."""
+    if config.dedup_backend == "sqlite":
+        if config.dedup_path:
+            path = Path(config.dedup_path).expanduser()
+        else:
+            from nanobot.config.loader import get_data_dir
+            path = get_data_dir() / "webhook" / "dedup.db"
+        return SQLiteDedupStore(path, ttl_s=config.dedup_ttl_s, capacity=config.dedup_capacity)
+    if config.dedup_backend != "memory":
+        raise ValueError(f"Unknown dedup backend: {config.dedup_backend}")
+    return MemoryDedupStore(ttl_s=config.dedup_ttl_s, capacity=config.dedup_capacity)
@@ -2,17 +2,23 @@
 
 import hmac
 import json
-from collections import OrderedDict
 
 from aiohttp import web
 from loguru import logger
 
 from nanobot.bus.events import InboundMessage
+from nanobot.webhook.dedup import DedupStore, MemoryDedupStore
 
-# Deduplication buffers
-_processed_ids: OrderedDict[str, None] = OrderedDict()
-_processed_crm_ids: OrderedDict[str, None] = OrderedDict()
-_MAX_DEDUP = 1000
+# Used when the app was built without a "dedup" store (e.g. in tests)
+_default_dedup = MemoryDedupStore()
+
+# CRM events that only signal changed reference data (no customer message)
+_CACHE_EVENTS = {
+    "catalogo_actualizado": "catalogo",
+    "sucursal_actualizada": "sucursales",
+    "horarios_actualizados": "horarios",
+    "cliente_actualizado": "clientes",
+}
 
 
 def phone_to_jid(phone: str) -> str:
@@ -50,6 +56,48 @@ def format_crm_event(payload: dict) -> str:
     )
 
 
+def _dedup(request: web.Request) -> DedupStore:
+    return request.app.get("dedup") or _default_dedup
+
+
+async def _accept(request: web.Request, source: str, payload: dict) -> bool:
+    """
+    Hand a validated event over for delivery.
+
+    With a spool configured the event is only appended to it (the replay
+    task delivers it later); otherwise it is delivered inline.
+
+    Returns:
+        False if the spool could not store the event.
+    """
+    record = {"source": source, "payload": payload}
+    spool = request.app.get("spool")
+    if spool is None:
+        await deliver_event(request.app, record)
+        return True
+    try:
+        await spool.append(record)
+    except OSError as e:
+        logger.error("Webhook spool append failed ({}): {}", source, e)
+        return False
+    return True
+
+
+async def deliver_event(app: web.Application, record: dict) -> None:
+    """Deliver one accepted webhook event, inline or replayed from the spool."""
+    source, payload = record["source"], record["payload"]
+    if source == "evolution":
+        await _deliver_evolution(app, payload)
+    elif source == "crm":
+        await _deliver_crm(app, payload)
+    else:
+        logger.warning("Unknown webhook event source: {}", source)
+
+
+def _unavailable() -> web.Response:
+    return web.json_response({"error": "spool unavailable"}, status=503)
+
+
 def setup_routes(app: web.Application) -> None:
     """Register all webhook routes."""
     app.router.add_post("/webhook/evolution", handle_evolution_webhook)
@@ -59,8 +107,9 @@ def setup_routes(app: web.Application) -> None:
 async def handle_evolution_webhook(request: web.Request) -> web.Response:
     """Handle incoming webhooks from Evolution API.
 
-    Processes MESSAGES_UPSERT events and delegates to the WhatsApp channel's
-    _handle_message() method, which enforces allow_from permissions.
+    Validates MESSAGES_UPSERT events and accepts them for delivery to the
+    WhatsApp channel's _handle_message() method, which enforces allow_from
+    permissions.
     """
     # Parse JSON
     try:
@@ -104,14 +153,28 @@ async def handle_evolution_webhook(request: web.Request) -> web.Response:
     if remote_jid == "status@broadcast":
         return web.json_response({"status": "ignored"})
 
+    if not request.app["channels"].get("whatsapp"):
+        logger.error("Evolution webhook: no 'whatsapp' channel registered")
+        return web.json_response({"error": "channel not available"}, status=500)
+
     # Deduplicate: Evolution API often sends the same message multiple times
     msg_id = key.get("id", "")
-    if msg_id:
-        if msg_id in _processed_ids:
-            return web.json_response({"status": "duplicate"})
-        _processed_ids[msg_id] = None
-        while len(_processed_ids) > _MAX_DEDUP:
-            _processed_ids.popitem(last=False)
+    dedup_key = f"evolution:{msg_id}"
+    if msg_id and _dedup(request).check_and_mark(dedup_key):
+        return web.json_response({"status": "duplicate"})
+
+    if not await _accept(request, "evolution", payload):
+        if msg_id:
+            _dedup(request).unmark(dedup_key)  # let the sender's retry through
+        return _unavailable()
+    return web.json_response({"status": "ok"})
+
+
+async def _deliver_evolution(app: web.Application, payload: dict) -> None:
+    data = payload["data"]
+    key = data["key"]
+    message = data["message"]
+    remote_jid = key.get("remoteJid", "")
 
     # Extract text content from different message types
     content = (
@@ -134,10 +197,10 @@ async def handle_evolution_webhook(request: web.Request) -> web.Response:
     sender_id = remote_jid.split("@")[0] if "@" in remote_jid else remote_jid
 
     # Get the WhatsApp channel and delegate
-    channel = request.app["channels"].get("whatsapp")
+    channel = app["channels"].get("whatsapp")
     if not channel:
         logger.error("Evolution webhook: no 'whatsapp' channel registered")
-        return web.json_response({"error": "channel not available"}, status=500)
+        return
 
     await channel._handle_message(
         sender_id=sender_id,
@@ -145,7 +208,7 @@ async def handle_evolution_webhook(request: web.Request) -> web.Response:
         content=content,
         media=[],
         metadata={
-            "message_id": msg_id,
+            "message_id": key.get("id", ""),
             "push_name": data.get("pushName", ""),
             "instance": payload.get("instance", ""),
             "message_type": message_type,
@@ -153,8 +216,6 @@ async def handle_evolution_webhook(request: web.Request) -> web.Response:
         },
     )
 
-    return web.json_response({"status": "ok"})
-
 
 async def handle_crm_webhook(request: web.Request) -> web.Response:
     """Handle incoming CRM events from GAR."""
@@ -178,6 +239,10 @@ async def handle_crm_webhook(request: web.Request) -> web.Response:
             status=400,
         )
 
+    event_type = payload.get("event", "unknown")
+    if event_type in _CACHE_EVENTS:
+        return _invalidate_cache(_CACHE_EVENTS[event_type])
+
     # Validate required fields
     data = payload.get("data", {})
     cliente = data.get("cliente", {})
@@ -196,28 +261,41 @@ async def handle_crm_webhook(request: web.Request) -> web.Response:
         )
 
     # Dedup: prevent duplicate processing if Edge Function retries
-    if crm_mensaje_id in _processed_crm_ids:
+    dedup_key = f"crm:{crm_mensaje_id}"
+    if _dedup(request).check_and_mark(dedup_key):
         logger.info("Duplicate CRM event ignored: {}", crm_mensaje_id)
         return web.json_response(
             {"status": "duplicate", "crm_mensaje_id": crm_mensaje_id},
             status=200,
         )
-    _processed_crm_ids[crm_mensaje_id] = None
-    while len(_processed_crm_ids) > _MAX_DEDUP:
-        _processed_crm_ids.popitem(last=False)
+
+    if not await _accept(request, "crm", payload):
+        _dedup(request).unmark(dedup_key)  # let the Edge Function's retry through
+        return _unavailable()
+
+    logger.info("CRM webhook accepted: event={} crm_id={}", event_type, crm_mensaje_id)
+
+    return web.json_response(
+        {"status": "accepted", "crm_mensaje_id": crm_mensaje_id},
+        status=202,
+    )
+
+
+async def _deliver_crm(app: web.Application, payload: dict) -> None:
+    data = payload["data"]
+    cliente = data["cliente"]
 
     # Build InboundMessage
-    event_type = payload.get("event", "unknown")
     content = format_crm_event(payload)
 
     msg = InboundMessage(
         channel="crm_event",
         sender_id="crm_system",
-        chat_id=phone_to_jid(phone),
+        chat_id=phone_to_jid(cliente["telefono_whatsapp"]),
         content=content,
         metadata={
-            "event_type": event_type,
-            "crm_mensaje_id": crm_mensaje_id,
+            "event_type": payload.get("event", "unknown"),
+            "crm_mensaje_id": data["crm_mensaje_id"],
             "reply_channel": "whatsapp",
             "cliente": cliente,
             "pedido": data.get("pedido", {}),
@@ -230,12 +308,13 @@ async def handle_crm_webhook(request: web.Request) -> web.Response:
         },
     )
 
-    bus = request.app["bus"]
-    await bus.publish_inbound(msg)
+    await app["bus"].publish_inbound(msg)
 
-    logger.info("CRM webhook accepted: event={} crm_id={}", event_type, crm_mensaje_id)
 
-    return web.json_response(
-        {"status": "accepted", "crm_mensaje_id": crm_mensaje_id},
-        status=202,
-    )
+def _invalidate_cache(scope: str) -> web.Response:
+    """Flush the consulta tool's cached reference data after a CRM change."""
+    from nanobot.agent.tools.supabase import invalidate_reference_cache
+
+    dropped = invalidate_reference_cache(scope)
+    logger.info("CRM cache invalidation: scope={} dropped={}", scope, dropped)
+    return web.json_response({"status": "invalidated", "scope": scope}, status=200)
@@ -9,6 +9,7 @@ See nanobot/webhook/README.md for architecture details and migration guide.
 """
 
 import asyncio
+from functools import partial
 
 from aiohttp import web
 from loguru import logger
@@ -16,7 +17,9 @@ from loguru import logger
 from nanobot.bus.queue import MessageBus
 from nanobot.channels.base import BaseChannel
 from nanobot.config.schema import GatewayConfig
-from nanobot.webhook.routes import setup_routes
+from nanobot.webhook.dedup import create_dedup_store
+from nanobot.webhook.routes import deliver_event, setup_routes
+from nanobot.webhook.spool import create_spool
 
 
 async def start_webhook_server(
@@ -38,9 +41,14 @@ async def start_webhook_server(
     app["bus"] = bus
     app["channels"] = channels
     app["config"] = config
+    app["dedup"] = create_dedup_store(config)
+    app["spool"] = spool = create_spool(config)
 
     setup_routes(app)
 
+    # Deliver events spooled by a previous run first, then new ones as they land
+    replay_task = asyncio.create_task(spool.replay(partial(deliver_event, app))) if spool else None
+
     runner = web.AppRunner(app)
     await runner.setup()
 
@@ -56,4 +64,12 @@ async def start_webhook_server(
         pass
     finally:
         await runner.cleanup()
+        if replay_task:
+            replay_task.cancel()
+            await asyncio.gather(replay_task, return_exceptions=True)
+        # Replayed events are checkpointed once published: do not leave them in the coalescer
+        await bus.flush_pending()
+        if spool:
+            await spool.close()
+        app["dedup"].close()
         logger.info("Webhook server stopped")
@@ -0,0 +1,303 @@
+"""Durable inbound spool for webhook events.
+
+Handlers append each accepted event to an append-only log and answer the
+sender as soon as the record is on disk; a replay task feeds the log into
+the bus at the agent's pace and checkpoints how far it got. Bursts are then
+bounded by disk append speed instead of by the bus, and a restart replays
+whatever was acknowledged but not yet delivered (at-least-once).
+
+Layout of ``directory``:
+
+- ``<base offset>.log`` segments; a record is ``<u32 length><u32 crc32><json>``
+  and a record's offset is the segment base plus its position in the file,
+  so offsets grow monotonically across segments.
+- ``checkpoint``: offset of the first record not yet delivered.
+
+Appends are group-committed: concurrent appends share one fsync, issued
+``fsync_interval_s`` after the first of them.
+"""
+
+import asyncio
+import json
+import os
+import struct
+import zlib
+from contextlib import suppress
+from pathlib import Path
+from typing import Any, Awaitable, BinaryIO, Callable
+
+from loguru import logger
+
+from nanobot.config.schema import GatewayConfig
+
+_HEADER = struct.Struct("<II")  # payload length, crc32 of payload
+
+
+def _segment_name(base: int) -> str:
+    return f"{base:020d}.log"
+
+
+def _scan(path: Path, start: int = 0, stop: int | None = None, limit: int | None = None):
+    """
+    Yield ``(end position, record bytes)`` for the valid records of a segment.
+
+    Stops at ``stop``, after ``limit`` records, or at the first torn or
+    corrupt record (a crash can leave a partial write at the tail).
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        pos, count = start, 0
+        while (stop is None or pos < stop) and (limit is None or count < limit):
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, crc = _HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length or zlib.crc32(data) != crc:
+                return
+            pos += _HEADER.size + length
+            count += 1
+            yield pos, data
+
+
+def _fsync_all(files: list[BinaryIO]) -> None:
+    for f in files:
+        os.fsync(f.fileno())
+
+
+class WebhookSpool:
+    """Append-only segment log with group-committed fsync and a replay cursor."""
+
+    READ_BATCH = 256  # records per replay batch (one checkpoint write each)
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_bytes: int = 64 * 1024 * 1024,
+        fsync_interval_s: float = 0.005,
+    ):
+        self.directory = directory
+        self.segment_bytes = max(1, segment_bytes)
+        self.fsync_interval_s = fsync_interval_s
+        directory.mkdir(parents=True, exist_ok=True)
+
+        self._checkpoint = self._load_checkpoint()
+        self._bases = sorted(int(p.stem) for p in directory.glob("*.log"))
+        if self._bases:
+            base = self._bases[-1]
+            end = self._recover_tail(base)
+        else:
+            # Everything consumed (or a fresh spool): continue after the checkpoint
+            base = end = self._checkpoint
+            self._bases = [base]
+        self._checkpoint = max(self._checkpoint, self._bases[0])
+
+        self._base = base
+        self._file: BinaryIO = open(directory / _segment_name(base), "ab")
+        self._end = end  # offset after the last appended record
+        self._committed = end  # offset after the last fsynced record
+        self._sealed: list[BinaryIO] = []  # rolled segments awaiting their last fsync
+        self._waiters: list[asyncio.Future] = []
+        self._committer: asyncio.Task | None = None
+        self._readable = asyncio.Event()
+        self._closed = False
+
+    # -- append side ---------------------------------------------------------
+
+    async def append(self, record: dict[str, Any]) -> int:
+        """
+        Append ``record`` and wait until it is durable.
+
+        Returns:
+            The offset just past the record.
+        """
+        if self._closed:
+            raise RuntimeError("Spool is closed")
+        data = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode()
+        if self._end - self._base >= self.segment_bytes:
+            self._roll()
+        self._file.write(_HEADER.pack(len(data), zlib.crc32(data)) + data)
+        self._end += _HEADER.size + len(data)
+        offset = self._end
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if self._committer is None:
+            self._committer = asyncio.create_task(self._commit_loop())
+        await asyncio.shield(waiter)
+        return offset
+
+    def _roll(self) -> None:
+        # The committer still owns the old file until its final fsync
+        self._sealed.append(self._file)
+        self._base = self._end
+        self._bases.append(self._base)
+        self._file = open(self.directory / _segment_name(self._base), "ab")
+
+    async def _commit_loop(self) -> None:
+        try:
+            while self._waiters:
+                if self.fsync_interval_s > 0:
+                    await asyncio.sleep(self.fsync_interval_s)
+                waiters, self._waiters = self._waiters, []
+                files, self._sealed = [*self._sealed, self._file], []
+                end = self._end
+                try:
+                    for f in files:
+                        f.flush()
+                    await asyncio.to_thread(_fsync_all, files)
+                except OSError as e:
+                    logger.error("Webhook spool fsync failed, discarding unsynced appends: {}", e)
+                    # Appends made during the failed fsync are discarded with it
+                    waiters += self._waiters
+                    self._waiters = []
+                    self._rollback(files)
+                    for w in waiters:
+                        if not w.done():
+                            w.set_exception(e)
+                    continue
+                for f in files[:-1]:
+                    f.close()  # sealed segments are done once synced
+                self._committed = end
+                self._readable.set()
+                for w in waiters:
+                    if not w.done():
+                        w.set_result(None)
+        finally:
+            self._committer = None
+
+    def _rollback(self, files: list[BinaryIO]) -> None:
+        """
+        Truncate the log back to the last commit after a failed fsync.
+
+        The senders of the unsynced records got an error and will retry;
+        keeping the records would let the next commit cover them and
+        deliver those events twice.
+        """
+        for f in [*files, *self._sealed, self._file]:
+            with suppress(OSError):
+                f.close()
+        self._sealed = []
+        try:
+            while self._bases[-1] > self._committed:
+                (self.directory / _segment_name(self._bases.pop())).unlink(missing_ok=True)
+            self._base = self._bases[-1]
+            path = self.directory / _segment_name(self._base)
+            os.truncate(path, self._committed - self._base)
+            self._file = open(path, "ab")
+            self._end = self._committed
+        except OSError as e:
+            logger.error("Webhook spool rollback failed, refusing further appends: {}", e)
+            self._closed = True
+
+    # -- replay side ---------------------------------------------------------
+
+    async def replay(self, handler: Callable[[dict[str, Any]], Awaitable[None]]) -> None:
+        """
+        Deliver durable records to ``handler`` in order, forever.
+
+        A record whose handler raises is logged and skipped so that one bad
+        event cannot stall the spool. Cancel the task to stop; records not
+        yet checkpointed are delivered again on the next start.
+        """
+        while True:
+            self._readable.clear()
+            batch, next_pos = self._read_batch()
+            if next_pos == self._checkpoint:
+                await self._readable.wait()
+                continue
+            try:
+                for end, data in batch:
+                    try:
+                        await handler(json.loads(data))
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        logger.error("Webhook spool: dropping record before offset {}: {}", end, e)
+                    self._checkpoint = end
+                self._checkpoint = next_pos
+            finally:
+                self._save_checkpoint()
+                self._drop_consumed_segments()
+
+    def _read_batch(self) -> tuple[list[tuple[int, bytes]], int]:
+        """Read up to ``READ_BATCH`` durable records; return them and the offset after them."""
+        batch: list[tuple[int, bytes]] = []
+        pos = self._checkpoint
+        while pos < self._committed and len(batch) < self.READ_BATCH:
+            index = max(i for i, b in enumerate(self._bases) if b <= pos)
+            base = self._bases[index]
+            seg_end = self._bases[index + 1] if index + 1 < len(self._bases) else self._committed
+            for end, data in _scan(
+                self.directory / _segment_name(base),
+                start=pos - base,
+                stop=min(seg_end, self._committed) - base,
+                limit=self.READ_BATCH - len(batch),
+            ):
+                pos = base + end
+                batch.append((pos, data))
+            if pos < seg_end and len(batch) < self.READ_BATCH:
+                # Unreadable bytes inside a committed range: skip the rest of the segment
+                logger.error("Webhook spool: corrupt segment {}, skipping to {}", base, seg_end)
+                pos = seg_end
+        return batch, pos
+
+    # -- bookkeeping ---------------------------------------------------------
+
+    @property
+    def backlog_bytes(self) -> int:
+        """Durable bytes not yet delivered."""
+        return self._committed - self._checkpoint
+
+    def _load_checkpoint(self) -> int:
+        try:
+            return int((self.directory / "checkpoint").read_text().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _save_checkpoint(self) -> None:
+        tmp = self.directory / "checkpoint.tmp"
+        tmp.write_text(str(self._checkpoint))
+        os.replace(tmp, self.directory / "checkpoint")
+
+    def _recover_tail(self, base: int) -> int:
+        """Truncate a torn record at the end of the last segment; return the end offset."""
+        path = self.directory / _segment_name(base)
+        valid = 0
+        for valid, _ in _scan(path):
+            pass
+        if valid < path.stat().st_size:
+            logger.warning("Webhook spool: truncating torn tail of {}", path.name)
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+        return base + valid
+
+    def _drop_consumed_segments(self) -> None:
+        while len(self._bases) > 1 and self._bases[1] <= self._checkpoint:
+            base = self._bases.pop(0)
+            (self.directory / _segment_name(base)).unlink(missing_ok=True)
+
+    async def close(self) -> None:
+        """Wait for pending appends to become durable and close the log."""
+        self._closed = True
+        if self._committer is not None:
+            await self._committer
+        self._file.close()
+        for f in self._sealed:
+            f.close()
+
+
+def create_spool(config: GatewayConfig) -> WebhookSpool | None:
+    """Build the spool configured in ``config``, or None when it is disabled."""
+    if not config.spool_enabled:
+        return None
+    if config.spool_dir:
+        directory = Path(config.spool_dir).expanduser()
+    else:
+        from nanobot.config.loader import get_data_dir
+        directory = get_data_dir() / "webhook" / "spool"
+    return WebhookSpool(
+        directory,
+        segment_bytes=config.spool_segment_mb * 1024 * 1024,
+        fsync_interval_s=config.spool_fsync_ms / 1000,
+    )
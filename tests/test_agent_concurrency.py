@@ -0,0 +1,153 @@
+"""Tests for the AgentLoop worker pool, provider caps and session locks."""
+
+import asyncio
+
+import pytest
+
+from nanobot.agent.loop import AgentLoop
+from nanobot.bus.events import InboundMessage
+from nanobot.bus.queue import MessageBus
+from nanobot.config.schema import BusConfig, SessionConfig
+from nanobot.providers.base import LLMProvider, LLMResponse
+
+
+class _SlowProvider(LLMProvider):
+    """Tracks how many chat calls run at the same time."""
+
+    def __init__(self, delay: float = 0.05):
+        super().__init__()
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def chat(self, messages, tools=None, model=None, max_tokens=4096,
+                   temperature=0.7, thinking=True) -> LLMResponse:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        self.calls += 1
+        return LLMResponse(content="ok")
+
+    def get_default_model(self) -> str:
+        return "test-model"
+
+
+@pytest.fixture
+def make_agent(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+    def make(provider: LLMProvider, **kwargs) -> AgentLoop:
+        return AgentLoop(
+            bus=MessageBus(),
+            provider=provider,
+            workspace=tmp_path,
+            session_config=SessionConfig(write_behind=False),
+            **kwargs,
+        )
+
+    return make
+
+
+def _msg(chat_id: str, content: str = "hola") -> InboundMessage:
+    return InboundMessage(channel="whatsapp", sender_id="u", chat_id=chat_id, content=content)
+
+
+async def _run_until(agent: AgentLoop, done) -> None:
+    task = asyncio.create_task(agent.run())
+    try:
+        for _ in range(200):
+            if done():
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        agent.stop()
+        await asyncio.wait_for(task, timeout=5.0)
+
+
+async def test_worker_pool_bounds_concurrent_turns(make_agent):
+    provider = _SlowProvider()
+    agent = make_agent(provider, max_concurrent_messages=2)
+    for i in range(6):
+        await agent.bus.publish_inbound(_msg(str(i)))
+
+    await _run_until(agent, lambda: provider.calls == 6)
+
+    assert provider.calls == 6
+    assert provider.peak == 2
+
+
+async def test_session_backlog_does_not_hold_workers(make_agent):
+    provider = _SlowProvider(delay=0.1)
+    started = []
+    chat = provider.chat
+
+    async def record(messages, **kwargs):
+        started.append(messages[-1]["content"])
+        return await chat(messages, **kwargs)
+
+    provider.chat = record
+    agent = make_agent(provider, max_concurrent_messages=2)
+    for i in range(3):
+        await agent.bus.publish_inbound(_msg("busy", f"a{i}"))
+
+    async def late_message():
+        while not started:
+            await asyncio.sleep(0.005)
+        await agent.bus.publish_inbound(_msg("quiet", "b0"))
+
+    late = asyncio.create_task(late_message())
+    await _run_until(agent, lambda: provider.calls == 4)
+    await late
+
+    # The second worker took the quiet chat instead of waiting behind "busy"
+    assert started[:2] == ["a0", "b0"]
+    assert provider.peak == 2
+
+
+async def test_provider_inflight_cap_is_shared(make_agent):
+    provider = _SlowProvider()
+    agents = [make_agent(provider, provider_max_inflight=1) for _ in range(2)]
+
+    await asyncio.gather(*(
+        a.process_direct("hola", session_key=f"cli:{i}") for i, a in enumerate(agents)
+    ))
+
+    assert provider.peak == 1
+
+
+async def test_session_locks_are_reclaimed(make_agent):
+    agent = make_agent(_SlowProvider(delay=0))
+    await asyncio.gather(*(agent._handle_message(_msg(str(i))) for i in range(5)))
+    assert agent._session_locks == {}
+
+
+async def test_stop_drains_in_flight_turn(make_agent):
+    provider = _SlowProvider(delay=0.2)
+    agent = make_agent(provider, max_concurrent_messages=1)
+    await agent.bus.publish_inbound(_msg("1"))
+
+    await _run_until(agent, lambda: provider.active == 1)
+
+    # run() returned only after the turn in progress completed
+    assert provider.calls == 1
+    assert agent.bus.outbound_size == 1
+
+
+async def test_stop_processes_bursts_held_by_the_coalescer(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    provider = _SlowProvider(delay=0)
+    agent = AgentLoop(
+        bus=MessageBus(BusConfig(coalesce_ms={"whatsapp": 60_000})),
+        provider=provider,
+        workspace=tmp_path,
+        session_config=SessionConfig(write_behind=False),
+    )
+    await agent.bus.publish_inbound(_msg("1"))
+
+    await _run_until(agent, lambda: bool(agent._workers))  # stop while the burst is still held
+
+    assert provider.calls == 1
@@ -0,0 +1,83 @@
+"""Tests for debounced inbound message coalescing."""
+
+import asyncio
+
+from nanobot.bus.events import InboundMessage
+from nanobot.bus.queue import MessageBus
+from nanobot.config.schema import BusConfig
+
+
+def _msg(content: str, chat_id: str = "51987654321@s.whatsapp.net", channel: str = "whatsapp", **metadata):
+    return InboundMessage(
+        channel=channel, sender_id="u", chat_id=chat_id, content=content, metadata=metadata,
+    )
+
+
+def _bus(**kwargs) -> MessageBus:
+    return MessageBus(BusConfig(coalesce_ms={"whatsapp": 50}, **kwargs))
+
+
+async def test_burst_is_merged_into_one_message():
+    bus = _bus()
+    for i, text in enumerate(["hola", "quería saber", "mi pedido"]):
+        await bus.publish_inbound(_msg(text, message_id=f"m{i}"))
+    assert bus.inbound_size == 3
+
+    msg = await asyncio.wait_for(bus.consume_inbound(), timeout=1.0)
+    assert msg.content == "hola\nquería saber\nmi pedido"
+    assert msg.metadata["coalesced_count"] == 3
+    assert msg.metadata["coalesced_message_ids"] == ["m0", "m1", "m2"]
+    assert bus.inbound_size == 0
+
+
+async def test_sessions_and_channels_are_independent():
+    bus = _bus()
+    await bus.publish_inbound(_msg("a", chat_id="1"))
+    await bus.publish_inbound(_msg("b", chat_id="2"))
+    await bus.publish_inbound(_msg("tg", channel="telegram"))
+
+    # Channels without a window pass straight through
+    first = await asyncio.wait_for(bus.consume_inbound(), timeout=0.01)
+    assert first.content == "tg"
+    rest = {(await asyncio.wait_for(bus.consume_inbound(), timeout=1.0)).content for _ in range(2)}
+    assert rest == {"a", "b"}
+
+
+async def test_pass_through_message_follows_the_pending_burst():
+    bus = _bus()
+    await bus.publish_inbound(_msg("hola"))
+    await bus.publish_inbound(_msg("Su boleta", template_sugerido="Su boleta"))
+
+    first = await asyncio.wait_for(bus.consume_inbound(), timeout=0.01)
+    await bus.task_done(first)
+    second = await asyncio.wait_for(bus.consume_inbound(), timeout=0.01)
+    assert [first.content, second.content] == ["hola", "Su boleta"]
+    assert bus.coalescer.pending == 0
+
+
+async def test_max_messages_flushes_immediately():
+    bus = _bus(coalesce_max_messages=2)
+    await bus.publish_inbound(_msg("uno"))
+    await bus.publish_inbound(_msg("dos"))
+    msg = await asyncio.wait_for(bus.consume_inbound(), timeout=0.01)
+    assert msg.content == "uno\ndos"
+
+
+async def test_max_wait_caps_a_continuous_burst():
+    bus = _bus(coalesce_max_wait_ms=120)
+    for i in range(6):
+        await bus.publish_inbound(_msg(str(i)))
+        await asyncio.sleep(0.03)  # each message arrives inside the 50ms window
+
+    msg = await asyncio.wait_for(bus.consume_inbound(), timeout=1.0)
+    assert 1 < msg.metadata["coalesced_count"] < 6
+
+
+async def test_flush_pending_forwards_held_bursts():
+    bus = _bus()
+    await bus.publish_inbound(_msg("hola"))
+    await bus.publish_inbound(_msg("sigo aquí"))
+    await bus.flush_pending()
+    msg = await asyncio.wait_for(bus.consume_inbound(), timeout=0.01)
+    assert msg.content == "hola\nsigo aquí"
+    assert bus.coalescer.pending == 0
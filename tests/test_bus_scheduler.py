@@ -0,0 +1,149 @@
+"""Tests for the inbound priority / fair-share scheduler."""
+
+import asyncio
+
+import pytest
+
+from nanobot.bus.events import InboundMessage
+from nanobot.bus.queue import MessageBus
+from nanobot.bus.scheduler import classify
+from nanobot.config.schema import BusClassConfig, BusConfig
+
+
+def _msg(channel: str, chat_id: str, content: str = "", **metadata) -> InboundMessage:
+    return InboundMessage(
+        channel=channel, sender_id="u", chat_id=chat_id, content=content, metadata=metadata,
+    )
+
+
+def test_classify():
+    assert classify(_msg("whatsapp", "1")) == "interactive"
+    assert classify(_msg("crm_event", "1")) == "crm"
+    assert classify(_msg("cron", "1")) == "background"
+    assert classify(_msg("handoff:ventas", "1", origin_channel="crm_event")) == "crm"
+    assert classify(_msg("crm_event", "1", priority="interactive")) == "interactive"
+
+
+async def test_interactive_messages_jump_ahead_of_crm_burst():
+    bus = MessageBus()
+    for i in range(50):
+        await bus.publish_inbound(_msg("crm_event", f"crm{i}"))
+    await bus.publish_inbound(_msg("whatsapp", "live"))
+
+    first = await bus.consume_inbound()
+    assert first.chat_id == "live"
+
+
+async def test_round_robin_across_sessions():
+    bus = MessageBus()
+    for i in range(3):
+        await bus.publish_inbound(_msg("whatsapp", "chatty", f"a{i}"))
+    await bus.publish_inbound(_msg("whatsapp", "quiet", "b0"))
+
+    order = []
+    for _ in range(4):
+        msg = await bus.consume_inbound()
+        order.append(msg.content)
+        await bus.task_done(msg)
+    assert order == ["a0", "b0", "a1", "a2"]
+
+
+async def test_busy_session_is_skipped_until_task_done():
+    bus = MessageBus()
+    for i in range(3):
+        await bus.publish_inbound(_msg("whatsapp", "chatty", f"a{i}"))
+    await bus.publish_inbound(_msg("whatsapp", "quiet", "b0"))
+
+    first = await bus.consume_inbound()
+    assert (await bus.consume_inbound()).content == "b0"  # not a1: chatty is busy
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(bus.consume_inbound(), timeout=0.05)
+
+    await bus.task_done(first)
+    assert (await asyncio.wait_for(bus.consume_inbound(), timeout=1.0)).content == "a1"
+
+
+async def test_class_concurrency_limit_until_task_done():
+    config = BusConfig(crm=BusClassConfig(max_concurrency=1, max_depth=10))
+    bus = MessageBus(config)
+    await bus.publish_inbound(_msg("crm_event", "1"))
+    await bus.publish_inbound(_msg("crm_event", "2"))
+
+    first = await bus.consume_inbound()
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(bus.consume_inbound(), timeout=0.05)
+
+    await bus.task_done(first)
+    second = await asyncio.wait_for(bus.consume_inbound(), timeout=1.0)
+    assert second.chat_id == "2"
+
+
+async def test_backpressure_blocks_publisher_when_full():
+    config = BusConfig(crm=BusClassConfig(max_concurrency=4, max_depth=2))
+    bus = MessageBus(config)
+    await bus.publish_inbound(_msg("crm_event", "1"))
+    await bus.publish_inbound(_msg("crm_event", "2"))
+
+    blocked = asyncio.create_task(bus.publish_inbound(_msg("crm_event", "3")))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+    assert bus.stats()["crm"]["blocked_producers"] == 1
+
+    await bus.consume_inbound()
+    await asyncio.wait_for(blocked, timeout=1.0)
+    assert bus.inbound_size == 2
+
+
+async def test_stats_record_wait_histogram():
+    bus = MessageBus()
+    await bus.publish_inbound(_msg("whatsapp", "1"))
+    msg = await bus.consume_inbound()
+    await bus.task_done(msg)
+
+    stats = bus.stats()["interactive"]
+    assert stats["wait_s"]["count"] == 1
+    assert stats["depth_on_enqueue"]["le_1"] == 1
+    assert stats["in_flight"] == 0
+
+
+class TestRouting:
+    """Per-consumer queues and dead letters."""
+
+    @pytest.fixture
+    def bus(self):
+        bus = MessageBus()
+        bus.register_consumer("lavanderia", {"whatsapp", "crm_event"})
+        bus.register_consumer("soporte", {"telegram"})
+        return bus
+
+    async def _next(self, bus, consumer):
+        return await asyncio.wait_for(bus.consume_inbound(consumer), timeout=1.0)
+
+    async def test_routes_by_channel(self, bus):
+        await bus.publish_inbound(_msg("telegram", "1"))
+        await bus.publish_inbound(_msg("whatsapp", "2"))
+        assert (await self._next(bus, "soporte")).chat_id == "1"
+        assert (await self._next(bus, "lavanderia")).chat_id == "2"
+
+    async def test_handoff_by_name_or_channel(self, bus):
+        await bus.publish_inbound(_msg("handoff:soporte", "1", origin_channel="whatsapp"))
+        await bus.publish_inbound(_msg("handoff:whatsapp", "2", origin_channel="telegram"))
+        assert (await self._next(bus, "soporte")).chat_id == "1"
+        assert (await self._next(bus, "lavanderia")).chat_id == "2"
+
+    async def test_system_messages_follow_origin_channel(self, bus):
+        await bus.publish_inbound(_msg("system", "telegram:42"))
+        assert (await self._next(bus, "soporte")).chat_id == "telegram:42"
+
+    async def test_unserved_messages_go_to_dead_letters(self, bus):
+        await bus.publish_inbound(_msg("slack", "1"))
+        await bus.publish_inbound(_msg("handoff:nadie", "2"))
+        assert bus.dead_letter_count == 2
+        assert [m.chat_id for m in bus.dead_letters] == ["1", "2"]
+        assert bus.inbound_size == 0
+
+    async def test_catch_all_consumer_and_duplicate_names(self, bus):
+        assert bus.register_consumer("general") == "general"
+        assert bus.register_consumer("general") == "general#2"
+        await bus.publish_inbound(_msg("slack", "1"))
+        assert (await self._next(bus, "general")).chat_id == "1"
@@ -0,0 +1,62 @@
+"""Tests for system prompt memoization in ContextBuilder."""
+
+import os
+
+from nanobot.agent.context import ContextBuilder
+
+
+def _bump_mtime(path) -> None:
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_static_prompt_reused_until_files_change(tmp_path):
+    entity_dir = tmp_path / "agents" / "general"
+    entity_dir.mkdir(parents=True)
+    identity = entity_dir / "IDENTITY.md"
+    identity.write_text("Soy nanobot. Hoy es {now}.", encoding="utf-8")
+    builder = ContextBuilder(tmp_path)
+
+    prompt = builder.build_system_prompt()
+    assert "Soy nanobot" in prompt and "{now}" not in prompt
+    cached = builder._static_prompt
+    builder.build_system_prompt()
+    assert builder._static_prompt is cached
+
+    identity.write_text("Soy otro bot.", encoding="utf-8")
+    _bump_mtime(identity)
+    assert "Soy otro bot." in builder.build_system_prompt()
+
+
+def test_memory_change_invalidates_prompt(tmp_path):
+    builder = ContextBuilder(tmp_path)
+    assert "Long-term Memory" not in builder.build_system_prompt()
+
+    builder.memory.write_long_term("El cliente prefiere entregas por la tarde.")
+    _bump_mtime(builder.memory.memory_file)
+    assert "entregas por la tarde" in builder.build_system_prompt()
+
+
+def test_customer_context_is_not_memoized(tmp_path):
+    builder = ContextBuilder(tmp_path)
+    assert "Cliente: Ana" in builder.build_system_prompt(customer_context="Cliente: Ana")
+    assert "Cliente: Ana" not in builder.build_system_prompt(customer_context="")
+
+
+def test_static_prefix_is_shared_across_chats(tmp_path):
+    entity_dir = tmp_path / "agents" / "general"
+    entity_dir.mkdir(parents=True)
+    (entity_dir / "IDENTITY.md").write_text("Soy nanobot. Hoy es {now}.", encoding="utf-8")
+    builder = ContextBuilder(tmp_path, static_prefix=True)
+
+    first = builder.build_messages([], "hola", channel="whatsapp", chat_id="1",
+                                   customer_context="Cliente: Ana")
+    second = builder.build_messages([], "hola", channel="telegram", chat_id="2")
+
+    assert first[0] == second[0]
+    assert "Soy nanobot. Hoy es (see Runtime Context)." in first[0]["content"]
+    assert "Chat ID" not in first[0]["content"] and "Ana" not in first[0]["content"]
+    runtime = first[-1]["content"]
+    assert runtime.startswith("## Runtime Context\nTime: ")
+    assert "Chat ID: 1" in runtime and "Cliente: Ana" in runtime
+    assert runtime.endswith("hola")
@@ -239,6 +239,24 @@ class TestCRMWebhook:
         )
         assert resp.status == 400
 
+    @pytest.mark.asyncio
+    async def test_catalog_event_invalidates_cache(self, aiohttp_client, app, bus, monkeypatch):
+        from nanobot.agent.tools import supabase
+
+        scopes = []
+        monkeypatch.setattr(
+            supabase, "invalidate_reference_cache", lambda scope=None: scopes.append(scope) or 0,
+        )
+        client = await aiohttp_client(app)
+        resp = await client.post(
+            "/webhook/crm",
+            json={"event": "catalogo_actualizado", "data": {}},
+            headers={"Authorization": "Bearer test-secret"},
+        )
+        assert resp.status == 200
+        assert scopes == ["catalogo"]
+        assert bus.inbound_size == 0
+
 
 class TestFormatCRMEvent:
     """Test the format_crm_event helper."""
@@ -0,0 +1,60 @@
+"""Tests for token-budgeted session history."""
+
+import pytest
+
+from nanobot.session.manager import Session
+from nanobot.utils import tokens
+from nanobot.utils.tokens import (
+    MESSAGE_OVERHEAD,
+    estimate_tokens,
+    get_token_counter,
+    register_tokenizer,
+)
+
+
+def _session(*contents: str) -> Session:
+    session = Session(key="test:budget")
+    for i, content in enumerate(contents):
+        session.add_message("user" if i % 2 == 0 else "assistant", content)
+    return session
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd" * 10) == 10
+    assert estimate_tokens("ñ" * 4) == 2  # non-ASCII counts double
+
+
+def test_tokenizer_registry_longest_prefix(monkeypatch):
+    monkeypatch.setattr(tokens, "_tokenizers", {})
+    register_tokenizer("gpt", lambda text: 1)
+    register_tokenizer("gpt-4o", lambda text: 2)
+    assert get_token_counter("gpt-4o-mini")("x") == 2
+    assert get_token_counter("openai/gpt-3.5")("x") == 1
+    assert get_token_counter("claude-sonnet") is estimate_tokens
+
+
+def test_budget_fills_newest_first():
+    session = _session("a" * 400, "b" * 40, "c" * 40)  # 100, 10, 10 tokens
+    history = session.get_history(max_tokens=2 * (10 + MESSAGE_OVERHEAD))
+    assert [m["content"][0] for m in history] == ["b", "c"]
+
+    # Stops at the first message that does not fit, even if older ones would
+    session = _session("a", "b" * 400, "c" * 40)
+    assert [m["content"][0] for m in session.get_history(max_tokens=100)] == ["c"]
+
+
+def test_budget_still_honours_max_messages():
+    session = _session(*("x" for _ in range(10)))
+    assert len(session.get_history(max_messages=3, max_tokens=10_000)) == 3
+
+
+@pytest.mark.parametrize("budget, expected", [(10_000, 3), (40, 2)])
+def test_summary_counts_against_budget(budget, expected):
+    session = _session("a" * 40, "b" * 40)
+    session.metadata["summary"] = "s" * 40
+    history = session.get_history(max_tokens=budget, include_summary=True)
+    assert len(history) == expected
+    if expected == 3:
+        assert history[0]["content"].startswith("[Summary of the earlier conversation]")
+    assert session.get_history(include_summary=False)[0]["content"].startswith("a")
@@ -0,0 +1,67 @@
+"""Tests for the indexed HISTORY.md search."""
+
+import pytest
+
+from nanobot.agent.memory import MemoryStore
+from nanobot.agent.tools.memory import MAX_OUTPUT_CHARS, SearchHistoryTool
+
+
+@pytest.fixture
+def memory(tmp_path):
+    store = MemoryStore(tmp_path)
+    store.append_history("[2026-01-05 09:00] Cliente pidió lavado en seco de un abrigo de lana.")
+    store.append_history("[2026-01-20 18:30] Se acordó la entrega del edredón.\n\nSegundo párrafo: pago pendiente.")
+    store.append_history("[2026-02-02 11:15] Reclamo por una mancha de café en camisa.")
+    return store
+
+
+def test_keyword_search_returns_only_matches(memory):
+    results = memory.history_index.search("cafe camisa")  # accents and case ignored
+    assert results == ["[2026-02-02 11:15] Reclamo por una mancha de café en camisa."]
+    # Multi-paragraph entries stay whole
+    assert memory.history_index.search("pendiente")[0].startswith("[2026-01-20 18:30]")
+    assert memory.history_index.search("inexistente") == []
+
+
+def test_date_range_is_inclusive_and_newest_first(memory):
+    results = memory.history_index.search(since="2026-01-05", until="2026-01-20")
+    assert [r[:17] for r in results] == ["[2026-01-20 18:30", "[2026-01-05 09:00"]
+    assert len(memory.history_index.search("lana", since="2026-01-06")) == 0
+
+
+def test_index_is_incremental_and_rebuilt_after_edits(memory):
+    db = memory.history_index._connect()
+    assert db.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 3
+
+    # Appended by other means (e.g. exec): picked up on the next search
+    with open(memory.history_file, "a", encoding="utf-8") as f:
+        f.write("[2026-03-01 08:00] Nuevo cliente corporativo.\n\n")
+    assert memory.history_index.search("corporativo")
+
+    # Rewritten: the index is rebuilt instead of pointing at stale offsets
+    memory.history_file.write_text("[2026-04-01 10:00] Historial reiniciado.\n\n", encoding="utf-8")
+    assert memory.history_index.search(since="2026-01-01") == ["[2026-04-01 10:00] Historial reiniciado."]
+
+
+def test_existing_history_is_indexed_on_first_search(tmp_path):
+    (tmp_path / "memory").mkdir()
+    (tmp_path / "memory" / "HISTORY.md").write_text(
+        "Nota sin fecha.\n\nOtra nota sin fecha.\n\n", encoding="utf-8",
+    )
+    assert MemoryStore(tmp_path).history_index.search("otra") == ["Otra nota sin fecha."]
+
+
+async def test_search_history_tool(memory):
+    tool = SearchHistoryTool(memory)
+    assert "mancha de café" in await tool.execute(query="mancha")
+    assert await tool.execute(query="nada") == "No matching history entries."
+    assert (await tool.execute()).startswith("Error")
+    assert (await tool.execute(since="enero")).startswith("Error")
+    assert (await tool.execute(query="?!")).startswith("Error")  # no searchable terms
+
+
+async def test_search_history_tool_bounds_an_oversized_entry(memory):
+    memory.append_history("[2026-03-01 08:00] enorme " + "x" * (2 * MAX_OUTPUT_CHARS))
+    result = await SearchHistoryTool(memory).execute(since="2026-02-01")
+    assert len(result) < MAX_OUTPUT_CHARS + 200
+    assert "(entry truncated)" in result and result.endswith("1 more entries; narrow the search")
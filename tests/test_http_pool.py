@@ -0,0 +1,97 @@
+"""Tests for the shared HTTP client pool."""
+
+import asyncio
+
+from nanobot.config.schema import HttpConfig
+from nanobot.utils.http import HttpClientPool
+
+
+async def _serve_keepalive():
+    """Minimal HTTP/1.1 server that keeps connections open."""
+    accepted = 0
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        nonlocal accepted
+        accepted += 1
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}/", lambda: accepted
+
+
+async def test_same_name_returns_same_client():
+    pool = HttpClientPool(HttpConfig())
+    try:
+        assert pool.get("a") is pool.get("a")
+        assert pool.get("a") is not pool.get("b")
+    finally:
+        await pool.aclose()
+
+
+async def test_closed_client_is_recreated():
+    pool = HttpClientPool(HttpConfig())
+    first = pool.get("a")
+    await pool.aclose()
+    second = pool.get("a")
+    try:
+        assert second is not first and not second.is_closed
+    finally:
+        await pool.aclose()
+
+
+async def test_connections_are_reused_and_counted():
+    server, url, accepted = await _serve_keepalive()
+    pool = HttpClientPool(HttpConfig())
+    try:
+        client = pool.get("local")
+        for _ in range(5):
+            r = await client.get(url)
+            assert r.text == "ok"
+        stats = pool.stats()["local"]
+        assert stats["requests"] == 5
+        assert stats["connections"] == 1
+        assert stats["reuse_ratio"] == 0.8
+        assert accepted() == 1
+    finally:
+        await pool.aclose()
+        server.close()
+        await server.wait_closed()
+
+
+async def test_cookies_are_not_shared_between_requests():
+    seen: list[bytes] = []
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while head := await reader.readuntil(b"\r\n\r\n"):
+                seen.append(head)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nSet-Cookie: sid=customer-a\r\nContent-Length: 2\r\n\r\nok"
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+    pool = HttpClientPool(HttpConfig())
+    try:
+        client = pool.get("web")
+        await client.get(url)
+        await client.get(url)
+        assert not client.cookies
+        assert b"cookie:" not in seen[1].lower()
+    finally:
+        await pool.aclose()
+        server.close()
+        await server.wait_closed()
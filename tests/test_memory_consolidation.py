@@ -0,0 +1,154 @@
+"""Tests for background memory consolidation in the agent loop."""
+
+import asyncio
+
+import pytest
+
+from nanobot.agent.loop import AgentLoop
+from nanobot.bus.events import InboundMessage
+from nanobot.bus.queue import MessageBus
+from nanobot.config.schema import SessionConfig
+from nanobot.providers.base import LLMProvider, LLMResponse, ToolCallRequest
+from nanobot.session.manager import Session, SessionManager
+
+
+class _MemoryProvider(LLMProvider):
+    """Answers chat turns with "ok" and consolidation requests with save_memory."""
+
+    def __init__(self):
+        super().__init__()
+        self.prompts: list[str] = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def chat(self, messages, tools=None, model=None, max_tokens=4096,
+                   temperature=0.7, thinking=True) -> LLMResponse:
+        if not tools or tools[0]["function"]["name"] != "save_memory":
+            return LLMResponse(content="ok")
+        self.prompts.append(messages[-1]["content"])
+        await self.release.wait()
+        return LLMResponse(content=None, tool_calls=[ToolCallRequest(
+            id="1", name="save_memory", arguments={
+                "history_entry": f"[2026-01-01 10:00] round {len(self.prompts)}",
+                "memory_update": "# Memory",
+                "conversation_summary": f"summary {len(self.prompts)}",
+            },
+        )])
+
+    def get_default_model(self) -> str:
+        return "test-model"
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return AgentLoop(
+        bus=MessageBus(),
+        provider=_MemoryProvider(),
+        workspace=tmp_path,
+        session_config=SessionConfig(write_behind=False),
+        consolidate_after_messages=6,
+        consolidate_keep_messages=2,
+    )
+
+
+async def _turn(agent: AgentLoop, text: str = "hola") -> None:
+    await agent._process_message(
+        InboundMessage(channel="whatsapp", sender_id="u", chat_id="c1", content=text)
+    )
+
+
+async def test_consolidates_in_background_after_threshold(agent):
+    for i in range(3):
+        await _turn(agent, f"m{i}")
+    assert "whatsapp:c1" in agent._consolidations
+    await asyncio.gather(*agent._consolidations.values())
+
+    session = await agent.sessions.get_or_create("whatsapp:c1")
+    assert session.last_consolidated == 4
+    assert session.metadata["summary"] == "summary 1"
+    history = agent._history(session)
+    assert history[0]["content"] == "[Summary of the earlier conversation]\nsummary 1"
+    assert [m["content"] for m in history[1:]] == ["m2", "ok"]
+    assert "round 1" in agent.context.memory.history_file.read_text()
+
+
+async def test_turns_are_not_blocked_and_later_messages_are_kept(agent):
+    agent.provider.release.clear()
+    for i in range(3):
+        await _turn(agent, f"m{i}")
+    task = agent._consolidations["whatsapp:c1"]
+    while not agent.provider.prompts:
+        await asyncio.sleep(0)
+
+    await _turn(agent, "m3")  # runs while the consolidation LLM call is pending
+    assert agent._consolidations["whatsapp:c1"] is task
+
+    agent.provider.release.set()
+    await task
+    session = await agent.sessions.get_or_create("whatsapp:c1")
+    assert session.last_consolidated == 4
+    assert [m["content"] for m in session.messages[4:]] == ["m2", "ok", "m3", "ok"]
+
+
+async def test_below_threshold_does_nothing(agent):
+    await _turn(agent)
+    assert not agent._consolidations
+    assert agent.provider.prompts == []
+
+
+async def test_previous_summary_is_passed_to_the_next_round(agent):
+    session = Session(key="whatsapp:c1")
+    for i in range(8):
+        session.add_message("user", f"m{i}")
+    session.metadata["summary"] = "earlier summary"
+    session.last_consolidated = 2
+
+    assert await agent.context.memory.consolidate(
+        session, agent.provider, "test-model", memory_window=4,
+    )
+    assert "earlier summary" in agent.provider.prompts[0]
+    assert "m1" not in agent.provider.prompts[0] and "m5" in agent.provider.prompts[0]
+    assert session.last_consolidated == 6
+
+
+async def test_last_consolidated_survives_reload(tmp_path):
+    manager = SessionManager(tmp_path, config=SessionConfig(write_behind=False))
+    session = await manager.get_or_create("whatsapp:c1")
+    for i in range(5):
+        session.add_message("user", f"m{i}")
+    session.last_consolidated = 3
+    session.metadata["summary"] = "s"
+    await manager.save(session)
+
+    reloaded = await SessionManager(tmp_path).get_or_create("whatsapp:c1")
+    assert reloaded.last_consolidated == 3
+    assert reloaded.metadata == {"summary": "s"}
+
+
+async def test_evicted_session_is_not_reloaded_or_saved(agent, monkeypatch):
+    for i in range(3):
+        await _turn(agent, f"m{i}")
+    agent.sessions._cache.clear()  # evicted while the consolidation runs
+    loads = []
+    monkeypatch.setattr(agent.sessions, "_load_file", lambda key: loads.append(key))
+    await asyncio.gather(*agent._consolidations.values())
+    assert loads == []
+
+
+async def test_consolidations_of_one_memory_dir_do_not_interleave(agent):
+    agent.provider.release.clear()
+    first, second = Session(key="whatsapp:a"), Session(key="whatsapp:b")
+    for session in (first, second):
+        for i in range(4):
+            session.add_message("user", f"{session.key} {i}")
+    memory = agent.context.memory
+    tasks = [
+        asyncio.create_task(memory.consolidate(s, agent.provider, "test-model", memory_window=2))
+        for s in (first, second)
+    ]
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert len(agent.provider.prompts) == 1  # the second round waits for MEMORY.md
+    agent.provider.release.set()
+    assert await asyncio.gather(*tasks) == [True, True]
@@ -0,0 +1,80 @@
+"""Tests for the per-chat outbound dispatcher."""
+
+import asyncio
+import time
+
+from nanobot.bus.events import OutboundMessage
+from nanobot.channels.dispatch import OutboundDispatcher
+from nanobot.config.schema import OutboundLimitConfig
+
+
+class _Recorder:
+    """Fake channel send: slow for chat "slow", records completion order."""
+
+    def __init__(self):
+        self.sent: list[str] = []
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self, msg: OutboundMessage) -> None:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.2 if msg.chat_id == "slow" else 0.01)
+        finally:
+            self.active -= 1
+        self.sent.append(f"{msg.chat_id}:{msg.content}")
+
+
+def _msg(chat_id: str, content: str = "", channel: str = "whatsapp") -> OutboundMessage:
+    return OutboundMessage(channel=channel, chat_id=chat_id, content=content)
+
+
+async def _settle(dispatcher: OutboundDispatcher) -> None:
+    await dispatcher.close(timeout=5.0)
+
+
+async def test_slow_chat_does_not_block_others():
+    send = _Recorder()
+    dispatcher = OutboundDispatcher(send)
+    dispatcher.submit(_msg("slow", "1"))
+    dispatcher.submit(_msg("fast", "1"))
+
+    await asyncio.sleep(0.1)
+    assert send.sent == ["fast:1"]
+    await _settle(dispatcher)
+    assert send.sent == ["fast:1", "slow:1"]
+
+
+async def test_per_chat_order_is_preserved():
+    send = _Recorder()
+    dispatcher = OutboundDispatcher(send)
+    for i in range(5):
+        dispatcher.submit(_msg("a", str(i)))
+    await _settle(dispatcher)
+    assert send.sent == [f"a:{i}" for i in range(5)]
+    assert dispatcher.pending == 0
+
+
+async def test_channel_concurrency_limit():
+    send = _Recorder()
+    limits = {"whatsapp": OutboundLimitConfig(max_concurrent_chats=2)}
+    dispatcher = OutboundDispatcher(send, limits)
+    for i in range(6):
+        dispatcher.submit(_msg(str(i)))
+    dispatcher.submit(_msg("x", channel="telegram"))  # separate channel, default limits
+    await _settle(dispatcher)
+    assert len(send.sent) == 7
+    assert send.peak <= 3
+
+
+async def test_channel_rate_limit():
+    send = _Recorder()
+    limits = {"whatsapp": OutboundLimitConfig(sends_per_second=50, burst=1)}
+    dispatcher = OutboundDispatcher(send, limits)
+    start = time.monotonic()
+    for i in range(6):
+        dispatcher.submit(_msg(str(i)))
+    await _settle(dispatcher)
+    assert len(send.sent) == 6
+    assert time.monotonic() - start >= 5 / 50
@@ -0,0 +1,71 @@
+"""Tests for provider prompt caching (cache breakpoints, cache keys, usage)."""
+
+from types import SimpleNamespace
+
+from nanobot.providers.base import add_cache_breakpoints, parse_usage
+from nanobot.providers.litellm_provider import LiteLLMProvider
+from nanobot.providers.openai_provider import OpenAIProvider
+
+MESSAGES = [
+    {"role": "system", "content": "You are nanobot."},
+    {"role": "user", "content": "hola"},
+    {"role": "assistant", "content": "", "tool_calls": []},
+    {"role": "tool", "tool_call_id": "1", "content": "ok"},
+]
+TOOLS = [
+    {"type": "function", "function": {"name": "a"}},
+    {"type": "function", "function": {"name": "b"}},
+]
+
+
+def test_breakpoints_mark_tools_system_and_last_user_message():
+    messages, tools = add_cache_breakpoints(MESSAGES, TOOLS)
+
+    assert "cache_control" not in tools[0] and tools[1]["cache_control"] == {"type": "ephemeral"}
+    assert messages[0]["content"] == [
+        {"type": "text", "text": "You are nanobot.", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert messages[1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert messages[3] is MESSAGES[3]
+    # Inputs are untouched
+    assert MESSAGES[0]["content"] == "You are nanobot."
+    assert "cache_control" not in TOOLS[1]
+
+
+def test_litellm_marks_only_caching_providers():
+    provider = LiteLLMProvider(default_model="anthropic/claude-sonnet-4-5")
+    kwargs = provider._build_kwargs(MESSAGES, TOOLS, None, 100, 0.7, True)
+    assert kwargs["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+
+    kwargs = provider._build_kwargs(MESSAGES, TOOLS, "gpt-4o", 100, 0.7, True)
+    assert kwargs["messages"] is MESSAGES
+
+    disabled = LiteLLMProvider(default_model="anthropic/claude-sonnet-4-5", prompt_caching=False)
+    assert disabled._build_kwargs(MESSAGES, None, None, 100, 0.7, True)["messages"] is MESSAGES
+
+
+def test_openai_prompt_cache_key_is_stable_per_prefix():
+    provider = OpenAIProvider(api_key="sk-test")
+    first = provider._build_kwargs(MESSAGES, TOOLS, None, 100, 0.7, True)["prompt_cache_key"]
+    later_turn = [*MESSAGES, {"role": "user", "content": "otra"}]
+    assert provider._build_kwargs(later_turn, TOOLS, None, 100, 0.7, True)["prompt_cache_key"] == first
+
+    compatible = OpenAIProvider(api_key="x", api_base="http://localhost:8000/v1")
+    assert "prompt_cache_key" not in compatible._build_kwargs(MESSAGES, TOOLS, None, 100, 0.7, True)
+
+
+def test_usage_reports_cache_tokens():
+    anthropic = SimpleNamespace(
+        prompt_tokens=1200, completion_tokens=50, total_tokens=1250,
+        cache_read_input_tokens=1000, cache_creation_input_tokens=150,
+    )
+    assert parse_usage(anthropic) == {
+        "prompt_tokens": 1200, "completion_tokens": 50, "total_tokens": 1250,
+        "cache_read_tokens": 1000, "cache_write_tokens": 150,
+    }
+    openai = SimpleNamespace(
+        prompt_tokens=1200, completion_tokens=50, total_tokens=1250,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=1024),
+    )
+    assert parse_usage(openai)["cache_read_tokens"] == 1024
+    assert parse_usage(None) == {}
@@ -0,0 +1,93 @@
+"""Tests for the memory-bounded session cache."""
+
+import time
+
+import pytest
+
+from nanobot.config.schema import SessionConfig
+from nanobot.session.cache import SessionCache
+from nanobot.session.manager import Session, SessionManager
+
+
+def _session(key: str, size: int = 100) -> Session:
+    session = Session(key=key)
+    session.add_message("user", "x" * size)
+    return session
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = SessionCache(max_bytes=700, max_entries=100)
+    for key in ("a", "b", "c"):
+        cache.put(key, _session(key, 120))
+    cache.get("a")
+    cache.put("d", _session("d", 120))
+
+    assert "b" not in cache
+    assert "a" in cache and "d" in cache
+    assert cache.bytes <= 700
+    assert cache.stats()["evictions"] == 1
+
+
+def test_pinned_sessions_are_not_evicted():
+    cache = SessionCache(max_bytes=10_000, max_entries=1, is_pinned=lambda key: key == "a")
+    cache.put("a", _session("a"))
+    cache.put("b", _session("b"))
+
+    assert "a" in cache
+    assert "b" in cache  # newest is kept while the pinned one holds the slot
+    cache.put("c", _session("c"))
+    assert "a" in cache and "b" not in cache
+
+
+def test_size_tracks_appended_messages_and_clear():
+    cache = SessionCache(max_bytes=10_000, max_entries=10)
+    session = _session("a", 100)
+    cache.put("a", session)
+    before = cache.bytes
+    session.add_message("assistant", "y" * 500)
+    cache.put("a", session)
+    assert cache.bytes > before + 500
+
+    session.clear()
+    cache.put("a", session)
+    assert cache.bytes < before
+
+
+def test_size_tracks_metadata_changes():
+    cache = SessionCache(max_bytes=10_000, max_entries=10)
+    session = _session("a", 100)
+    cache.put("a", session)
+    before = cache.bytes
+
+    session.metadata["summary"] = "z" * 1000
+    cache.put("a", session)
+    assert cache.bytes > before + 1000
+
+    session.metadata.clear()
+    cache.put("a", session)
+    assert cache.bytes == before
+
+
+def test_idle_ttl_and_hit_miss_counters():
+    cache = SessionCache(max_bytes=10_000, max_entries=10, ttl_s=0.01)
+    cache.put("a", _session("a"))
+    assert cache.get("a") is not None
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_manager_keeps_dirty_sessions_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    manager = SessionManager(
+        tmp_path, config=SessionConfig(cache_max_bytes=1, flush_interval_s=60),
+    )
+    session = await manager.get_or_create("whatsapp:1")
+    session.add_message("user", "hola")
+    await manager.save(session)
+
+    assert await manager.get_or_create("whatsapp:1") is session
+    await manager.close()
+    assert manager.cache_stats()["hits"] >= 1
@@ -0,0 +1,334 @@
+"""Tests for SessionManager persistence."""
+
+import asyncio
+import json
+
+import pytest
+
+from nanobot.config.schema import SessionConfig
+from nanobot.session.manager import Session, SessionManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return SessionManager(tmp_path, config=SessionConfig(write_behind=False))
+
+
+def _lines(manager: SessionManager, key: str) -> list[dict]:
+    path = manager._get_session_path(key)
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+class TestIncrementalFileBackend:
+    """Append-only saves for the file backend."""
+
+    @pytest.mark.asyncio
+    async def test_first_save_writes_header_and_messages(self, manager):
+        session = Session(key="whatsapp:1")
+        session.add_message("user", "hola")
+        await manager.save(session)
+
+        lines = _lines(manager, "whatsapp:1")
+        assert lines[0]["_type"] == "metadata"
+        assert [line["content"] for line in lines[1:]] == ["hola"]
+
+    @pytest.mark.asyncio
+    async def test_save_appends_only_new_messages(self, manager):
+        session = Session(key="whatsapp:2")
+        session.add_message("user", "hola")
+        await manager.save(session)
+        session.add_message("assistant", "buenas")
+        session.metadata["x"] = 1
+        await manager.save(session)
+
+        lines = _lines(manager, "whatsapp:2")
+        messages = [line for line in lines if line.get("_type") != "metadata"]
+        assert [m["content"] for m in messages] == ["hola", "buenas"]
+        assert lines[-1]["_type"] == "metadata"
+        assert lines[-1]["metadata"] == {"x": 1}
+
+    @pytest.mark.asyncio
+    async def test_reload_uses_newest_metadata(self, manager):
+        session = Session(key="whatsapp:3")
+        for i in range(3):
+            session.add_message("user", f"msg{i}")
+            session.metadata["turn"] = i
+            await manager.save(session)
+
+        manager._cache.clear()
+        loaded = await manager.get_or_create("whatsapp:3")
+        assert [m["content"] for m in loaded.messages] == ["msg0", "msg1", "msg2"]
+        assert loaded.metadata == {"turn": 2}
+
+    @pytest.mark.asyncio
+    async def test_torn_last_line_is_dropped_and_rewritten(self, manager):
+        session = Session(key="whatsapp:7")
+        session.add_message("user", "hola")
+        session.add_message("assistant", "buenas")
+        await manager.save(session)
+        path = manager._get_session_path("whatsapp:7")
+        with open(path, "a") as f:
+            f.write('{"role": "user", "content": "me qued')  # crash mid-append
+
+        fresh = SessionManager(manager.workspace, config=SessionConfig(write_behind=False))
+        loaded = await fresh.get_or_create("whatsapp:7")
+        assert [m["content"] for m in loaded.messages] == ["hola", "buenas"]
+
+        loaded.add_message("user", "sigo")
+        await fresh.save(loaded)
+        assert [m["content"] for m in _lines(fresh, "whatsapp:7") if "content" in m] == [
+            "hola", "buenas", "sigo",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_clear_triggers_full_rewrite(self, manager):
+        session = Session(key="whatsapp:4")
+        session.add_message("user", "old")
+        await manager.save(session)
+        session.clear()
+        session.add_message("user", "new")
+        await manager.save(session)
+
+        messages = [m for m in _lines(manager, "whatsapp:4") if m.get("_type") != "metadata"]
+        assert [m["content"] for m in messages] == ["new"]
+
+    @pytest.mark.asyncio
+    async def test_compaction_drops_superseded_metadata(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        manager = SessionManager(
+            tmp_path,
+            config=SessionConfig(compact_ratio=0.1, compact_min_garbage=3, write_behind=False),
+        )
+        session = Session(key="whatsapp:5")
+        for i in range(6):
+            session.add_message("user", f"msg{i}")
+            await manager.save(session)
+        await asyncio.gather(*manager._compactions.values())
+
+        lines = _lines(manager, "whatsapp:5")
+        assert sum(1 for line in lines if line.get("_type") == "metadata") < 6
+        manager._cache.clear()
+        loaded = await manager.get_or_create("whatsapp:5")
+        assert len(loaded.messages) == 6
+
+    @pytest.mark.asyncio
+    async def test_list_sessions_reads_trailing_metadata(self, manager):
+        session = Session(key="whatsapp:6")
+        session.add_message("user", "hola")
+        await manager.save(session)
+        session.add_message("assistant", "buenas")
+        await manager.save(session)
+
+        listed = manager.list_sessions()
+        assert listed[0]["updated_at"] == session.updated_at.isoformat()
+
+
+class _FakeQuery:
+    """Minimal chainable stand-in for a postgrest request builder."""
+
+    def __init__(self, db: "_FakeSupabase", table: str):
+        self.db, self.table, self.op, self.payload = db, table, "select", None
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def upsert(self, payload, **kwargs):
+        self.op, self.payload = "upsert", payload
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def in_(self, column, values):
+        self.payload = values
+        return self
+
+    async def execute(self):
+        self.db.calls.append((self.table, self.op, self.payload))
+        return type("Res", (), {"data": self.db.rows if self.op == "select" else []})()
+
+
+class _FakeSupabase:
+    def __init__(self, rows=None):
+        self.calls: list[tuple] = []
+        self.rows = rows or []
+
+    def table(self, name):
+        return _FakeQuery(self, name)
+
+
+class TestSupabaseBackend:
+    """Row-per-message persistence for the Supabase backend."""
+
+    @pytest.fixture
+    def db(self):
+        return _FakeSupabase()
+
+    @pytest.fixture
+    def manager(self, tmp_path, monkeypatch, db):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        manager = SessionManager(
+            tmp_path, backend="supabase", config=SessionConfig(write_behind=False),
+        )
+
+        async def get_db():
+            return db
+
+        monkeypatch.setattr(manager, "_get_supabase", get_db)
+        return manager
+
+    @pytest.mark.asyncio
+    async def test_save_inserts_only_new_rows(self, manager, db):
+        session = await manager.get_or_create("whatsapp:1")
+        session.add_message("user", "hola")
+        session.add_message("assistant", "buenas")
+        await manager.save(session)
+        session.add_message("user", "gracias")
+        await manager.save(session)
+
+        inserts = [p for t, op, p in db.calls if t == "sesiones_chat_mensajes" and op == "upsert"]
+        assert [[r["seq"] for r in rows] for rows in inserts] == [[0, 1], [2]]
+        assert all(
+            "messages" not in p for t, op, p in db.calls if t == "sesiones_chat" and op == "upsert"
+        )
+
+    @pytest.mark.asyncio
+    async def test_load_continues_sequence_after_window(self, manager, db):
+        db.rows = [{
+            "metadata": {},
+            "created_at": None,
+            "updated_at": None,
+            "sesiones_chat_mensajes": [
+                {"seq": 41, "mensaje": {"role": "assistant", "content": "b"}},
+                {"seq": 40, "mensaje": {"role": "user", "content": "a"}},
+            ],
+        }]
+        session = await manager.get_or_create("whatsapp:2")
+        assert [m["content"] for m in session.messages] == ["a", "b"]
+
+        session.add_message("user", "c")
+        await manager.save(session)
+        inserts = [p for t, op, p in db.calls if t == "sesiones_chat_mensajes" and op == "upsert"]
+        assert [r["seq"] for r in inserts[-1]] == [42]
+
+    @pytest.mark.asyncio
+    async def test_load_error_is_raised_not_treated_as_new_session(self, manager, monkeypatch):
+        async def unavailable():
+            raise ConnectionError("supabase down")
+
+        monkeypatch.setattr(manager, "_get_supabase", unavailable)
+        with pytest.raises(ConnectionError):
+            await manager.get_or_create("whatsapp:3")
+        assert manager.peek("whatsapp:3") is None
+        assert "whatsapp:3" not in manager._persist_state
+
+
+class TestWriteBehind:
+    """Deferred, coalesced persistence."""
+
+    @pytest.fixture
+    def manager(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        return SessionManager(
+            tmp_path, config=SessionConfig(flush_interval_s=60, flush_batch_size=3),
+        )
+
+    @pytest.mark.asyncio
+    async def test_save_defers_until_flush(self, manager):
+        session = Session(key="whatsapp:1")
+        session.add_message("user", "hola")
+        await manager.save(session)
+        assert not manager._get_session_path("whatsapp:1").exists()
+
+        await manager.flush()
+        assert [m["content"] for m in _lines(manager, "whatsapp:1")[1:]] == ["hola"]
+        await manager.close()
+
+    @pytest.mark.asyncio
+    async def test_repeated_saves_coalesce(self, manager):
+        session = Session(key="whatsapp:2")
+        for i in range(4):
+            session.add_message("user", f"msg{i}")
+            await manager.save(session)
+        assert len(manager._dirty) == 1
+
+        await manager.close()
+        lines = _lines(manager, "whatsapp:2")
+        assert sum(1 for line in lines if line.get("_type") == "metadata") == 1
+        assert len(lines) == 5
+
+    @pytest.mark.asyncio
+    async def test_batch_size_triggers_flush(self, manager):
+        for i in range(3):
+            session = Session(key=f"whatsapp:{10 + i}")
+            session.add_message("user", "hola")
+            await manager.save(session)
+        for _ in range(20):
+            if not manager._dirty:
+                break
+            await asyncio.sleep(0.01)
+
+        assert not manager._dirty
+        assert manager._get_session_path("whatsapp:12").exists()
+        await manager.close()
+
+    @pytest.mark.asyncio
+    async def test_dirty_session_served_before_flush(self, manager):
+        session = Session(key="whatsapp:3")
+        session.add_message("user", "hola")
+        await manager.save(session)
+        manager._cache.clear()
+
+        assert await manager.get_or_create("whatsapp:3") is session
+        await manager.close()
+
+    @pytest.mark.asyncio
+    async def test_session_stays_cached_while_its_write_is_in_flight(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        manager = SessionManager(tmp_path, config=SessionConfig(cache_max_entries=1))
+        release = asyncio.Event()
+        persist = manager._persist
+
+        async def slow_persist(sessions):
+            await release.wait()
+            await persist(sessions)
+
+        monkeypatch.setattr(manager, "_persist", slow_persist)
+        session = Session(key="whatsapp:4")
+        session.add_message("user", "hola")
+        await manager.save(session)
+        flush = asyncio.create_task(manager.flush())
+        await asyncio.sleep(0)
+
+        await manager.get_or_create("whatsapp:5")  # would evict whatsapp:4 if unpinned
+        assert manager.peek("whatsapp:4") is session
+        assert await manager.get_or_create("whatsapp:4") is session
+
+        release.set()
+        await flush
+        assert not manager._writing
+        await manager.close()
+
+    @pytest.mark.asyncio
+    async def test_supabase_flush_is_one_bulk_upsert(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        db = _FakeSupabase()
+        manager = SessionManager(tmp_path, backend="supabase")
+
+        async def get_db():
+            return db
+
+        monkeypatch.setattr(manager, "_get_supabase", get_db)
+        for i in range(5):
+            session = await manager.get_or_create(f"whatsapp:{i}")
+            session.add_message("user", "hola")
+            await manager.save(session)
+        db.calls.clear()
+        await manager.close()
+
+        upserts = [(t, p) for t, op, p in db.calls if op == "upsert"]
+        assert [t for t, _ in upserts] == ["sesiones_chat", "sesiones_chat_mensajes"]
+        assert len(upserts[0][1]) == 5
+        assert len(upserts[1][1]) == 5
@@ -0,0 +1,63 @@
+"""Tests for the SkillsLoader catalog."""
+
+import os
+
+from nanobot.agent.skills import SkillsLoader
+
+
+def _write_skill(root, name: str, body: str, always: bool = False) -> None:
+    skill_dir = root / name
+    skill_dir.mkdir(parents=True, exist_ok=True)
+    front = f"---\nname: {name}\ndescription: {name} skill\n"
+    if always:
+        front += "always: true\n"
+    (skill_dir / "SKILL.md").write_text(front + f"---\n{body}\n", encoding="utf-8")
+
+
+def _loader(tmp_path, **kwargs) -> SkillsLoader:
+    return SkillsLoader(tmp_path, builtin_skills_dir=tmp_path / "builtin", **kwargs)
+
+
+def test_catalog_parses_frontmatter_and_body(tmp_path):
+    _write_skill(tmp_path / "skills", "pedidos", "Cómo consultar pedidos.", always=True)
+    loader = _loader(tmp_path)
+
+    assert loader.get_always_skills() == ["pedidos"]
+    assert loader.get_skill_metadata("pedidos")["description"] == "pedidos skill"
+    context = loader.load_skills_for_context(["pedidos"])
+    assert "Cómo consultar pedidos." in context and "---" not in context
+    assert "<name>pedidos</name>" in loader.build_skills_summary()
+
+
+def test_agent_skill_overrides_shared(tmp_path):
+    _write_skill(tmp_path / "skills", "pedidos", "compartido")
+    _write_skill(tmp_path / "agent", "pedidos", "del agente")
+    loader = _loader(tmp_path, agent_skills_dir=tmp_path / "agent")
+
+    assert [s["source"] for s in loader.list_skills()] == ["agent"]
+    assert "del agente" in loader.load_skill("pedidos")
+
+
+def test_steady_state_reuses_catalog(tmp_path):
+    _write_skill(tmp_path / "skills", "pedidos", "v1")
+    loader = _loader(tmp_path, revalidate_interval_s=3600)
+    summary = loader.build_skills_summary()
+    version = loader.version
+
+    _write_skill(tmp_path / "skills", "entregas", "nuevo")
+    assert loader.build_skills_summary() is summary
+    assert loader.version == version
+
+
+def test_changes_detected_after_revalidation(tmp_path):
+    _write_skill(tmp_path / "skills", "pedidos", "v1")
+    loader = _loader(tmp_path, revalidate_interval_s=0)
+    version = loader.version
+
+    _write_skill(tmp_path / "skills", "pedidos", "v2")
+    skill_file = tmp_path / "skills" / "pedidos" / "SKILL.md"
+    st = skill_file.stat()
+    os.utime(skill_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert "v2" in loader.load_skill("pedidos")
+    assert loader.version == version + 1
@@ -0,0 +1,185 @@
+"""Tests for streamed LLM responses."""
+
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from nanobot.agent.loop import AgentLoop
+from nanobot.bus.events import InboundMessage
+from nanobot.bus.queue import MessageBus
+from nanobot.config.schema import SessionConfig
+from nanobot.providers.base import (
+    LLMProvider,
+    LLMResponse,
+    LLMStreamChunk,
+    ToolCallRequest,
+    stream_openai_chunks,
+)
+
+
+def _delta_chunk(content=None, tool_calls=None, finish_reason=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)], usage=None)
+
+
+def _tool_fragment(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+class _StreamingProvider(LLMProvider):
+    def __init__(self, deltas: list[str]):
+        super().__init__()
+        self.deltas = deltas
+
+    async def chat(self, messages, tools=None, model=None, max_tokens=4096,
+                   temperature=0.7, thinking=True) -> LLMResponse:
+        return LLMResponse(content="".join(self.deltas))
+
+    async def chat_stream(self, messages, tools=None, model=None, max_tokens=4096,
+                          temperature=0.7, thinking=True):
+        for delta in self.deltas:
+            yield LLMStreamChunk(content=delta)
+        yield LLMStreamChunk(response=LLMResponse(content="".join(self.deltas)))
+
+    def get_default_model(self) -> str:
+        return "test-model"
+
+
+async def test_openai_stream_assembles_content_and_tool_calls():
+    stream = _aiter([
+        _delta_chunk(content="Hola"),
+        _delta_chunk(content=" mundo"),
+        _delta_chunk(tool_calls=[_tool_fragment(0, id="call_1", name="consulta", arguments='{"acc')]),
+        _delta_chunk(tool_calls=[_tool_fragment(0, arguments='ion": "horarios"}')]),
+        _delta_chunk(finish_reason="tool_calls"),
+    ])
+
+    chunks = [c async for c in stream_openai_chunks(stream)]
+
+    assert [c.content for c in chunks if c.content] == ["Hola", " mundo"]
+    assert sum(1 for c in chunks if c.tool_call) == 2
+    response = chunks[-1].response
+    assert response.content == "Hola mundo"
+    assert response.finish_reason == "tool_calls"
+    assert response.tool_calls[0].name == "consulta"
+    assert response.tool_calls[0].arguments == {"accion": "horarios"}
+
+
+async def test_default_chat_stream_wraps_chat():
+    class _Plain(_StreamingProvider):
+        chat_stream = LLMProvider.chat_stream
+
+    chunks = [c async for c in _Plain(["hola"]).chat_stream(messages=[])]
+    assert chunks[0].content == "hola"
+    assert chunks[-1].response.content == "hola"
+
+
+@pytest.fixture
+def make_agent(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+    def make(deltas: list[str]) -> AgentLoop:
+        return AgentLoop(
+            bus=MessageBus(),
+            provider=_StreamingProvider(deltas),
+            workspace=tmp_path,
+            streaming=True,
+            session_config=SessionConfig(write_behind=False),
+        )
+
+    return make
+
+
+async def _drain_outbound(bus: MessageBus) -> list[Any]:
+    out = []
+    while bus.outbound_size:
+        out.append(await bus.consume_outbound())
+    return out
+
+
+async def test_agent_flushes_completed_chunks(make_agent):
+    agent = make_agent(["Hola ", "Ana|||", "¿En qué te ", "ayudo?"])
+    await agent._handle_message(InboundMessage(
+        channel="whatsapp", sender_id="1", chat_id="51999", content="hola",
+    ))
+
+    sent = [m.content for m in await _drain_outbound(agent.bus)]
+    assert sent == ["Hola Ana", "¿En qué te ayudo?"]
+    session = await agent.sessions.get_or_create("whatsapp:51999")
+    assert session.messages[-1]["content"] == "Hola Ana|||¿En qué te ayudo?"
+
+
+async def test_fully_streamed_response_sends_nothing_more(make_agent):
+    agent = make_agent(["uno|||", "dos|||"])
+    await agent._handle_message(InboundMessage(
+        channel="whatsapp", sender_id="1", chat_id="51998", content="hola",
+    ))
+
+    assert [m.content for m in await _drain_outbound(agent.bus)] == ["uno", "dos"]
+
+
+async def test_stream_requests_and_reports_usage(monkeypatch):
+    from nanobot.providers.openai_provider import OpenAIProvider
+
+    provider = OpenAIProvider(api_key="sk-test")
+    seen = {}
+
+    async def create(**kwargs):
+        seen.update(kwargs)
+        return _aiter([
+            _delta_chunk(content="hola", finish_reason="stop"),
+            SimpleNamespace(choices=[], usage=SimpleNamespace(
+                prompt_tokens=1200, completion_tokens=5, total_tokens=1205,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=1024),
+            )),
+        ])
+
+    monkeypatch.setattr(provider.client.chat.completions, "create", create)
+    chunks = [c async for c in provider.chat_stream(messages=[{"role": "user", "content": "hola"}])]
+
+    assert seen["stream_options"] == {"include_usage": True}
+    assert chunks[-1].response.usage["cache_read_tokens"] == 1024
+
+
+class _ToolThenAnswerProvider(_StreamingProvider):
+    """First response: a preamble chunk and a tool call; second: the answer."""
+
+    def __init__(self):
+        super().__init__([])
+        self.calls = 0
+
+    async def chat_stream(self, messages, tools=None, model=None, max_tokens=4096,
+                          temperature=0.7, thinking=True):
+        self.calls += 1
+        if self.calls == 1:
+            yield LLMStreamChunk(content="Reviso tu pedido|||")
+            call = ToolCallRequest(id="c1", name="list_dir", arguments={"path": "."})
+            yield LLMStreamChunk(response=LLMResponse(content="Reviso tu pedido|||", tool_calls=[call]))
+        else:
+            yield LLMStreamChunk(content="Está listo")
+            yield LLMStreamChunk(response=LLMResponse(content="Está listo"))
+
+
+async def test_preamble_before_tool_calls_is_sent_and_saved(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    agent = AgentLoop(
+        bus=MessageBus(),
+        provider=_ToolThenAnswerProvider(),
+        workspace=tmp_path,
+        streaming=True,
+        session_config=SessionConfig(write_behind=False),
+    )
+    await agent._handle_message(InboundMessage(
+        channel="whatsapp", sender_id="1", chat_id="51997", content="¿mi pedido?",
+    ))
+
+    assert [m.content for m in await _drain_outbound(agent.bus)] == ["Reviso tu pedido", "Está listo"]
+    session = await agent.sessions.get_or_create("whatsapp:51997")
+    # History matches what the user saw
+    assert session.messages[-1]["content"] == "Reviso tu pedido|||Está listo"
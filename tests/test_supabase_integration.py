@@ -1,8 +1,11 @@
 """Tests for Supabase CRM integration client."""
 
+import asyncio
+import json
+
+import httpx
 import pytest
 import respx
-import httpx
 
 
 class TestSupabaseCRMClient:
@@ -76,3 +79,77 @@ class TestSupabaseCRMClient:
         from nanobot.integrations.supabase import SupabaseCRMClient
         client = SupabaseCRMClient(url="", service_key="")
         assert client.enabled is False
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_batch_is_written_with_one_rpc_call(self):
+        client = self._make_client()
+        rpc = respx.post(
+            "https://test.supabase.co/rest/v1/rpc/fn_crm_mensajes_actualizar_v1",
+        ).mock(return_value=httpx.Response(200, json=3))
+        patch = respx.patch("https://test.supabase.co/rest/v1/crm_mensajes")
+
+        for i in range(3):
+            await client.mark_sent(crm_mensaje_id=f"uuid-{i}", evolution_msg_id="", mensaje_generado="Hola")
+        await client.mark_failed(crm_mensaje_id="uuid-1", error="timeout")
+        assert not rpc.called  # buffered until flush
+        await client.close()
+
+        assert rpc.call_count == 1
+        assert not patch.called
+        cambios = json.loads(rpc.calls[0].request.content)["p_cambios"]
+        assert [c["id"] for c in cambios] == ["uuid-0", "uuid-1", "uuid-2"]
+        assert cambios[1]["campos"]["estado_envio"] == "fallido"
+        assert cambios[1]["campos"]["mensaje_renderizado"] == "Hola"
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_batch_size_triggers_flush(self):
+        from nanobot.integrations.supabase import SupabaseCRMClient
+        client = SupabaseCRMClient(
+            url="https://test.supabase.co", service_key="k", batch_size=2, flush_interval_s=60,
+        )
+        rpc = respx.post(
+            "https://test.supabase.co/rest/v1/rpc/fn_crm_mensajes_actualizar_v1",
+        ).mock(return_value=httpx.Response(200, json=2))
+
+        await client.mark_sent(crm_mensaje_id="a", evolution_msg_id="", mensaje_generado="")
+        await client.mark_sent(crm_mensaje_id="b", evolution_msg_id="", mensaje_generado="")
+        for _ in range(10):
+            if rpc.called:
+                break
+            await asyncio.sleep(0.01)
+        assert rpc.call_count == 1
+        await client.close()
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_falls_back_to_patch_when_rpc_missing(self):
+        client = self._make_client()
+        rpc = respx.post(
+            "https://test.supabase.co/rest/v1/rpc/fn_crm_mensajes_actualizar_v1",
+        ).mock(return_value=httpx.Response(404, json={"code": "PGRST202"}))
+        patch = respx.patch("https://test.supabase.co/rest/v1/crm_mensajes").mock(
+            return_value=httpx.Response(204),
+        )
+
+        await client.mark_sent(crm_mensaje_id="a", evolution_msg_id="", mensaje_generado="")
+        await client.mark_sent(crm_mensaje_id="b", evolution_msg_id="", mensaje_generado="")
+        await client.close()
+
+        assert rpc.call_count == 1
+        assert patch.call_count == 2
+
+    @respx.mock
+    @pytest.mark.asyncio
+    async def test_transient_errors_are_retried(self):
+        client = self._make_client()
+        client.retry_backoff_s = 0
+        route = respx.patch("https://test.supabase.co/rest/v1/crm_mensajes").mock(
+            side_effect=[httpx.Response(503), httpx.ConnectError("down"), httpx.Response(204)],
+        )
+
+        await client.mark_failed(crm_mensaje_id="a", error="x")
+        await client.close()
+
+        assert route.call_count == 3
@@ -0,0 +1,133 @@
+"""Tests for the consulta (SupabaseTool) customer resolution."""
+
+import asyncio
+
+import pytest
+
+from nanobot.agent.tools import supabase
+from nanobot.agent.tools.supabase import SupabaseTool, normalize_phone
+
+
+class _FakeQuery:
+    """Chainable stand-in for a postgrest request builder."""
+
+    def __init__(self, db: "_FakeSupabase", table: str):
+        self.db, self.table, self.filters = db, table, []
+
+    def __getattr__(self, name):
+        def chain(*args, **kwargs):
+            self.filters.append((name, args))
+            return self
+        return chain
+
+    async def execute(self):
+        self.db.calls.append((self.table, self.filters))
+        await asyncio.sleep(0)
+        return type("Res", (), {"data": self.db.rows.get(self.table, [])})()
+
+
+class _FakeRpc:
+    def __init__(self, db: "_FakeSupabase", name: str, params: dict):
+        self.db, self.name, self.params = db, name, params
+
+    async def execute(self):
+        self.db.calls.append(("rpc", self.name, self.params))
+        if self.name not in self.db.functions:
+            raise _MissingFunctionError()
+        return type("Res", (), {"data": self.db.functions[self.name]})()
+
+
+class _MissingFunctionError(Exception):
+    code = "PGRST202"
+
+
+class _FakeSupabase:
+    def __init__(self, rows=None, functions=None):
+        self.calls: list[tuple] = []
+        self.rows = rows or {}
+        self.functions = functions or {}
+
+    def table(self, name):
+        return _FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        return _FakeRpc(self, name, params)
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches(monkeypatch):
+    monkeypatch.setattr(supabase, "_pedidos_rpc_missing", False)
+    supabase.invalidate_reference_cache()
+    yield
+    supabase.invalidate_reference_cache()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = _FakeSupabase({
+        "clientes": [
+            {"cliente_id": "C-1", "nombre": "Otro", "telefono": "51987654321", "telefono_whatsapp": None},
+            {"cliente_id": "C-2", "nombre": "Maria", "telefono": None, "telefono_whatsapp": "+51987654321"},
+        ],
+    })
+
+    async def get_client():
+        return db
+
+    monkeypatch.setattr(supabase, "_get_client", get_client)
+    return db
+
+
+def test_normalize_phone():
+    assert normalize_phone("51987654321@s.whatsapp.net") == "51987654321"
+    assert normalize_phone("+51 987-654-321") == "51987654321"
+    assert normalize_phone("direct") is None
+    assert normalize_phone(None) is None
+
+
+async def test_customer_resolved_from_ctx_with_one_query(db):
+    tool = SupabaseTool()
+    ctx = {"channel": "whatsapp", "chat_id": "51987654321@s.whatsapp.net"}
+
+    results = await asyncio.gather(*(
+        tool.execute(accion="mi_pedido", _ctx=ctx) for _ in range(5)
+    ))
+
+    assert supabase._pedidos_rpc_missing  # fake has no fn_pedidos_activos_v1
+    cliente_calls = [c for c in db.calls if c[0] == "clientes"]
+    assert len(cliente_calls) == 1
+    assert ("or_", ("telefono_whatsapp.eq.+51987654321,telefono.eq.51987654321",)) in cliente_calls[0][1]
+    # Customer found (orders table is empty) and the WhatsApp match wins
+    assert results == ["No tienes pedidos activos en este momento."] * 5
+    assert "Maria" in await tool.build_customer_context("51987654321@s.whatsapp.net")
+
+
+async def test_sessions_do_not_share_customer(db):
+    tool = SupabaseTool()
+    known = await tool.execute(accion="tracking", _ctx={"chat_id": "51987654321@s.whatsapp.net"})
+    unknown = await tool.execute(accion="tracking", _ctx={"chat_id": "cli:direct"})
+    assert known == "No tienes pedidos activos."
+    assert unknown == "No encontre tu cuenta."
+
+
+async def test_model_cannot_pass_phone(db):
+    tool = SupabaseTool()
+    result = await tool.execute(accion="mi_pedido", _ctx={"chat_id": "direct"}, phone="51987654321")
+    assert result.startswith("No encontre tu cuenta")
+    assert not any(c[0] == "clientes" for c in db.calls)
+
+
+async def test_tracking_uses_single_rpc(db):
+    db.functions["fn_pedidos_activos_v1"] = {
+        "cliente": {"cliente_id": "C-2", "nombre": "Maria"},
+        "pedidos": [{"codigo": "B001-4", "estado": "terminado"}],
+        "entregas": [{
+            "pedido_codigo": "B001-4", "tipo": "entrega", "estado": "en_camino",
+            "fecha_programada": "2026-03-18", "franja_horaria": "9-12",
+        }],
+    }
+    tool = SupabaseTool()
+    result = await tool.execute(accion="tracking", _ctx={"chat_id": "51987654321@s.whatsapp.net"})
+
+    assert "Pedido B001-4 (entrega)" in result and "En camino" in result
+    assert db.calls == [("rpc", "fn_pedidos_activos_v1", {"p_telefono": "51987654321"})]
@@ -1,3 +1,4 @@
+import asyncio
 from typing import Any
 
 from nanobot.agent.tools.base import Tool
@@ -86,3 +87,75 @@ async def test_registry_returns_validation_error() -> None:
     reg.register(SampleTool())
     result = await reg.execute("sample", {"query": "hi"})
     assert "Invalid parameters" in result
+
+
+def test_registry_caches_definitions_per_version() -> None:
+    reg = ToolRegistry()
+    reg.register(SampleTool())
+    first = reg.get_definitions()
+    assert reg.get_definitions() is first
+
+    reg.unregister("sample")
+    assert reg.get_definitions() == []
+    assert reg.get_definitions() is not first
+
+
+class _SleepTool(Tool):
+    def __init__(self, name: str, safe: bool, log: list[str]) -> None:
+        self._name = name
+        self.concurrency_safe = safe
+        self._log = log
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def description(self) -> str:
+        return "sleeps"
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return {"type": "object", "properties": {"delay": {"type": "number"}}}
+
+    async def execute(self, delay: float = 0.0, **kwargs: Any) -> str:
+        self._log.append(f"start:{self._name}:{delay}")
+        await asyncio.sleep(delay)
+        self._log.append(f"end:{self._name}:{delay}")
+        return f"{self._name}:{delay}"
+
+
+async def test_execute_batch_runs_safe_calls_concurrently_in_order() -> None:
+    log: list[str] = []
+    reg = ToolRegistry()
+    reg.register(_SleepTool("read", True, log))
+    calls = [("read", {"delay": 0.05}), ("read", {"delay": 0.01})]
+
+    results = await reg.execute_batch(calls)
+
+    assert results == ["read:0.05", "read:0.01"]
+    assert log[:2] == ["start:read:0.05", "start:read:0.01"]
+
+
+async def test_execute_batch_serializes_unsafe_calls() -> None:
+    log: list[str] = []
+    reg = ToolRegistry()
+    reg.register(_SleepTool("read", True, log))
+    reg.register(_SleepTool("write", False, log))
+    calls = [("read", {"delay": 0.02}), ("write", {"delay": 0}), ("read", {"delay": 0})]
+
+    results = await reg.execute_batch(calls)
+
+    assert results == ["read:0.02", "write:0", "read:0"]
+    assert log.index("end:read:0.02") < log.index("start:write:0")
+    assert log.index("end:write:0") < log.index("start:read:0")
+
+
+async def test_execute_batch_respects_cap() -> None:
+    log: list[str] = []
+    reg = ToolRegistry()
+    reg.register(_SleepTool("read", True, log))
+
+    await reg.execute_batch([("read", {"delay": 0.01})] * 3, max_parallel=1)
+
+    assert log == ["start:read:0.01", "end:read:0.01"] * 3
@@ -0,0 +1,100 @@
+"""Tests for AsyncTTLCache."""
+
+import asyncio
+
+import pytest
+
+from nanobot.utils.cache import AsyncTTLCache
+
+
+class _Loader:
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return self.values[min(self.calls, len(self.values)) - 1]
+
+
+async def test_fresh_entry_is_served_from_cache():
+    cache = AsyncTTLCache(ttl_s=60)
+    loader = _Loader(["a"])
+    assert await cache.get_or_load(("k",), loader) == ["a"]
+    assert await cache.get_or_load(("k",), loader) == ["a"]
+    assert loader.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+async def test_stale_entry_is_served_while_refreshing():
+    cache = AsyncTTLCache(ttl_s=0, stale_s=60)
+    loader = _Loader(["old"], ["new"])
+    await cache.get_or_load(("k",), loader)
+
+    assert await cache.get_or_load(("k",), loader) == ["old"]
+    await asyncio.sleep(0.01)
+    assert loader.calls == 2
+    assert cache._entries[("k",)].value == ["new"]
+
+
+async def test_empty_results_use_negative_ttl():
+    cache = AsyncTTLCache(ttl_s=60, negative_ttl_s=0)
+    loader = _Loader([], ["found"])
+    assert await cache.get_or_load(("k",), loader) == []
+    assert await cache.get_or_load(("k",), loader) == ["found"]
+
+
+async def test_oversized_values_are_not_stored():
+    cache = AsyncTTLCache(max_entry_bytes=10)
+    loader = _Loader(["x" * 50])
+    await cache.get_or_load(("k",), loader)
+    await cache.get_or_load(("k",), loader)
+    assert loader.calls == 2
+
+
+async def test_concurrent_misses_share_one_load():
+    cache = AsyncTTLCache()
+    loader = _Loader(["a"])
+    results = await asyncio.gather(*(cache.get_or_load(("k",), loader) for _ in range(5)))
+    assert results == [["a"]] * 5
+    assert loader.calls == 1
+
+
+async def test_errors_are_not_cached():
+    cache = AsyncTTLCache()
+    calls = 0
+
+    async def flaky():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("boom")
+        return ["ok"]
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load(("k",), flaky)
+    assert await cache.get_or_load(("k",), flaky) == ["ok"]
+
+
+async def test_invalidate_by_prefix_and_inflight_load():
+    cache = AsyncTTLCache()
+    await cache.get_or_load(("catalogo", "s1"), _Loader(["a"]))
+    await cache.get_or_load(("servicios",), _Loader(["b"]))
+
+    assert cache.invalidate(("catalogo",)) == 1
+    assert cache.stats()["entries"] == 1
+
+    # A load that started before invalidation must not repopulate the cache
+    gate = asyncio.Event()
+
+    async def slow():
+        await gate.wait()
+        return ["stale"]
+
+    pending = asyncio.create_task(cache.get_or_load(("catalogo", "s1"), slow))
+    await asyncio.sleep(0)
+    cache.invalidate()
+    gate.set()
+    assert await pending == ["stale"]
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,86 @@
+"""Tests for webhook dedup stores."""
+
+import pytest
+
+from nanobot.config.schema import GatewayConfig
+from nanobot.webhook.dedup import (
+    MemoryDedupStore,
+    SQLiteDedupStore,
+    create_dedup_store,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    stores = []
+
+    def make(**kwargs):
+        if request.param == "memory":
+            store = MemoryDedupStore(**kwargs)
+        else:
+            store = SQLiteDedupStore(tmp_path / "dedup.db", **kwargs)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def test_second_delivery_is_duplicate(make_store):
+    store = make_store()
+    assert store.check_and_mark("evolution:A") is False
+    assert store.check_and_mark("evolution:A") is True
+    assert store.check_and_mark("crm:A") is False
+
+
+def test_unmark_accepts_the_retry(make_store):
+    store = make_store()
+    store.check_and_mark("crm:A")
+    store.unmark("crm:A")
+    assert store.check_and_mark("crm:A") is False
+
+
+def test_entries_expire(make_store):
+    store = make_store(ttl_s=0)
+    assert store.check_and_mark("k") is False
+    assert store.check_and_mark("k") is False
+
+
+def test_capacity_evicts_oldest():
+    store = MemoryDedupStore(capacity=2)
+    for key in ("a", "b", "c"):
+        store.check_and_mark(key)
+    assert len(store) == 2
+    assert store.check_and_mark("a") is False
+    assert store.check_and_mark("c") is True
+
+
+def test_sqlite_store_is_shared_and_persistent(tmp_path):
+    path = tmp_path / "dedup.db"
+    first = SQLiteDedupStore(path)
+    second = SQLiteDedupStore(path)  # e.g. another gateway worker
+    try:
+        assert first.check_and_mark("crm:1") is False
+        assert second.check_and_mark("crm:1") is True
+    finally:
+        first.close()
+        second.close()
+
+    restarted = SQLiteDedupStore(path, capacity=1)
+    try:
+        assert restarted.check_and_mark("crm:1") is True
+        restarted.check_and_mark("crm:2")
+        restarted.prune()
+        assert restarted.check_and_mark("crm:1") is False  # oldest trimmed to capacity
+    finally:
+        restarted.close()
+
+
+def test_factory(tmp_path):
+    assert isinstance(create_dedup_store(GatewayConfig()), MemoryDedupStore)
+    store = create_dedup_store(GatewayConfig(dedup_backend="sqlite", dedup_path=str(tmp_path / "d.db")))
+    assert isinstance(store, SQLiteDedupStore)
+    store.close()
+    with pytest.raises(ValueError):
+        create_dedup_store(GatewayConfig(dedup_backend="redis"))
@@ -0,0 +1,170 @@
+"""Tests for the durable webhook spool."""
+
+import asyncio
+import uuid
+
+import pytest
+from aiohttp import web
+
+from nanobot.bus.queue import MessageBus
+from nanobot.config.schema import GatewayConfig
+from nanobot.webhook import spool as spool_module
+from nanobot.webhook.dedup import MemoryDedupStore
+from nanobot.webhook.routes import deliver_event, setup_routes
+from nanobot.webhook.spool import WebhookSpool
+
+
+async def _replay_until(spool: WebhookSpool, count: int, deliver=None) -> list[dict]:
+    seen: list[dict] = []
+
+    async def handler(record):
+        if deliver:
+            await deliver(record)
+        seen.append(record)
+
+    task = asyncio.create_task(spool.replay(handler))
+    try:
+        for _ in range(200):
+            if len(seen) >= count:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    return seen
+
+
+async def test_concurrent_appends_share_fsync_and_replay_in_order(tmp_path):
+    spool = WebhookSpool(tmp_path, fsync_interval_s=0.01)
+    offsets = await asyncio.gather(*(spool.append({"n": i}) for i in range(20)))
+    assert offsets == sorted(offsets)
+
+    seen = await _replay_until(spool, 20)
+    assert [r["n"] for r in seen] == list(range(20))
+    assert spool.backlog_bytes == 0
+    await spool.close()
+
+
+async def test_restart_resumes_from_checkpoint(tmp_path):
+    spool = WebhookSpool(tmp_path)
+    for i in range(3):
+        await spool.append({"n": i})
+    assert [r["n"] for r in await _replay_until(spool, 3)] == [0, 1, 2]
+    await spool.append({"n": 3})  # acknowledged, never delivered
+    await spool.close()
+
+    reopened = WebhookSpool(tmp_path)
+    assert [r["n"] for r in await _replay_until(reopened, 1)] == [3]
+    await reopened.close()
+
+
+async def test_torn_tail_is_truncated(tmp_path):
+    spool = WebhookSpool(tmp_path)
+    await spool.append({"n": 0})
+    await spool.close()
+    segment = next(tmp_path.glob("*.log"))
+    with open(segment, "ab") as f:
+        f.write(b"\x40\x00\x00\x00partial")  # crash mid-write
+
+    reopened = WebhookSpool(tmp_path)
+    assert [r["n"] for r in await _replay_until(reopened, 1)] == [0]
+    await reopened.append({"n": 1})
+    assert [r["n"] for r in await _replay_until(reopened, 1)] == [1]
+    await reopened.close()
+
+
+async def test_failed_fsync_discards_the_unsynced_records(tmp_path, monkeypatch):
+    spool = WebhookSpool(tmp_path, segment_bytes=64)
+    await spool.append({"n": 0, "pad": "x" * 60})
+
+    def broken_fsync(files):
+        raise OSError("EIO")
+
+    monkeypatch.setattr(spool_module, "_fsync_all", broken_fsync)
+    with pytest.raises(OSError):
+        await spool.append({"n": 1})  # rolled into a new segment, then failed
+    monkeypatch.undo()
+    await spool.append({"n": 2})
+
+    assert [r["n"] for r in await _replay_until(spool, 2)] == [0, 2]
+    await spool.close()
+    reopened = WebhookSpool(tmp_path)
+    assert reopened.backlog_bytes == 0
+    await reopened.close()
+
+
+async def test_consumed_segments_are_deleted(tmp_path):
+    spool = WebhookSpool(tmp_path, segment_bytes=64)
+    for i in range(10):
+        await spool.append({"n": i, "pad": "x" * 40})
+    assert len(list(tmp_path.glob("*.log"))) == 10
+
+    seen = await _replay_until(spool, 10)
+    assert [r["n"] for r in seen] == list(range(10))
+    assert len(list(tmp_path.glob("*.log"))) == 1
+    await spool.close()
+
+
+async def test_crm_webhook_acks_from_spool(aiohttp_client, tmp_path):
+    bus = MessageBus()
+    spool = WebhookSpool(tmp_path)
+    app = web.Application()
+    app["bus"] = bus
+    app["channels"] = {}
+    app["config"] = GatewayConfig(webhook_secret="s")
+    app["spool"] = spool
+    setup_routes(app)
+    client = await aiohttp_client(app)
+
+    crm_id = str(uuid.uuid4())
+    resp = await client.post(
+        "/webhook/crm",
+        json={
+            "event": "prenda_terminada",
+            "data": {
+                "crm_mensaje_id": crm_id,
+                "cliente": {"nombre": "Ana", "telefono_whatsapp": "+51987654321"},
+                "pedido": {"codigo": "P-1", "saldo": 0},
+            },
+        },
+        headers={"Authorization": "Bearer s"},
+    )
+    assert resp.status == 202
+    assert bus.inbound_size == 0  # acknowledged before delivery
+
+    await _replay_until(spool, 1, lambda record: deliver_event(app, record))
+    msg = await asyncio.wait_for(bus.consume_inbound(), timeout=1.0)
+    assert msg.metadata["crm_mensaje_id"] == crm_id
+    await spool.close()
+
+
+async def test_failed_spool_append_does_not_mark_duplicate(aiohttp_client, tmp_path, monkeypatch):
+    spool = WebhookSpool(tmp_path)
+    app = web.Application()
+    app["bus"] = MessageBus()
+    app["channels"] = {}
+    app["config"] = GatewayConfig(webhook_secret="s")
+    app["spool"] = spool
+    app["dedup"] = MemoryDedupStore()
+    setup_routes(app)
+    client = await aiohttp_client(app)
+
+    async def disk_full(record):
+        raise OSError("No space left on device")
+
+    payload = {
+        "event": "prenda_terminada",
+        "data": {
+            "crm_mensaje_id": str(uuid.uuid4()),
+            "cliente": {"nombre": "Ana", "telefono_whatsapp": "+51987654321"},
+        },
+    }
+    headers = {"Authorization": "Bearer s"}
+    with monkeypatch.context() as m:
+        m.setattr(spool, "append", disk_full)
+        resp = await client.post("/webhook/crm", json=payload, headers=headers)
+    assert resp.status == 503
+
+    resp = await client.post("/webhook/crm", json=payload, headers=headers)
+    assert resp.status == 202  # the retry is stored, not dropped as a duplicate
+    await spool.close()